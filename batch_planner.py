@@ -0,0 +1,276 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils import deadline
+from utils.geocoding_cache import normalize_city_name
+from utils.rate_limiter import PRIORITY_BATCH, request_priority, set_priority
+from utils.tracing import traced
+from utils.weather import forecast_window, get_weather_for_cities, aget_weather_for_cities
+from workflow import TravelState, NODE_RUNNERS, FETCH_NODES, guarded
+
+logger = logging.getLogger(__name__)
+
+# Lookups that depend only on the destination city vs. on the flight route.
+# Weather depends on the city and the trip dates and is fetched in bulk instead.
+CITY_NODES = tuple(node for node in FETCH_NODES if node not in ("flight", "weather"))
+ROUTE_NODES = ("flight",)
+# Per-trip stages that run after the shared lookups are spread back.
+TRIP_NODES = ("itinerary", "expense", "fusion")
+
+
+async def _abulk_weather(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {"weather_info": await aget_weather_for_cities(**state["weather_batch"])}
+
+
+def _bulk_weather(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {"weather_info": get_weather_for_cities(**state["weather_batch"])}
+
+
+# A bulk weather request stands in for the weather node of every trip in its
+# window, with the same deadline and unavailable handling.
+_WEATHER_RUNNER = tuple(traced("weather")(f) for f in guarded("weather", _bulk_weather, _abulk_weather))
+
+
+def city_key(user_input_data: Dict[str, Any]) -> str:
+    return normalize_city_name(user_input_data["city"])
+
+
+def route_key(user_input_data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (
+        user_input_data["origin_city"].strip().upper(),
+        user_input_data["destination_city"].strip().upper(),
+        user_input_data["outbound_date"],
+        user_input_data.get("return_date") or "",
+    )
+
+
+def weather_window(user_input_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    return forecast_window(
+        user_input_data.get("outbound_date"), user_input_data.get("return_date"), user_input_data.get("num_days")
+    )
+
+
+def _initial_state(user_input_data: Dict[str, Any], deadlines: Dict[str, float]) -> TravelState:
+    return {
+        "user_input": f"Plan a {user_input_data['num_days']}-day trip to {user_input_data['city']}",
+        "user_input_data": user_input_data,
+        "destination_details": {},
+        "deadlines": deadlines,
+        "unavailable": {},
+    }
+
+
+def _merge(target: Dict[str, Any], update: Dict[str, Any]) -> None:
+    update = dict(update)
+    unavailable = update.pop("unavailable", None)
+    if unavailable:
+        target["unavailable"] = {**(target.get("unavailable") or {}), **unavailable}
+    target.update(update)
+
+
+def _failure(node: str, error: BaseException) -> str:
+    logger.error(f"{node} failed: {error!r}")
+    return f"{node} failed: {error}"
+
+
+class BatchPlan:
+    """
+    Groups trips so each distinct city and flight route is looked up once.
+
+    Every group keeps the first trip that needs it as its representative; the
+    lookup nodes run against that trip's state and their updates are copied
+    into every trip of the group. All trips share one deadline. A city or
+    route whose lookup raised fails only the trips that need it.
+    """
+    def __init__(self, user_inputs: List[Dict[str, Any]], deadline_at: Optional[float] = None):
+        deadlines = deadline.plan_deadlines(deadline_at)
+        self.states = [_initial_state(data, deadlines) for data in user_inputs]
+        self.city_reps: Dict[str, TravelState] = {}
+        self.route_reps: Dict[Tuple[str, str, str, str], TravelState] = {}
+        # Cities to forecast for each distinct trip window; one bulk request per window.
+        self.weather_groups: Dict[Tuple[Optional[str], Optional[str]], List[str]] = {}
+        for state in self.states:
+            data = state["user_input_data"]
+            self.city_reps.setdefault(city_key(data), state)
+            self.route_reps.setdefault(route_key(data), state)
+            cities = self.weather_groups.setdefault(weather_window(data), [])
+            if city_key(data) not in cities:
+                cities.append(city_key(data))
+        self.city_updates: Dict[str, Dict[str, Any]] = {key: {} for key in self.city_reps}
+        self.route_updates: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {key: {} for key in self.route_reps}
+        self.weather: Dict[Tuple[Tuple[Optional[str], Optional[str]], str], Dict] = {}
+        self.weather_unavailable: Dict[Tuple[Optional[str], Optional[str]], Dict[str, str]] = {}
+        self.city_errors: Dict[str, str] = {}
+        self.route_errors: Dict[Tuple[str, str, str, str], str] = {}
+        logger.info(
+            f"Batch of {len(self.states)} trips: {len(self.city_reps)} distinct cities, "
+            f"{len(self.route_reps)} distinct routes, {len(self.weather_groups)} distinct weather windows"
+        )
+
+    def city_state(self, key: str) -> TravelState:
+        return {**self.city_reps[key], **self.city_updates[key]}
+
+    def located_cities(self) -> List[str]:
+        return [key for key in self.city_reps if key not in self.city_errors]
+
+    def weather_batches(self) -> Iterator[Tuple[Tuple[Optional[str], Optional[str]], List[str], Dict[str, Any]]]:
+        """
+        (window, city keys, weather runner state) per distinct trip window.
+        Needs the orchestrator's coordinates in city_updates; cities it could not locate are left out.
+        """
+        for window, keys in self.weather_groups.items():
+            keys = [key for key in keys if key not in self.city_errors]
+            if not keys:
+                continue
+            states = [self.city_state(key) for key in keys]
+            yield window, keys, {"deadlines": self.states[0]["deadlines"], "weather_batch": dict(
+                city_names=[state["user_input_data"]["city"] for state in states],
+                coordinates=[
+                    (state["destination_details"]["latitude"], state["destination_details"]["longitude"])
+                    for state in states
+                ],
+                start_date=window[0],
+                end_date=window[1],
+            )}
+
+    def set_weather(self, window: Tuple[Optional[str], Optional[str]], keys: List[str],
+                    update: Dict[str, Any]) -> None:
+        # A failed or late bulk request leaves no reports and marks weather unavailable for the window.
+        for key, report in zip(keys, update.get("weather_info") or []):
+            self.weather[(window, key)] = report
+        if update.get("unavailable"):
+            self.weather_unavailable[window] = update["unavailable"]
+
+    def spread(self) -> None:
+        for state in self.states:
+            data = state["user_input_data"]
+            error = self.city_errors.get(city_key(data)) or self.route_errors.get(route_key(data))
+            if error is not None:
+                state["error"] = error
+                continue
+            _merge(state, self.city_updates[city_key(data)])
+            _merge(state, self.route_updates[route_key(data)])
+            _merge(state, {
+                "weather_info": self.weather.get((weather_window(data), city_key(data))),
+                "unavailable": self.weather_unavailable.get(weather_window(data)),
+            })
+
+
+def _collect(futures: Dict[Tuple[Any, str], Any], updates: Dict[Any, Dict[str, Any]], errors: Dict[Any, str]) -> None:
+    for (key, node), future in futures.items():
+        try:
+            _merge(updates[key], future.result())
+        except Exception as e:
+            errors.setdefault(key, _failure(node, e))
+
+
+def _run_trip(state: TravelState) -> TravelState:
+    if "error" in state:
+        return state
+    for node in TRIP_NODES:
+        try:
+            _merge(state, NODE_RUNNERS[node][0](state))
+        except Exception as e:
+            state["error"] = _failure(node, e)
+            break
+    return state
+
+
+def plan_batch(user_inputs: List[Dict[str, Any]], max_workers: int = 16,
+               priority: int = PRIORITY_BATCH, deadline_at: Optional[float] = None) -> List[TravelState]:
+    """
+    Plan many trips at once, sharing hotel, restaurant, attraction, transport
+    and flight lookups between trips with the same city or route, and fetching
+    weather in one bulk request per distinct trip window.
+    Upstream requests queue behind interactive plans at the given rate limiter priority.
+    The whole batch runs to one deadline (deadline_at, epoch seconds, or
+    PLAN_DEADLINE_SECONDS from now), with the same unavailable markers as a single plan.
+    Returns the final TravelState of every trip, in input order; a trip that
+    could not be planned (e.g. its city was not found) carries an "error" instead.
+    """
+    plan = BatchPlan(user_inputs, deadline_at)
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=set_priority, initargs=(priority,)) as executor:
+        # Flights do not need coordinates, so they overlap with geocoding.
+        route_futures = {
+            (key, node): executor.submit(NODE_RUNNERS[node][0], state)
+            for key, state in plan.route_reps.items()
+            for node in ROUTE_NODES
+        }
+        orchestrated = {
+            (key, "orchestrator"): executor.submit(NODE_RUNNERS["orchestrator"][0], state)
+            for key, state in plan.city_reps.items()
+        }
+        _collect(orchestrated, plan.city_updates, plan.city_errors)
+
+        city_futures = {
+            (key, node): executor.submit(NODE_RUNNERS[node][0], plan.city_state(key))
+            for key in plan.located_cities()
+            for node in CITY_NODES
+        }
+        weather_futures = [
+            (window, keys, executor.submit(_WEATHER_RUNNER[0], state))
+            for window, keys, state in plan.weather_batches()
+        ]
+        _collect(city_futures, plan.city_updates, plan.city_errors)
+        for window, keys, future in weather_futures:
+            plan.set_weather(window, keys, future.result())
+        _collect(route_futures, plan.route_updates, plan.route_errors)
+
+        plan.spread()
+        return list(executor.map(_run_trip, plan.states))
+
+
+async def _arun_trip(state: TravelState) -> TravelState:
+    if "error" in state:
+        return state
+    for node in TRIP_NODES:
+        try:
+            _merge(state, await NODE_RUNNERS[node][1](state))
+        except Exception as e:
+            state["error"] = _failure(node, e)
+            break
+    return state
+
+
+async def aplan_batch(user_inputs: List[Dict[str, Any]], priority: int = PRIORITY_BATCH,
+                      deadline_at: Optional[float] = None) -> List[TravelState]:
+    """
+    Async version of plan_batch, using the async agents on the running loop.
+    """
+    with request_priority(priority):
+        return await _aplan_batch(user_inputs, deadline_at)
+
+
+async def _aplan_batch(user_inputs: List[Dict[str, Any]], deadline_at: Optional[float]) -> List[TravelState]:
+    plan = BatchPlan(user_inputs, deadline_at)
+
+    async def run(node: str, state: TravelState, updates: Dict[str, Any], errors: Dict[Any, str], key: Any) -> None:
+        # Failures are recorded per city or route, so no gather below ever raises.
+        try:
+            _merge(updates, await NODE_RUNNERS[node][1](state))
+        except Exception as e:
+            errors.setdefault(key, _failure(node, e))
+
+    async def fly(key: Tuple[str, str, str, str]) -> None:
+        for node in ROUTE_NODES:
+            await run(node, plan.route_reps[key], plan.route_updates[key], plan.route_errors, key)
+
+    async def forecast(window: Tuple[Optional[str], Optional[str]], keys: List[str], state: Dict[str, Any]) -> None:
+        plan.set_weather(window, keys, await _WEATHER_RUNNER[1](state))
+
+    flights = asyncio.gather(*(fly(key) for key in plan.route_reps))
+    # Bulk weather needs every city's coordinates, so geocoding finishes first.
+    await asyncio.gather(*(
+        run("orchestrator", state, plan.city_updates[key], plan.city_errors, key)
+        for key, state in plan.city_reps.items()
+    ))
+    await asyncio.gather(
+        *(run(node, plan.city_state(key), plan.city_updates[key], plan.city_errors, key)
+          for key in plan.located_cities() for node in CITY_NODES),
+        *(forecast(*batch) for batch in plan.weather_batches()),
+        flights,
+    )
+    plan.spread()
+    return list(await asyncio.gather(*(_arun_trip(state) for state in plan.states)))
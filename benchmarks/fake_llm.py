@@ -0,0 +1,102 @@
+"""
+Offline chat model that can stand in for utils.llm_wrapper.llms.llm.
+
+It waits for a time-to-first-token, then emits a canned markdown report one
+token at a time, so invoke, stream and their async versions all behave like a
+remote model with configurable latency.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+REPORT_TEMPLATE = """# Travel Report
+
+## Trip Overview
+- **Route**: origin to destination
+- **Duration**: the requested number of days
+
+## Flight Details
+- **Recommended**: the cheapest non-stop option listed above.
+
+## Weather
+Expect warm days with scattered showers; pack light clothing and an umbrella.
+
+## Itinerary
+1. **Day 1**: Heritage walk through the old city, lunch at a local favourite.
+2. **Day 2**: Museums in the morning, lakeside sunset in the evening.
+
+## Expense Summary
+- **Total**: see the expense breakdown above.
+"""
+
+
+class FakeChatModel(BaseChatModel):
+    response: str = REPORT_TEMPLATE
+    first_token_latency: float = 0.5
+    token_latency: float = 0.002
+    model_name: str = "fake-chat-model"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _tokens(self) -> List[str]:
+        words = self.response.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str]) -> dict:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": prompt_tokens, "output_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens()
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        message = AIMessage(content=self.response, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens()
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        message = AIMessage(content=self.response, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            usage = self._usage(messages, tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        await asyncio.sleep(self.first_token_latency)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.token_latency)
+            usage = self._usage(messages, tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def install_fake_llm(model: BaseChatModel, provider: str = "openai") -> None:
+    """
+    Make model the client behind the lazy llm of the given provider.
+    """
+    from utils.llm_wrapper.llms import set_llm
+
+    set_llm(provider, model)
@@ -0,0 +1,278 @@
+"""
+Local stand-ins for Open-Meteo, SerpAPI and Geoapify.
+
+Each upstream runs on its own ThreadingHTTPServer and answers with payloads
+shaped like the real APIs (same keys and nesting the fetchers read), after
+sleeping for a configurable latency plus Gaussian jitter.
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# (mean latency, jitter standard deviation) in milliseconds per upstream.
+DEFAULT_LATENCY_MS = {
+    "open_meteo": (60.0, 15.0),
+    "serpapi": (400.0, 120.0),
+    "serpapi_flights": (1200.0, 400.0),
+    "geoapify": (150.0, 40.0),
+}
+
+AIRLINES = ["IndiGo", "Air India", "Akasa Air", "SpiceJet", "Vistara"]
+WEATHER_CODES = [0, 1, 2, 3, 45, 61, 63, 80, 95]
+
+
+def _rng(params: Dict[str, str]) -> random.Random:
+    # Same request, same payload: keeps runs comparable.
+    return random.Random(json.dumps(sorted(params.items())))
+
+
+def geocoding_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    rng = _rng(params)
+    return {
+        "results": [{
+            "id": rng.randint(1, 10 ** 7),
+            "name": params.get("name", "City"),
+            "latitude": round(rng.uniform(8.0, 32.0), 4),
+            "longitude": round(rng.uniform(70.0, 90.0), 4),
+            "elevation": 500.0,
+            "country_code": "IN",
+            "timezone": "Asia/Kolkata",
+            "country": "India",
+        }],
+        "generationtime_ms": 0.5,
+    }
+
+
+def _forecast_dates(params: Dict[str, str]) -> List[str]:
+    if params.get("start_date") and params.get("end_date"):
+        start = date.fromisoformat(params["start_date"])
+        end = date.fromisoformat(params["end_date"])
+        days = (end - start).days + 1
+    else:
+        start = date.today()
+        days = int(params.get("forecast_days", 7))
+    return [(start + timedelta(days=i)).isoformat() for i in range(max(days, 0))]
+
+
+def forecast_payload(params: Dict[str, str]) -> Any:
+    latitudes = params.get("latitude", "0").split(",")
+    longitudes = params.get("longitude", "0").split(",")
+    times = _forecast_dates(params)
+    locations = []
+    for lat, lon in zip(latitudes, longitudes):
+        rng = _rng({"lat": lat, "lon": lon, "days": str(len(times))})
+        highs = [round(rng.uniform(25, 40), 1) for _ in times]
+        locations.append({
+            "latitude": float(lat),
+            "longitude": float(lon),
+            "timezone": params.get("timezone", "GMT"),
+            "daily_units": {"time": "iso8601", "temperature_2m_max": "°C", "temperature_2m_min": "°C"},
+            "daily": {
+                "time": times,
+                "weathercode": [rng.choice(WEATHER_CODES) for _ in times],
+                "temperature_2m_max": highs,
+                "temperature_2m_min": [round(h - rng.uniform(6, 12), 1) for h in highs],
+                "precipitation_sum": [round(rng.choice([0, 0, 0.4, 3.2, 12.5]), 1) for _ in times],
+                "rain_sum": [round(rng.choice([0, 0, 0.4, 3.2]), 1) for _ in times],
+                "showers_sum": [0.0 for _ in times],
+                "snowfall_sum": [0.0 for _ in times],
+            },
+        })
+    return locations if len(locations) > 1 else locations[0]
+
+
+def _flight_option(rng: random.Random, origin: str, destination: str, day: str) -> Dict[str, Any]:
+    stops = rng.choice([0, 0, 1, 1, 2])
+    airports = [origin] + [rng.choice(["DEL", "BOM", "BLR", "CCU"]) for _ in range(stops)] + [destination]
+    hour = rng.randint(0, 20)
+    legs = []
+    for i in range(len(airports) - 1):
+        duration = rng.randint(60, 180)
+        legs.append({
+            "departure_airport": {"name": f"{airports[i]} Airport", "id": airports[i], "time": f"{day} {hour:02d}:{rng.randint(0, 59):02d}"},
+            "arrival_airport": {"name": f"{airports[i + 1]} Airport", "id": airports[i + 1], "time": f"{day} {min(hour + 2, 23):02d}:{rng.randint(0, 59):02d}"},
+            "duration": duration,
+            "airplane": rng.choice(["Airbus A320neo", "Boeing 737", "ATR 72"]),
+            "airline": rng.choice(AIRLINES),
+            "airline_logo": "https://www.gstatic.com/flights/airline_logos/70px/6E.png",
+            "travel_class": "Economy",
+            "flight_number": f"6E {rng.randint(100, 9999)}",
+            "legroom": "28 in",
+            "extensions": ["Below average legroom (28 in)", "In-seat USB outlet", "Carbon emissions estimate: 112 kg"],
+        })
+        hour = min(hour + 3, 21)
+    total = sum(leg["duration"] for leg in legs) + 75 * stops
+    return {
+        "flights": legs,
+        "layovers": [{"duration": 75, "name": f"{a} Airport", "id": a} for a in airports[1:-1]],
+        "total_duration": total,
+        "carbon_emissions": {"this_flight": 112000, "typical_for_this_route": 118000, "difference_percent": -5},
+        "price": rng.randint(3500, 16000),
+        "type": "Round trip",
+        "airline_logo": "https://www.gstatic.com/flights/airline_logos/70px/multi.png",
+        "departure_token": "W1siUEFUIiwiMjAyNS0wNy0wOSIsIkhZRCIsbnVsbCwiNkUiLCI1MTIiXV0=" * 3,
+    }
+
+
+def flights_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    rng = _rng(params)
+    origin = params.get("departure_id", "PAT")
+    destination = params.get("arrival_id", "HYD")
+    day = params.get("outbound_date", date.today().isoformat())
+    options = [_flight_option(rng, origin, destination, day) for _ in range(rng.randint(12, 30))]
+    return {
+        "search_metadata": {"id": "fake", "status": "Success", "json_endpoint": "https://serpapi.com/searches/fake.json"},
+        "search_parameters": {k: v for k, v in params.items() if k != "api_key"},
+        "best_flights": options[:3],
+        "other_flights": options[3:],
+        "price_insights": {"lowest_price": min(o["price"] for o in options), "price_level": "typical"},
+    }
+
+
+def maps_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    rng = _rng(params)
+    query = params.get("q", "")
+    # Searches around "@lat,lon,zoom" scatter results near that point, otherwise around Hyderabad.
+    center = params.get("ll", "@17.4,78.45,14z").lstrip("@").split(",")
+    center_lat, center_lon = float(center[0]), float(center[1])
+    price_symbols = ["₹", "₹₹", "₹200–400", "₹400–600", "₹1,000+"] if "restaurant" in query else ["₹2,345", "₹3,900", "₹6,120", "₹1,850"]
+    results = []
+    for i in range(20):
+        results.append({
+            "position": i + 1,
+            "title": f"{query.split(' ')[0].title()} place {i + 1}",
+            "place_id": f"ChIJ{rng.randint(10 ** 8, 10 ** 9)}",
+            "data_id": f"0x{rng.randint(10 ** 8, 10 ** 9):x}",
+            "gps_coordinates": {"latitude": round(center_lat + rng.uniform(-0.03, 0.03), 6),
+                                "longitude": round(center_lon + rng.uniform(-0.03, 0.03), 6)},
+            "rating": round(rng.uniform(3.2, 4.9), 1),
+            "reviews": rng.randint(10, 40000),
+            "price": rng.choice(price_symbols),
+            "type": rng.choice(["Hotel", "Restaurant", "Metro station", "Bus stop"]),
+            "address": f"{rng.randint(1, 300)} Main Rd, Hyderabad, Telangana 5000{rng.randint(10, 99)}",
+            "hours": "Open ⋅ Closes 11 PM",
+            "thumbnail": "https://lh5.googleusercontent.com/p/" + "A" * 80,
+            "service_options": {"dine_in": True, "takeout": True},
+            "link": "https://www.google.com/maps/place/" + "x" * 40,
+        })
+    return {
+        "search_metadata": {"id": "fake", "status": "Success", "json_endpoint": "https://serpapi.com/searches/fake.json"},
+        "search_parameters": {k: v for k, v in params.items() if k != "api_key"},
+        "search_information": {"local_results_state": "Results for exact spelling"},
+        "local_results": results,
+    }
+
+
+def places_payload(params: Dict[str, str]) -> Dict[str, Any]:
+    rng = _rng(params)
+    rect = params.get("filter", "rect:78.2,17.6,78.7,17.1").split(":", 1)[-1].split(",")
+    lon1, lat1, lon2, lat2 = (float(v) for v in rect)
+    features = []
+    for i in range(int(params.get("limit", 10))):
+        lat = rng.uniform(min(lat1, lat2), max(lat1, lat2))
+        lon = rng.uniform(min(lon1, lon2), max(lon1, lon2))
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "name": f"Attraction {i + 1}",
+                "address_line1": f"Attraction {i + 1}",
+                "address_line2": "Hyderabad, Telangana, India",
+                "categories": ["tourism", "tourism.sights", rng.choice(["tourism.sights.fort", "entertainment.museum", "leisure.park"])],
+                "opening_hours": rng.choice(["Mo-Su 09:00-17:30", "Tu-Su 10:00-17:00", "24/7", None]),
+                "website": "https://example.org",
+                "contact": {"phone": "+91 40 0000 0000"},
+                "lat": lat,
+                "lon": lon,
+                "place_id": f"51{rng.randint(10 ** 15, 10 ** 16):x}",
+                "datasource": {"sourcename": "openstreetmap", "raw": {"osm_id": rng.randint(10 ** 6, 10 ** 9)}},
+            },
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+class _FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    upstream = ""
+    latency = DEFAULT_LATENCY_MS
+    jitter_rng = random.Random(0)
+    counts: Dict[str, int] = {}
+
+    def _route(self, path: str, params: Dict[str, str]) -> Tuple[str, Any]:
+        if self.upstream == "open_meteo":
+            if path.endswith("/v1/search"):
+                return "open_meteo", geocoding_payload(params)
+            return "open_meteo", forecast_payload(params)
+        if self.upstream == "serpapi":
+            if params.get("engine") == "google_flights":
+                return "serpapi_flights", flights_payload(params)
+            return "serpapi", maps_payload(params)
+        return "geoapify", places_payload(params)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        latency_key, payload = self._route(parsed.path, params)
+        self.counts[latency_key] = self.counts.get(latency_key, 0) + 1
+        mean, jitter = self.latency.get(latency_key, (0.0, 0.0))
+        time.sleep(max(0.0, self.jitter_rng.gauss(mean, jitter)) / 1000.0)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeUpstreams:
+    """
+    Starts one local server per upstream and exposes the environment variables
+    that point the fetchers at them.
+    """
+    def __init__(self, latency_ms: Dict[str, Tuple[float, float]] = None, seed: int = 0):
+        self.latency_ms = dict(DEFAULT_LATENCY_MS, **(latency_ms or {}))
+        self.seed = seed
+        self.servers: Dict[str, ThreadingHTTPServer] = {}
+        # Requests served per upstream (same keys as latency_ms).
+        self.counts: Dict[str, int] = {}
+
+    def start(self) -> "FakeUpstreams":
+        for upstream in ("open_meteo", "serpapi", "geoapify"):
+            handler = type(f"{upstream}_handler", (_FakeUpstreamHandler,), {
+                "upstream": upstream,
+                "latency": self.latency_ms,
+                "jitter_rng": random.Random(self.seed),
+                "counts": self.counts,
+            })
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers[upstream] = server
+        return self
+
+    def url(self, upstream: str) -> str:
+        return f"http://127.0.0.1:{self.servers[upstream].server_port}"
+
+    def environ(self) -> Dict[str, str]:
+        return {
+            "OPEN_METEO_GEOCODING_URL": self.url("open_meteo") + "/v1/search",
+            "OPEN_METEO_FORECAST_URL": self.url("open_meteo") + "/v1/forecast",
+            "SERPAPI_BASE_URL": self.url("serpapi"),
+            "GEOAPIFY_BASE_URL": self.url("geoapify"),
+            "SERPER_API_KEY": "benchmark",
+            "GEOAPIFY_API_KEY": "benchmark",
+        }
+
+    def stop(self) -> None:
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+        self.servers = {}
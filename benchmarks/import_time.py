@@ -0,0 +1,102 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the
+planner and get to a compiled graph, and how many modules it loads.
+
+    python -m benchmarks.import_time --runs 5
+    python -m benchmarks.import_time --runs 5 --compare HEAD~1
+
+--compare exports another revision with `git archive` and measures it the
+same way, so the effect of an import-time change can be read side by side.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each stage runs in its own interpreter so nothing is warm from a previous one.
+STAGES = {
+    "import_workflow": "import workflow",
+    "build_graph": "import workflow; workflow.build_graph()",
+    "first_llm_use": "from utils.llm_wrapper.llms import llm; llm.invoke",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<stage>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules)}}))
+"""
+
+
+def _environ() -> Dict[str, str]:
+    env = dict(os.environ)
+    for key in ("OPENAI_API_KEY", "GROQ_API_KEY", "GEMINI_API_KEY"):
+        env.setdefault(key, "benchmark")
+    return env
+
+
+def measure(tree: str, code: str, runs: int) -> Dict[str, Any]:
+    seconds: List[float] = []
+    modules = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(code=code)],
+            cwd=tree, env=_environ(), capture_output=True, text=True, check=True,
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        seconds.append(sample["seconds"])
+        modules = sample["modules"]
+    return {
+        "median_ms": statistics.median(seconds) * 1000.0,
+        "min_ms": min(seconds) * 1000.0,
+        "modules": modules,
+    }
+
+
+def export_revision(rev: str) -> str:
+    archive = subprocess.run(["git", "archive", rev], cwd=REPO_ROOT, capture_output=True, check=True).stdout
+    target = tempfile.mkdtemp(prefix="travel-import-")
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per stage")
+    parser.add_argument("--compare", default=None, help="git revision to measure as the baseline")
+    parser.add_argument("--output", default=None, help="optional JSON results path")
+    args = parser.parse_args(argv)
+
+    trees = {"current": REPO_ROOT}
+    if args.compare:
+        trees[args.compare] = export_revision(args.compare)
+
+    results: Dict[str, Any] = {}
+    for label, tree in trees.items():
+        results[label] = {stage: measure(tree, code, args.runs) for stage, code in STAGES.items()}
+
+    for stage in STAGES:
+        row = "  ".join(
+            f"{label}: {results[label][stage]['median_ms']:7.0f} ms ({results[label][stage]['modules']} modules)"
+            for label in trees
+        )
+        print(f"{stage:<16} {row}")
+
+    if args.output:
+        with open(os.path.abspath(args.output), "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
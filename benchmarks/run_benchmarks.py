@@ -0,0 +1,300 @@
+"""
+Offline benchmark for the travel planner.
+
+Runs every fetcher and the full build_graph pipeline against the local fake
+upstreams and fake chat model, then reports per-node and end-to-end latency
+percentiles, throughput at several concurrency levels and peak memory.
+
+    python -m benchmarks.run_benchmarks --iterations 20 --concurrency 1,4,16
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_upstreams import FakeUpstreams, DEFAULT_LATENCY_MS  # noqa: E402
+
+CITIES = [("Hyderabad", "HYD"), ("Goa", "GOI"), ("Jaipur", "JAI"), ("Kochi", "COK"), ("Varanasi", "VNS")]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Latency summary in milliseconds.
+    """
+    ms = [s * 1000.0 for s in samples]
+    return {
+        "count": len(ms),
+        "mean": sum(ms) / len(ms) if ms else 0.0,
+        "p50": percentile(ms, 50),
+        "p90": percentile(ms, 90),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else 0.0,
+    }
+
+
+def trip_input(i: int) -> Dict[str, Any]:
+    city, code = CITIES[i % len(CITIES)]
+    return {
+        "user_input": f"Plan a 2-day trip to {city}",
+        "user_input_data": {
+            "city": city,
+            "origin_city": "PAT",
+            "destination_city": code,
+            "outbound_date": "2025-07-09",
+            "return_date": "2025-07-10",
+            "num_days": 2,
+        },
+        "destination_details": {},
+    }
+
+
+def _node_timer():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class NodeTimer(BaseCallbackHandler):
+        """
+        Records wall time of each LangGraph node run via chain callbacks.
+        """
+        run_inline = True
+
+        def __init__(self):
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+            self._starts: Dict[Any, tuple] = {}
+            self._lock = threading.Lock()
+
+        def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+            node = (metadata or {}).get("langgraph_node")
+            if node and kwargs.get("name") == node:
+                with self._lock:
+                    self._starts[run_id] = (node, time.perf_counter())
+
+        def _finish(self, run_id):
+            with self._lock:
+                start = self._starts.pop(run_id, None)
+                if start is not None:
+                    self.durations[start[0]].append(time.perf_counter() - start[1])
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._finish(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._finish(run_id)
+
+    return NodeTimer()
+
+
+def bench_fetchers(iterations: int) -> Dict[str, Any]:
+    from utils.weather import get_city_coordinates, get_weather_for_city, get_weather_for_cities
+    from utils.transportation import get_flight_results, get_transportation_results, get_nearby_transport
+    from utils.hotels import get_topk_hotels
+    from utils.culinaries import get_topk_restaurants
+    from utils.attraction_spots import get_attraction_spots
+
+    fetchers: Dict[str, Callable[[int], Any]] = {
+        "geocoding": lambda i: get_city_coordinates(CITIES[i % len(CITIES)][0]),
+        "weather": lambda i: get_weather_for_city(CITIES[i % len(CITIES)][0]),
+        # Every benchmark city in one Open-Meteo request.
+        "weather_bulk": lambda i: get_weather_for_cities([city for city, _ in CITIES]),
+        "flights": lambda i: get_flight_results("PAT", CITIES[i % len(CITIES)][1], "2025-07-09", "2025-07-10"),
+        "local_transport": lambda i: get_transportation_results(17.6, 78.2, 17.1, 78.7),
+        "nearby_transport": lambda i: get_nearby_transport(17.4, 78.5, "metro station"),
+        "hotels": lambda i: get_topk_hotels(CITIES[i % len(CITIES)][0], topk=5),
+        "restaurants": lambda i: get_topk_restaurants(CITIES[i % len(CITIES)][0], topk=5),
+        "attractions": lambda i: get_attraction_spots(17.4, 78.5),
+    }
+    results = {}
+    for name, fetch in fetchers.items():
+        samples = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            fetch(i)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+    return results
+
+
+def bench_pipeline(travel_graph, iterations: int) -> Dict[str, Any]:
+    from utils.tracing import get_tracer
+    from utils.llm_wrapper.router import get_router_stats
+
+    timer = _node_timer()
+    samples = []
+    get_tracer().reset()
+    tracemalloc.start()
+    for i in range(iterations):
+        start = time.perf_counter()
+        travel_graph.invoke(trip_input(i), config={"callbacks": [timer], "max_concurrency": 8})
+        samples.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "end_to_end_ms": summarize(samples),
+        "nodes_ms": {node: summarize(durations) for node, durations in sorted(timer.durations.items())},
+        # Histogram-based span summary: upstream calls by source, LLM calls with token counts.
+        "spans": get_tracer().summary(),
+        "llm_router": get_router_stats(),
+        "peak_traced_memory_mb": peak / (1024 * 1024),
+    }
+
+
+def bench_throughput_sync(travel_graph, concurrency: int, plans: int) -> Dict[str, Any]:
+    samples = []
+
+    def run(i):
+        start = time.perf_counter()
+        travel_graph.invoke(trip_input(i), config={"max_concurrency": 8})
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, range(plans)))
+    elapsed = time.perf_counter() - start
+    return {"plans": plans, "elapsed_s": elapsed, "plans_per_s": plans / elapsed, "latency_ms": summarize(samples)}
+
+
+async def _throughput_async(travel_graph, concurrency: int, plans: int) -> Dict[str, Any]:
+    from utils.http_client import aclose_async_http_client
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def run(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await travel_graph.ainvoke(trip_input(i))
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(plans)))
+    elapsed = time.perf_counter() - start
+    await aclose_async_http_client()
+    return {"plans": plans, "elapsed_s": elapsed, "plans_per_s": plans / elapsed, "latency_ms": summarize(samples)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10, help="sequential runs per fetcher and pipeline")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--plans", type=int, default=32, help="plans per throughput level")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiply every upstream mean latency")
+    parser.add_argument("--jitter-scale", type=float, default=1.0, help="multiply every upstream jitter")
+    parser.add_argument("--llm-first-token-ms", type=float, default=500.0)
+    parser.add_argument("--llm-token-ms", type=float, default=2.0)
+    parser.add_argument("--cache", action="store_true", help="keep the upstream response cache enabled")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-API-key upstream rate limits enabled")
+    parser.add_argument("--skip-async", action="store_true")
+    parser.add_argument("--output", default=None, help="JSON results path (default: benchmarks/results/)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else os.path.join(
+        RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    latency = {
+        name: (mean * args.latency_scale, jitter * args.jitter_scale)
+        for name, (mean, jitter) in DEFAULT_LATENCY_MS.items()
+    }
+    upstreams = FakeUpstreams(latency_ms=latency).start()
+    workdir = tempfile.mkdtemp(prefix="travel-bench-")
+    os.environ.update(upstreams.environ())
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["GEOCODE_CACHE_PATH"] = os.path.join(workdir, "cache", "geocode.sqlite3")
+    os.environ["RESPONSE_CACHE_ENABLED"] = "1" if args.cache else "0"
+    os.environ["RATE_LIMIT_ENABLED"] = "1" if args.rate_limit else "0"
+    for key in ("OPENAI_API_KEY", "GROQ_API_KEY", "GEMINI_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    # Reports and PDFs land in the scratch directory, not the repository.
+    os.chdir(workdir)
+
+    from benchmarks.fake_llm import FakeChatModel, install_fake_llm
+    install_fake_llm(FakeChatModel(
+        first_token_latency=args.llm_first_token_ms / 1000.0,
+        token_latency=args.llm_token_ms / 1000.0,
+    ))
+
+    import_start = time.perf_counter()
+    from workflow import build_graph
+    import_s = time.perf_counter() - import_start
+    compile_start = time.perf_counter()
+    travel_graph = build_graph()
+    compile_s = time.perf_counter() - compile_start
+
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "upstream_latency_ms": latency,
+        "import_workflow_s": import_s,
+        "compile_graph_s": compile_s,
+    }
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["fetchers_ms"] = bench_fetchers(args.iterations)
+        results["pipeline"] = bench_pipeline(travel_graph, args.iterations)
+        results["throughput_sync"] = {
+            str(level): bench_throughput_sync(travel_graph, level, args.plans) for level in levels
+        }
+        if not args.skip_async:
+            results["throughput_async"] = {
+                str(level): asyncio.run(_throughput_async(travel_graph, level, args.plans)) for level in levels
+            }
+    from utils.singleflight import get_singleflight_stats
+    from utils.rate_limiter import get_rate_limiter_stats
+    results["upstream_requests"] = dict(upstreams.counts)
+    results["singleflight"] = get_singleflight_stats()
+    results["rate_limiters"] = get_rate_limiter_stats()
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    upstreams.stop()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    pipeline = results["pipeline"]["end_to_end_ms"]
+    print(f"end-to-end p50 {pipeline['p50']:.0f} ms, p99 {pipeline['p99']:.0f} ms")
+    for node, stats in results["pipeline"]["nodes_ms"].items():
+        print(f"  {node:<14} p50 {stats['p50']:8.1f} ms  p99 {stats['p99']:8.1f} ms")
+    for kind in ("http", "llm"):
+        for name, stats in results["pipeline"]["spans"].get(kind, {}).items():
+            print(f"  {kind}:{name:<18} p50 {stats['p50']:8.1f} ms  p99 {stats['p99']:8.1f} ms")
+    for mode in ("throughput_sync", "throughput_async"):
+        for level, stats in results.get(mode, {}).items():
+            print(f"{mode} x{level}: {stats['plans_per_s']:.2f} plans/s")
+    print(f"upstream requests {sum(results['upstream_requests'].values())}, "
+          f"coalesced {results['singleflight']['coalesced']}")
+    print(f"peak traced memory {results['pipeline']['peak_traced_memory_mb']:.1f} MB, peak RSS {results['peak_rss_mb']:.1f} MB")
+    print(f"results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
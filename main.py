@@ -1,6 +1,15 @@
-from workflow import build_graph
+import argparse
+import sys
 
-def main():
+from workflow import build_graph, stream_report_tokens, FETCH_NODES, new_plan_id, resume_config, plan_status
+from utils.checkpoints import get_checkpointer, thread_config
+from utils.tracing import span
+from utils.report_generation import wait_for_pdf
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan a trip, or resume a plan that failed.")
+    parser.add_argument("--resume", metavar="PLAN_ID", help="continue a checkpointed plan from its last completed node")
+    args = parser.parse_args(argv)
     input_state = {
         "user_input": "Plan a 2-day trip to Hyderabad",
         "user_input_data": {
@@ -13,9 +22,33 @@ def main():
         },
         "destination_details": {}
     }
-    travel_graph = build_graph()
-    result = travel_graph.invoke(input_state)
-    print(result["final_report"])
+    # State is checkpointed after every node, so a failed run can be resumed with --resume.
+    travel_graph = build_graph(checkpointer=get_checkpointer())
+    # Size the executor so every fetch agent gets its own worker, even on
+    # hosts where the default thread pool is smaller than the fan-out.
+    config = {"max_concurrency": len(FETCH_NODES)}
+    plan_id = args.resume or new_plan_id()
+    if args.resume:
+        if travel_graph.checkpointer is None or not plan_status(travel_graph, plan_id)["found"]:
+            sys.exit(f"No checkpoint for plan {plan_id}")
+        # No input: the graph picks up after the last node that completed.
+        input_state, config = None, resume_config(plan_id, config)
+    elif travel_graph.checkpointer is not None:
+        config = thread_config(plan_id, config)
+    # One root span per plan, so the node, HTTP and LLM spans share a trace id.
+    final_state = {}
+    try:
+        with span("plan", kind="plan", plan_id=plan_id):
+            for token in stream_report_tokens(travel_graph, input_state, config=config, final_state=final_state):
+                print(token, end="", flush=True)
+    except Exception as e:
+        if travel_graph.checkpointer is not None:
+            sys.exit(f"\nPlan failed: {e!r}\nResume it with: python main.py --resume {plan_id}")
+        raise
+    print()
+    pdf_path = wait_for_pdf(final_state.get("report_pdf_path"))
+    if pdf_path:
+        print(f"PDF report saved to {pdf_path}")
 
 if __name__ == "__main__":
     main()
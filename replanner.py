@@ -0,0 +1,141 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+
+from batch_planner import city_key, route_key, weather_window
+from utils.tracing import span
+from workflow import NODE_RUNNERS, TravelState, FETCH_NODES
+
+logger = logging.getLogger(__name__)
+
+# What each node's result depends on in user_input_data: the node is stale
+# when its key differs between the previous and the new input.
+NODE_INPUTS: Dict[str, Callable[[Dict[str, Any]], Hashable]] = {
+    "orchestrator": city_key,
+    "weather": lambda data: (city_key(data), weather_window(data)),
+    "hotel": city_key,
+    "flight": route_key,
+    "transport": city_key,
+    "restaurant": city_key,
+    "attraction": city_key,
+    "itinerary": lambda data: (data.get("num_days"), data.get("outbound_date")),
+}
+# Nodes whose results feed each node; a stale upstream makes its dependents stale.
+NODE_DEPENDENCIES: Dict[str, tuple] = {
+    "weather": ("orchestrator",),
+    "hotel": ("orchestrator",),
+    "transport": ("orchestrator",),
+    "restaurant": ("orchestrator",),
+    "attraction": ("orchestrator",),
+    "itinerary": ("hotel", "attraction"),
+}
+# The state key each node writes.
+NODE_OUTPUTS = {
+    "orchestrator": "destination_details",
+    "weather": "weather_info",
+    "hotel": "hotel_info",
+    "flight": "flight_info",
+    "transport": "transport_info",
+    "restaurant": "restaurant_info",
+    "attraction": "attraction_info",
+    "itinerary": "itinerary",
+    "expense": "expenses",
+    "fusion": "final_report",
+}
+# The expense report and the final report summarise everything, so they always rerun.
+ALWAYS_RERUN = ("expense", "fusion")
+# Nodes in a stage only need the stages before it, so they run in parallel.
+STAGES = (("orchestrator",), FETCH_NODES, ("itinerary", "expense"), ("fusion",))
+
+
+def stale_nodes(previous: TravelState, user_input_data: Dict[str, Any]) -> List[str]:
+    """
+    The nodes to rerun, in graph order, when previous is replanned with new user_input_data.
+    Nodes whose source was unavailable or whose result is missing rerun too.
+    """
+    old_input = previous["user_input_data"]
+    unavailable = previous.get("unavailable") or {}
+    stale: Set[str] = set()
+    for stage in STAGES:
+        for node in stage:
+            key = NODE_INPUTS.get(node)
+            if (node in ALWAYS_RERUN
+                    or (key is not None and key(old_input) != key(user_input_data))
+                    or any(dependency in stale for dependency in NODE_DEPENDENCIES.get(node, ()))
+                    or node in unavailable
+                    or NODE_OUTPUTS[node] not in previous):
+                stale.add(node)
+    return [node for stage in STAGES for node in stage if node in stale]
+
+
+def _replan_state(previous: TravelState, user_input_data: Dict[str, Any], stale: List[str]) -> TravelState:
+    state = dict(previous)
+    state["user_input_data"] = dict(user_input_data)
+    state["user_input"] = f"Plan a {user_input_data['num_days']}-day trip to {user_input_data['city']}"
+    # A new deadline starts with the replan; markers of rerun nodes are cleared.
+    state.pop("deadlines", None)
+    state["unavailable"] = {node: reason for node, reason in (previous.get("unavailable") or {}).items()
+                            if node not in stale}
+    for node in stale:
+        state.pop(NODE_OUTPUTS[node], None)
+    state.pop("report_pdf_path", None)
+    return state
+
+
+def _config(deadline_at: Optional[float]) -> Dict[str, Any]:
+    return {"configurable": {"deadline_at": deadline_at}} if deadline_at is not None else {}
+
+
+def _apply(state: TravelState, updates: List[Dict[str, Any]]) -> None:
+    for update in updates:
+        update = dict(update)
+        state["unavailable"].update(update.pop("unavailable", None) or {})
+        state.update(update)
+
+
+def replan(previous: TravelState, user_input_data: Dict[str, Any], deadline_at: Optional[float] = None,
+           max_workers: int = len(FETCH_NODES)) -> TravelState:
+    """
+    Plan again after the user edited their trip, reusing every result the edit
+    does not affect: changing the dates reruns flights, weather and the
+    itinerary; changing the origin reruns flights only; expense and the final
+    report always rerun. The rerun gets a fresh deadline (deadline_at, epoch
+    seconds, or PLAN_DEADLINE_SECONDS from now).
+    Returns the new TravelState; previous is left untouched.
+    """
+    stale = stale_nodes(previous, user_input_data)
+    state = _replan_state(previous, user_input_data, stale)
+    config = _config(deadline_at)
+    logger.info(f"Replanning {user_input_data['city']}: rerunning {', '.join(stale)}")
+    with span("replan", kind="plan", nodes=",".join(stale)), \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for stage in STAGES:
+            # Snapshot per stage so parallel nodes all read the state the stage started from;
+            # each node runs in a copy of this context to keep its span and request priority.
+            snapshot = dict(state)
+            futures = [
+                executor.submit(contextvars.copy_context().run, NODE_RUNNERS[node][0], snapshot, config)
+                for node in stage if node in stale
+            ]
+            _apply(state, [future.result() for future in futures])
+    return state
+
+
+async def areplan(previous: TravelState, user_input_data: Dict[str, Any],
+                  deadline_at: Optional[float] = None) -> TravelState:
+    """
+    Async version of replan, using the async agents on the running loop.
+    """
+    stale = stale_nodes(previous, user_input_data)
+    state = _replan_state(previous, user_input_data, stale)
+    config = _config(deadline_at)
+    logger.info(f"Replanning {user_input_data['city']}: rerunning {', '.join(stale)}")
+    with span("replan", kind="plan", nodes=",".join(stale)):
+        for stage in STAGES:
+            snapshot = dict(state)
+            _apply(state, list(await asyncio.gather(
+                *(NODE_RUNNERS[node][1](snapshot, config) for node in stage if node in stale)
+            )))
+    return state
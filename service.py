@@ -0,0 +1,372 @@
+"""
+Long-running HTTP service around the compiled travel graph.
+
+    python service.py
+
+POST /plan with a JSON body shaped like user_input_data
+({"city", "origin_city", "destination_city", "outbound_date", "return_date", "num_days"})
+returns the final report, itinerary and expenses as JSON; add ?stream=1 to get
+the report as plain text while it is being written. Every plan gets a plan_id
+(in the body, or the X-Plan-Id header when streaming); a plan that failed or ran
+out of time can be continued from its last completed node with
+POST /plan/<plan_id>/resume. GET /health reports load,
+GET /metrics exposes the tracing histograms, router and cache counters in
+Prometheus text format (?format=json for JSON).
+
+The graph is compiled and the LLM and HTTP clients are built once at startup,
+so none of that counts against a request.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from utils.env_config import get_env_variable
+from utils import tracing
+from utils.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+SERVICE_HOST = get_env_variable("SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = int(get_env_variable("SERVICE_PORT", "8080"))
+# Plans executing at once, and plans allowed to wait for a slot beyond that.
+SERVICE_CONCURRENCY = int(get_env_variable("SERVICE_CONCURRENCY", "8"))
+SERVICE_QUEUE_SIZE = int(get_env_variable("SERVICE_QUEUE_SIZE", "32"))
+# Seconds a request may take in total, queueing included; ?deadline= may only shorten it.
+SERVICE_DEADLINE_SECONDS = float(get_env_variable("SERVICE_DEADLINE_SECONDS", "120"))
+
+# Part of the deadline kept back so a plan cut short by it still gets its partial report sent.
+RESPONSE_MARGIN_SECONDS = 1.0
+
+REQUIRED_FIELDS = ("city", "origin_city", "destination_city", "outbound_date", "num_days")
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class PlanService:
+    """
+    Runs plans on one compiled graph with a bounded number running and waiting.
+    """
+    def __init__(self, concurrency: int = SERVICE_CONCURRENCY, queue_size: int = SERVICE_QUEUE_SIZE,
+                 deadline_seconds: float = SERVICE_DEADLINE_SECONDS):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.deadline_seconds = deadline_seconds
+        self.graph = None
+        self.started_at = time.time()
+        self.startup_ms: Dict[str, float] = {}
+        self.running = 0
+        self.queued = 0
+        self.counters: Dict[str, int] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> None:
+        """
+        Compile the graph and build the clients every request uses.
+        """
+        from workflow import build_graph
+        from utils.llm_wrapper.llms import get_llm
+        from utils.http_client import get_async_http_client
+        from utils.checkpoints import get_checkpointer
+
+        start = time.perf_counter()
+        # Checkpointed, so a failed plan can be resumed without refetching.
+        self.graph = build_graph(checkpointer=get_checkpointer())
+        self.startup_ms["compile_graph"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        # The router builds its provider clients lazily; build them now so the
+        # first plan does not pay for importing the provider SDKs.
+        for name in get_llm("router").providers:
+            try:
+                get_llm(name)
+            except Exception as e:
+                # The router falls through to the next provider when one cannot be built.
+                logger.warning(f"LLM provider {name} could not be built: {e}")
+        get_async_http_client()
+        self.startup_ms["warm_clients"] = (time.perf_counter() - start) * 1000
+        self._slots = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Travel planner service ready: {self.startup_ms}")
+
+    async def stop(self) -> None:
+        from utils.http_client import aclose_async_http_client
+        from utils.render_pool import get_pdf_render_pool
+
+        await aclose_async_http_client()
+        await asyncio.to_thread(get_pdf_render_pool().shutdown)
+
+    def count(self, status: str) -> None:
+        self.counters[status] = self.counters.get(status, 0) + 1
+
+    async def acquire(self) -> None:
+        """
+        Wait for a run slot, or raise ServiceBusy when the wait queue is full.
+        """
+        if self._slots.locked() and self.queued >= self.queue_size:
+            raise ServiceBusy(f"{self.running} plans running and {self.queued} queued")
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+
+    def release(self) -> None:
+        self.running -= 1
+        self._slots.release()
+
+    def deadline(self, request: web.Request) -> float:
+        try:
+            requested = float(request.query.get("deadline", self.deadline_seconds))
+        except ValueError:
+            raise web.HTTPBadRequest(text="deadline must be a number of seconds")
+        return max(0.0, min(requested, self.deadline_seconds))
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok" if self.graph is not None else "starting",
+            "running": self.running,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "startup_ms": self.startup_ms,
+            "requests": dict(self.counters),
+        }
+
+
+SERVICE = web.AppKey("service", PlanService)
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _input_state(user_input_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_input": f"Plan a {user_input_data['num_days']}-day trip to {user_input_data['city']}",
+        "user_input_data": user_input_data,
+        "destination_details": {},
+    }
+
+
+async def _read_trip(request: web.Request) -> Dict[str, Any]:
+    try:
+        data = await request.json()
+    except Exception:
+        raise web.HTTPBadRequest(text="body must be JSON")
+    if not isinstance(data, dict):
+        raise web.HTTPBadRequest(text="body must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing:
+        raise web.HTTPBadRequest(text=f"missing fields: {', '.join(missing)}")
+    try:
+        data["num_days"] = int(data["num_days"])
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text="num_days must be an integer")
+    data.setdefault("return_date", "")
+    return data
+
+
+def _run_config(deadline: float, plan_id: str) -> Dict[str, Any]:
+    from workflow import FETCH_NODES
+    from utils.checkpoints import thread_config
+
+    # The graph works to the same deadline, so slow sources are dropped and the
+    # report still arrives instead of the request timing out.
+    deadline_at = time.time() + max(deadline - RESPONSE_MARGIN_SECONDS, deadline / 2)
+    config = {"max_concurrency": len(FETCH_NODES), "configurable": {"deadline_at": deadline_at}}
+    return thread_config(plan_id, config)
+
+
+async def _execute(request: web.Request, plan_id: str, input_state: Optional[Dict[str, Any]],
+                   config: Dict[str, Any]) -> web.StreamResponse:
+    """
+    Run (or with input_state None, resume) a plan under the request's deadline and respond.
+    """
+    from workflow import astream_report_tokens
+
+    service: PlanService = request.app[SERVICE]
+    deadline = service.deadline(request)
+    stream = request.query.get("stream") in ("1", "true")
+    start = time.perf_counter()
+    final_state: Dict[str, Any] = {}
+    tokens: List[str] = []
+    run: Dict[str, Any] = {"response": None, "acquired": False, "queued_ms": 0.0}
+
+    async def execute() -> None:
+        await service.acquire()
+        run["acquired"] = True
+        try:
+            run["queued_ms"] = (time.perf_counter() - start) * 1000
+            with tracing.span("plan", kind="plan", plan_id=plan_id, queued_ms=round(run["queued_ms"], 1)):
+                async for token in astream_report_tokens(service.graph, input_state, config=config,
+                                                         final_state=final_state):
+                    if not stream:
+                        tokens.append(token)
+                        continue
+                    if run["response"] is None:
+                        run["response"] = web.StreamResponse(headers={
+                            "Content-Type": "text/plain; charset=utf-8", "X-Plan-Id": plan_id,
+                        })
+                        await run["response"].prepare(request)
+                    await run["response"].write(token.encode("utf-8"))
+        finally:
+            service.release()
+
+    try:
+        # The deadline covers waiting in the queue as well as running.
+        await asyncio.wait_for(execute(), timeout=deadline)
+    except ServiceBusy as e:
+        service.count("rejected")
+        return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+    except Exception as e:
+        response = run["response"]
+        # A timeout raised inside the graph (e.g. by an LLM client) is a failure, not our deadline.
+        timed_out = isinstance(e, DeadlineExceeded) or (
+            isinstance(e, asyncio.TimeoutError) and time.perf_counter() - start >= deadline)
+        if timed_out:
+            service.count("deadline_exceeded")
+            message = f"deadline of {deadline:g}s exceeded while {'running' if run['acquired'] else 'queued'}"
+        else:
+            logger.exception(f"Plan {plan_id} failed")
+            service.count("failed")
+            message = f"plan failed: {e!r}"
+        # Completed nodes are checkpointed; POST /plan/<plan_id>/resume reruns only the rest.
+        if response is not None:
+            await response.write(f"\n[{message}; resume plan {plan_id}]\n".encode("utf-8"))
+            return response
+        return web.json_response({"error": message, "plan_id": plan_id}, status=504 if timed_out else 500)
+
+    service.count("partial" if final_state.get("unavailable") else "ok")
+    if service.graph.checkpointer is not None:
+        await service.graph.checkpointer.adelete_thread(plan_id)
+    response = run["response"]
+    if response is not None:
+        await response.write_eof()
+        return response
+    return web.json_response({
+        "plan_id": plan_id,
+        "final_report": final_state.get("final_report") or "".join(tokens),
+        "itinerary": final_state.get("itinerary"),
+        "expenses": final_state.get("expenses"),
+        "report_pdf_path": final_state.get("report_pdf_path"),
+        "unavailable": final_state.get("unavailable") or {},
+        "queued_ms": round(run["queued_ms"], 1),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }, dumps=_dumps)
+
+
+async def plan(request: web.Request) -> web.StreamResponse:
+    from workflow import new_plan_id
+
+    service: PlanService = request.app[SERVICE]
+    trip = await _read_trip(request)
+    plan_id = new_plan_id()
+    return await _execute(request, plan_id, _input_state(trip), _run_config(service.deadline(request), plan_id))
+
+
+async def resume(request: web.Request) -> web.StreamResponse:
+    service: PlanService = request.app[SERVICE]
+    plan_id = request.match_info["plan_id"]
+    if service.graph.checkpointer is None:
+        raise web.HTTPNotFound(text="checkpoints are disabled")
+    snapshot = await service.graph.aget_state({"configurable": {"thread_id": plan_id}})
+    if not snapshot.values:
+        raise web.HTTPNotFound(text=f"no checkpoint for plan {plan_id}")
+    # Input None continues from the last completed node, with a fresh deadline.
+    return await _execute(request, plan_id, None, _run_config(service.deadline(request), plan_id))
+
+
+async def health(request: web.Request) -> web.Response:
+    service: PlanService = request.app[SERVICE]
+    body = service.health()
+    return web.json_response(body, status=200 if body["status"] == "ok" else 503)
+
+
+def _metric_lines(service: PlanService) -> List[str]:
+    from utils.llm_wrapper.router import get_router_stats
+    from utils.singleflight import get_singleflight_stats
+    from utils.rate_limiter import get_rate_limiter_stats
+
+    lines = [
+        "# TYPE travel_service_running gauge",
+        f"travel_service_running {service.running}",
+        "# TYPE travel_service_queued gauge",
+        f"travel_service_queued {service.queued}",
+        "# TYPE travel_service_requests_total counter",
+    ]
+    lines += [f'travel_service_requests_total{{status="{status}"}} {value}'
+              for status, value in sorted(service.counters.items())]
+    flights = get_singleflight_stats()
+    lines += [
+        "# TYPE travel_upstream_calls_total counter",
+        f"travel_upstream_calls_total {flights['calls']}",
+        "# TYPE travel_upstream_coalesced_total counter",
+        f"travel_upstream_coalesced_total {flights['coalesced']}",
+    ]
+    limiters = get_rate_limiter_stats()
+    for name, kind in (("limit", "gauge"), ("queued", "gauge"), ("throttled", "counter")):
+        lines.append(f"# TYPE travel_rate_limiter_{name} {kind}")
+        lines += [f'travel_rate_limiter_{name}{{limiter="{limiter}"}} {stats[name]}'
+                  for limiter, stats in limiters.items()]
+    router = get_router_stats()
+    for name, kind in (("calls", "counter"), ("errors", "counter"), ("hedge_wins", "counter"), ("ewma_ms", "gauge")):
+        lines.append(f"# TYPE travel_llm_provider_{name} {kind}")
+        lines += [f'travel_llm_provider_{name}{{provider="{provider}"}} {stats[name]}'
+                  for provider, stats in router.items() if stats.get(name) is not None]
+    return lines
+
+
+async def metrics(request: web.Request) -> web.Response:
+    service: PlanService = request.app[SERVICE]
+    if request.query.get("format") == "json":
+        from utils.llm_wrapper.router import get_router_stats
+        from utils.llm_cache import get_llm_cache
+        from utils.response_cache import get_response_cache
+        from utils.render_pool import get_pdf_render_pool
+        from utils.singleflight import get_singleflight_stats
+        from utils.rate_limiter import get_rate_limiter_stats
+
+        llm_cache = get_llm_cache()
+        return web.json_response({
+            "service": service.health(),
+            "spans": tracing.get_trace_summary(),
+            "llm_router": get_router_stats(),
+            "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+            "response_cache": get_response_cache().stats(),
+            "singleflight": get_singleflight_stats(),
+            "rate_limiters": get_rate_limiter_stats(),
+            "pdf_render_pool": get_pdf_render_pool().stats(),
+        }, dumps=_dumps)
+    text = tracing.render_metrics().rstrip("\n") + "\n" + "\n".join(_metric_lines(service)) + "\n"
+    return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+
+def create_app(service: Optional[PlanService] = None) -> web.Application:
+    service = service or PlanService()
+    app = web.Application()
+    app[SERVICE] = service
+
+    async def on_startup(app: web.Application) -> None:
+        await service.start()
+
+    async def on_cleanup(app: web.Application) -> None:
+        await service.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/plan", plan)
+    app.router.add_post("/plan/{plan_id}/resume", resume)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(create_app(), host=SERVICE_HOST, port=SERVICE_PORT)
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils import deadline
+from utils.http_client import HTTPClient
+
+
+def test_no_deadline_leaves_timeouts_alone():
+    assert deadline.remaining() is None
+    assert not deadline.expired()
+    assert deadline.allows(1e9)
+    assert deadline.timeout(10) == 10
+
+
+def test_scope_cuts_timeouts_and_earlier_deadline_wins():
+    with deadline.scope(time.time() + 1):
+        assert deadline.timeout(10) <= 1
+        with deadline.scope(time.time() + 60):
+            assert deadline.remaining() <= 1
+        assert not deadline.allows(5)
+    assert deadline.remaining() is None
+
+
+def test_spent_budget_raises_before_sending():
+    with deadline.scope(time.time() - 1):
+        assert deadline.expired()
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.timeout(10)
+
+
+def test_plan_deadlines_keep_a_reserve_for_the_report():
+    deadlines = deadline.plan_deadlines(deadline_at=1100.0, now=1000.0)
+    assert deadlines["plan"] == 1100.0
+    assert deadlines["fetch"] == 1100.0 - min(deadline.PLAN_REPORT_RESERVE_SECONDS, 50.0)
+    # A short budget keeps at least half of it for fetching.
+    assert deadline.plan_deadlines(deadline_at=1004.0, now=1000.0)["fetch"] == 1002.0
+
+
+def test_failures_are_tracked_by_reason():
+    with deadline.track_failures() as failures:
+        deadline.record_failure(ValueError("bad"))
+        assert deadline.unavailable_reason(failures) == deadline.UNAVAILABLE_ERROR
+        deadline.record_failure(TimeoutError())
+    assert deadline.unavailable_reason(failures) == deadline.UNAVAILABLE_DEADLINE
+    # Outside a node nothing is collected.
+    deadline.record_failure(ValueError("ignored"))
+
+
+def test_abounded_stops_quietly_at_the_deadline():
+    closed = []
+
+    async def tokens():
+        try:
+            for i in range(100):
+                await asyncio.sleep(0.05)
+                yield i
+        finally:
+            closed.append(True)
+
+    async def collect():
+        with deadline.scope(time.time() + 0.2):
+            return [token async for token in deadline.abounded(tokens())]
+
+    start = time.perf_counter()
+    received = asyncio.run(collect())
+    assert 0 < len(received) < 10
+    assert time.perf_counter() - start < 0.5
+    assert closed == [True]
+
+
+class _Unavailable(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Unavailable)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_stop_when_backoff_would_overrun_the_deadline(unavailable_url):
+    client = HTTPClient(max_retries=5, backoff_factor=0.2)
+    start = time.perf_counter()
+    with deadline.scope(time.time() + 0.5):
+        with pytest.raises(requests.HTTPError):
+            client.get_json(unavailable_url)
+    # 0.2s + 0.4s of backoff would end past the deadline, so only the first sleep happens.
+    assert time.perf_counter() - start < 0.5
+    client.close()
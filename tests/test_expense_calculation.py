@@ -0,0 +1,165 @@
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils import deadline
+from utils import expense_calculation
+from utils.expense_calculation import (
+    DEFAULT_ATTRACTION_TICKET, DEFAULT_HOTEL_NIGHTLY, DEFAULT_MEAL_PRICE,
+    DEFAULT_TRANSPORT_PER_DAY, HOTEL_PRICE_LEVELS, MEAL_PRICE_LEVELS, MEALS_PER_DAY,
+    ExpenseCalculator, calculate_expenses, format_expense_report, parse_price, price_level,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("₹800–1,200", (1000.0, "INR")),
+    ("₹200-₹400", (300.0, "INR")),
+    ("2.5K", (2500.0, "INR")),
+    ("₹1.2K", (1200.0, "INR")),
+    ("₹1,20,000", (120000.0, "INR")),
+    ("Rs. 5,400", (5400.0, "INR")),
+    ("$10–20", (15.0, "USD")),
+    ("US$ 120", (120.0, "USD")),
+    ("€45", (45.0, "EUR")),
+    (5400, (5400.0, "INR")),
+    (99.5, (99.5, "INR")),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+
+@pytest.mark.parametrize("value", [None, True, "", "Free", "₹₹", {"price": 10}])
+def test_parse_price_without_an_amount(value):
+    assert parse_price(value) is None
+
+
+def test_parse_price_uses_the_default_currency_for_bare_numbers():
+    assert parse_price("1,500", default_currency="USD") == (1500.0, "USD")
+
+
+@pytest.mark.parametrize("value, level", [
+    ("$$", 2), ("₹₹₹", 3), ("€", 1), ("££££", 4),
+    ("₹200", 0), ("", 0), (None, 0), (2, 0),
+])
+def test_price_level(value, level):
+    assert price_level(value) == level
+
+
+def _calculator(**overrides):
+    sources = dict(
+        currency="INR",
+        num_days=3,
+        flight_info=[{"price": "₹5,400"}, {"price": 4200}, {"price": None}, "not a record"],
+        hotel_info=[{"price_range": "₹2,000–4,000"}, {"price_range": "$$"}],
+        transport_info={"routes": []},
+        restaurant_info=[{"avg_meal_price": "₹200-₹400"}, {"avg_meal_price": "₹₹"}],
+        attraction_info=[{"price": "₹100"}, {"ticket_price": 300}, {"title": "Park"}],
+    )
+    sources.update(overrides)
+    return ExpenseCalculator(**sources)
+
+
+def test_compute_breakdown():
+    expenses = _calculator().compute()
+    assert expenses["breakdown"] == {
+        "flight": 4200,
+        "transportation": round(DEFAULT_TRANSPORT_PER_DAY * 3),
+        "food": round((300 + MEAL_PRICE_LEVELS[2]) / 2 * MEALS_PER_DAY * 3),
+        "hotel": round((3000 + HOTEL_PRICE_LEVELS[2]) / 2 * 3),
+        "attractions": round(200 * 3),
+    }
+    assert expenses["total"] == sum(expenses["breakdown"].values())
+    assert expenses["per_day"] == round(expenses["total"] / 3)
+    assert expenses["assumptions"] == ["Local transport estimated at a flat daily rate."]
+
+
+def test_compute_is_deterministic():
+    calculator = _calculator()
+    first = calculator.compute()
+    assert calculator.compute() == first
+    assert _calculator().compute() == first
+
+
+def test_compute_falls_back_to_defaults_without_prices():
+    expenses = _calculator(
+        num_days=2,
+        flight_info={"error": "no flights"},
+        hotel_info=[{"name": "Hotel"}],
+        restaurant_info=[],
+        attraction_info=[{"title": "Fort"}],
+    ).compute()
+    assert expenses["breakdown"] == {
+        "flight": 0,
+        "transportation": round(DEFAULT_TRANSPORT_PER_DAY * 2),
+        "food": round(DEFAULT_MEAL_PRICE * MEALS_PER_DAY * 2),
+        "hotel": round(DEFAULT_HOTEL_NIGHTLY * 2),
+        "attractions": round(DEFAULT_ATTRACTION_TICKET),
+    }
+    assert len(expenses["assumptions"]) == 5
+
+
+def test_compute_converts_other_currencies():
+    expenses = _calculator(currency="USD", flight_info=[{"price": "₹8,300"}]).compute()
+    assert expenses["breakdown"]["flight"] == 100
+
+
+def test_num_days_is_at_least_one():
+    assert _calculator(num_days=0).compute()["num_days"] == 1
+
+
+def test_format_expense_report():
+    report = format_expense_report("Goa", _calculator().compute())
+    assert report.startswith("Expense Report for Goa (1 person, 3 day(s), INR)")
+    assert "Flight Cost: INR 4,200" in report
+    assert "Assumptions:\n- Local transport estimated at a flat daily rate." in report
+
+
+class _FakeRouter:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.reply)
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+def _report(use_llm=None):
+    calculator = _calculator()
+    return calculate_expenses(
+        city_name="Goa",
+        currency=calculator.currency,
+        num_days=calculator.num_days,
+        flight_info=calculator.flight_info,
+        hotel_info=calculator.hotel_info,
+        transport_info=calculator.transport_info,
+        restaurant_info=calculator.restaurant_info,
+        attraction_info=calculator.attraction_info,
+        use_llm=use_llm,
+    )
+
+
+def test_report_skips_the_llm_by_default(monkeypatch):
+    router = _FakeRouter(reply="narrative")
+    monkeypatch.setattr(expense_calculation, "llm_router", router)
+    assert _report() == format_expense_report("Goa", _calculator().compute())
+    assert router.calls == 0
+
+
+def test_narrative_flag_uses_the_llm(monkeypatch):
+    router = _FakeRouter(reply="narrative")
+    monkeypatch.setattr(expense_calculation, "llm_router", router)
+    monkeypatch.setattr(expense_calculation, "EXPENSE_LLM_NARRATIVE", True)
+    assert _report() == "narrative"
+    assert router.calls == 1
+
+
+def test_narrative_falls_back_to_the_calculator_on_deadline(monkeypatch):
+    monkeypatch.setattr(expense_calculation, "llm_router",
+                        _FakeRouter(error=deadline.DeadlineExceeded("out of time")))
+    assert _report(use_llm=True) == format_expense_report("Goa", _calculator().compute())
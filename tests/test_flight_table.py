@@ -0,0 +1,66 @@
+import numpy as np
+
+from utils.flight_table import FlightTable, rank_flights
+
+
+def _flight(price, duration, stops, airline="IndiGo", departure="2026-10-20 06:00"):
+    return {"price": price, "total_duration": duration, "stops": stops,
+            "airline": airline, "departure_time": departure}
+
+
+FLIGHTS = [
+    _flight(5000, 300, 1),                   # 0: dominated by 2
+    _flight(4000, 240, 1),                   # 1: cheapest
+    _flight(4500, 120, 0, "Air India"),      # 2: fastest, non-stop
+    _flight(9000, 120, 0, "Air India"),      # 3: dominated by 2
+    _flight(None, 90, 2),                    # 4: unknown price, quickest
+]
+
+
+def _names(table, indices):
+    return [FLIGHTS.index(table.records[i]) for i in indices]
+
+
+def test_rankings():
+    table = FlightTable.from_records(FLIGHTS)
+    assert _names(table, table.order("cheapest")) == [1, 2, 0, 3, 4]
+    assert _names(table, table.order("fastest")) == [4, 2, 3, 1, 0]
+    assert _names(table, table.order("fewest_stops")) == [2, 3, 1, 0, 4]
+    assert _names(table, table.order("cheapest", 2)) == [1, 2]
+
+
+def test_pareto_front():
+    table = FlightTable.from_records(FLIGHTS)
+    assert _names(table, table.pareto_front()) == [1, 2, 4]
+    assert _names(table, table.top_indices(4, "pareto")) == [1, 2, 4, 0]
+
+
+def test_unknown_stops_rank_last():
+    flights = [_flight(3000, 200, None), _flight(3000, 200, 1), {"price": 3500, "total_duration": 200}]
+    table = FlightTable.from_records(flights)
+    assert np.isinf(table._key("stops")[0]) and np.isinf(table._key("stops")[2])
+    assert list(table.order("fewest_stops")) == [1, 0, 2]
+    # The flight with one known stop dominates the same flight with unknown stops.
+    assert list(table.pareto_front()) == [1]
+    assert len(table.filter(max_stops=3)) == 1
+
+
+def test_filter_and_concat():
+    table = FlightTable.concat([FlightTable.from_records(FLIGHTS[:2]), FlightTable.from_records(FLIGHTS[2:])])
+    assert len(table) == len(FLIGHTS)
+    assert [r["price"] for r in table.filter(max_price=4600).records] == [4000, 4500]
+    assert table.filter(airlines=["Air India"]).records == FLIGHTS[2:4]
+    assert len(table.filter(depart_after="2026-10-20 07:00")) == 0
+    assert len(FlightTable.concat([])) == 0
+
+
+def test_rank_flights_projects_serpapi_options():
+    option = {"price": 4200, "total_duration": 130, "layovers": [],
+              "flights": [{"airline": "IndiGo",
+                           "departure_airport": {"id": "PAT", "time": "2026-10-20 06:00"},
+                           "arrival_airport": {"id": "GOI", "time": "2026-10-20 08:10"}}]}
+    assert rank_flights([option, "junk"], n=1) == [{
+        "price": 4200, "airline": "IndiGo", "from": "PAT", "to": "GOI",
+        "departure_time": "2026-10-20 06:00", "arrival_time": "2026-10-20 08:10",
+        "total_duration": 130, "stops": 0,
+    }]
@@ -0,0 +1,68 @@
+import asyncio
+import socket
+import time
+
+import aiohttp
+import pytest
+import requests
+
+from utils import deadline
+from utils.http_client import AsyncHTTPClient, HTTPClient
+
+
+@pytest.fixture
+def refused_url():
+    # A port that was just free: connecting to it is refused.
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+class _Slot:
+    def __init__(self):
+        self.retries = []
+
+    def retry(self, delay):
+        self.retries.append(delay)
+
+    async def aretry(self, delay):
+        self.retries.append(delay)
+
+
+def test_sync_client_retries_connection_errors(refused_url):
+    client = HTTPClient(max_retries=2, backoff_factor=0.01)
+    slot = _Slot()
+    with pytest.raises(requests.ConnectionError):
+        client.get_json(refused_url, slot=slot)
+    assert slot.retries == [0.01, 0.02]
+    client.close()
+
+
+def test_async_client_retries_connection_errors(refused_url):
+    async def fetch(slot):
+        client = AsyncHTTPClient(max_retries=2, backoff_factor=0.01)
+        try:
+            await client.get_json(refused_url, slot=slot)
+        finally:
+            await client.close()
+
+    slot = _Slot()
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(fetch(slot))
+    assert slot.retries == [0.01, 0.02]
+
+
+def test_async_connection_retries_stop_at_the_deadline(refused_url):
+    async def fetch():
+        client = AsyncHTTPClient(max_retries=5, backoff_factor=0.2)
+        try:
+            with deadline.scope(time.time() + 0.5):
+                await client.get_json(refused_url)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(fetch())
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,71 @@
+from utils import itinerary
+from utils.itinerary import cluster, distance_matrix, parse_opening_hours, plan_itinerary
+
+
+def _spot(name, lat, lon, opening_hours=None):
+    return {"name": name, "lat": lat, "lon": lon, "opening_hours": opening_hours}
+
+
+def _names(plan):
+    return [[stop["name"] for stop in day["stops"]] for day in plan["days"]]
+
+
+def test_parse_opening_hours():
+    hours = parse_opening_hours("Mo-Fr 09:00-17:00; Sa 10:00-14:00,16:00-18:00; Su off")
+    assert hours[0] == hours[4] == [(540, 1020)]
+    assert hours[5] == [(600, 840), (960, 1080)]
+    assert hours[6] == []
+    assert parse_opening_hours("24/7")[3] == [(0, 1440)]
+    assert parse_opening_hours("18:00-02:00")[2] == [(1080, 1440)]
+    assert parse_opening_hours("Mo-Fr 09:00-17:00; PH off") is None
+    assert parse_opening_hours("Not available") is None
+
+
+def test_distance_matrix_and_clusters():
+    matrix = distance_matrix([15.50, 15.50, 15.60], [73.80, 73.81, 73.80])
+    assert matrix[0, 0] == 0.0
+    assert abs(matrix[0, 1] - 1.07) < 0.05
+    assert abs(matrix[0, 2] - 11.12) < 0.05
+    labels = cluster([15.50, 15.501, 15.60, 15.601], [73.80, 73.80, 73.80, 73.80], 2)
+    assert labels[0] == labels[1] != labels[2] == labels[3]
+
+
+def test_days_follow_clusters_and_opening_days():
+    spots = [
+        _spot("North A", 15.60, 73.80), _spot("North B", 15.601, 73.80),
+        _spot("South A", 15.40, 73.80, "Mo 09:00-18:00; Tu-Su off"), _spot("South B", 15.401, 73.80),
+    ]
+    # 2026-10-19 is a Monday.
+    plan = plan_itinerary(spots, num_days=2, start_date="2026-10-19")
+    assert [day["date"] for day in plan["days"]] == ["2026-10-19", "2026-10-20"]
+    assert sorted(_names(plan)[0]) == ["South A", "South B"]
+    assert sorted(_names(plan)[1]) == ["North A", "North B"]
+    assert plan["unplaced"] == []
+
+
+def test_spots_without_coordinates_are_unplaced():
+    plan = plan_itinerary([_spot("Fort", 15.5, 73.8), {"name": "Somewhere"}], num_days=1)
+    assert _names(plan) == [["Fort"]]
+    assert plan["unplaced"] == ["Somewhere"]
+    assert plan["base"]["name"] == "City centre"
+
+
+def test_duplicate_spots_are_all_accounted_for():
+    spot = _spot("Beach", 15.5, 73.8)
+    plan = plan_itinerary([spot, dict(spot), {"name": "Beach"}, {"name": "Beach"}], num_days=2)
+    assert _names(plan) == [["Beach"], ["Beach"]]
+    assert plan["unplaced"] == ["Beach", "Beach"]
+
+
+def test_days_are_capped():
+    spots = [_spot(f"Spot {i}", 15.5 + i * 0.001, 73.8) for i in range(12)]
+    plan = plan_itinerary(spots, num_days=1)
+    assert len(plan["days"][0]["stops"]) <= itinerary.MAX_STOPS_PER_DAY
+    assert len(plan["days"][0]["stops"]) + len(plan["unplaced"]) == 12
+    assert all(stop["leave"] <= "20:00" for stop in plan["days"][0]["stops"])
+
+
+def test_no_spots_gives_empty_days():
+    plan = plan_itinerary([], num_days=2, start_date="not a date")
+    assert plan["days"] == [{"day": 1, "date": None, "total_km": 0.0, "stops": []},
+                            {"day": 2, "date": None, "total_km": 0.0, "stops": []}]
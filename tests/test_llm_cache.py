@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+from utils.llm_cache import LLMResponseCache, astream_with_cache, is_cached, stream_with_cache
+from utils.response_cache import TieredCache
+
+PROMPT = [HumanMessage("Summarise the trip expenses")]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(TieredCache(str(tmp_path / "llm.sqlite3"), table="llm_responses"))
+
+
+def _text(chunks):
+    return "".join(chunk if isinstance(chunk, str) else chunk.content for chunk in chunks)
+
+
+@pytest.mark.parametrize("model_class", [FakeListChatModel, FakeStreamingListLLM])
+def test_invoke_is_answered_from_the_cache(cache, model_class):
+    model = model_class(responses=["first", "second"], cache=cache)
+    assert not is_cached(model, PROMPT)
+    first = model.invoke(PROMPT)
+    assert is_cached(model, PROMPT)
+    assert _text([model.invoke(PROMPT)]) == _text([first]) == "first"
+    assert cache.stats()["hits"] == 1
+    # A different prompt or stop sequence is a different entry.
+    assert not is_cached(model, [HumanMessage("Something else")])
+    assert not is_cached(model, PROMPT, stop=["\n"])
+
+
+@pytest.mark.parametrize("model_class", [FakeListChatModel, FakeStreamingListLLM])
+def test_streams_are_stored_and_replayed(cache, model_class):
+    model = model_class(responses=["streamed answer", "fresh answer"], cache=cache)
+    assert _text(stream_with_cache(model, PROMPT)) == "streamed answer"
+    assert is_cached(model, PROMPT)
+    assert _text(stream_with_cache(model, PROMPT)) == "streamed answer"
+    assert _text([model.invoke(PROMPT)]) == "streamed answer"
+
+
+def test_async_streams_are_stored_and_replayed(cache):
+    model = FakeStreamingListLLM(responses=["async answer", "fresh answer"], cache=cache)
+
+    async def collect():
+        return _text([chunk async for chunk in astream_with_cache(model, PROMPT)])
+
+    assert asyncio.run(collect()) == "async answer"
+    assert asyncio.run(collect()) == "async answer"
+
+
+def test_providers_do_not_share_entries(cache):
+    chat = FakeListChatModel(responses=["from chat"], cache=cache)
+    completion = FakeStreamingListLLM(responses=["from completion"], cache=cache)
+    chat.invoke(PROMPT)
+    assert not is_cached(completion, PROMPT)
+    assert completion.invoke(PROMPT) == "from completion"
+
+
+def test_models_without_the_cache_stream_directly():
+    model = FakeStreamingListLLM(responses=["plain"])
+    assert not is_cached(model, PROMPT)
+    assert _text(stream_with_cache(model, PROMPT)) == "plain"
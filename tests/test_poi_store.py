@@ -0,0 +1,87 @@
+import pytest
+
+from utils.poi_store import (
+    POIStore, by_distance, by_rating, cell_size, geohash, grid_cells, haversine_m, radius_bbox,
+)
+
+# About 30 x 30 km around Panaji and a box inside it, several 5 km grid cells each.
+AREA = (73.70, 15.35, 74.00, 15.65)
+INSIDE = (73.78, 15.43, 73.92, 15.57)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return POIStore(str(tmp_path / "poi.sqlite3"))
+
+
+def _place(place_id, lat, lon, **fields):
+    return {"place_id": place_id, "lat": lat, "lon": lon, "name": place_id, **fields}
+
+
+def test_geohash():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(15.5, 73.8, 5) == geohash(15.5001, 73.8001, 5)
+    height, width = cell_size(5)
+    assert height == pytest.approx(180 / 4096) and width == pytest.approx(360 / 8192)
+
+
+def test_grid_cells_cover_the_box():
+    cells = grid_cells(AREA, 5)
+    inside = grid_cells(AREA, 5, inside_only=True)
+    assert set(inside) < set(cells)
+    assert geohash(15.5, 73.83, 5) in inside
+    assert len(set(cells)) == len(cells)
+
+
+def test_distances():
+    assert haversine_m(15.5, 73.8, 15.5, 73.8) == 0
+    assert haversine_m(15.5, 73.8, 15.6, 73.8) == pytest.approx(11119, rel=0.01)
+    west, south, east, north = radius_bbox(15.5, 73.8, 1000)
+    assert north - 15.5 == pytest.approx(15.5 - south)
+    assert east - west > north - south
+
+
+def test_orderings():
+    places = [_place("a", 15.5, 73.8, rating=4.1, reviews=10), _place("b", 15.6, 73.8, rating=4.5),
+              _place("c", 15.52, 73.8, rating=4.1, reviews=90), {"place_id": "d", "rating": 5}]
+    assert [p["place_id"] for p in by_rating(places)] == ["d", "b", "c", "a"]
+    assert [p["place_id"] for p in by_distance(places, 15.5, 73.8)] == ["a", "c", "b", "d"]
+
+
+def test_unfetched_area_misses(store):
+    assert store.lookup_bbox("hotels", AREA, ttl=60) is None
+    assert store.stats()["misses"] == 1
+
+
+def test_complete_fetch_answers_later_queries(store):
+    store.merge("hotels", AREA, [_place("h1", 15.50, 73.83), _place("h2", 15.36, 73.71)], complete=True)
+    assert [p["place_id"] for p in store.lookup_bbox("hotels", INSIDE, ttl=60)] == ["h1"]
+    near = store.lookup_radius("hotels", 15.50, 73.83, 2000, ttl=60)
+    assert [p["place_id"] for p in near] == ["h1"]
+    # Other layers and expired coverage still miss.
+    assert store.lookup_bbox("restaurants", INSIDE, ttl=60) is None
+    assert store.lookup_bbox("hotels", INSIDE, ttl=-1) is None
+
+
+def test_truncated_fetch_needs_enough_places(store):
+    store.merge("hotels", AREA, [_place("h1", 15.50, 73.83)], complete=False)
+    assert store.lookup_bbox("hotels", INSIDE, ttl=60, min_results=2) is None
+    assert store.lookup_bbox("hotels", INSIDE, ttl=60, min_results=1) is not None
+
+
+def test_merge_upserts_by_place_id(store):
+    store.merge("hotels", AREA, [_place("h1", 15.50, 73.83, rating=3.9)], complete=True)
+    store.merge("hotels", AREA, [_place("h1", 15.50, 73.83, rating=4.4), {"place_id": "x"}], complete=True)
+    assert store.places("hotels", AREA, ttl=60) == [_place("h1", 15.50, 73.83, rating=4.4)]
+    assert store.stats()["places"] == 1
+
+
+def test_stale_areas_cover_only_the_unfetched_part(store):
+    assert store.stale_areas("hotels", AREA, ttl=60) == []
+    west, south, east, north = AREA
+    store.merge("hotels", (west, south, (west + east) / 2, north), [], complete=True)
+    areas = store.stale_areas("hotels", AREA, ttl=60)
+    assert areas
+    assert all(area[0] >= (west + east) / 2 - cell_size(5)[1] for area in areas)
+    store.merge("hotels", AREA, [], complete=True)
+    assert store.stale_areas("hotels", AREA, ttl=60) == []
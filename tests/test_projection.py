@@ -0,0 +1,115 @@
+import json
+
+from utils.projection import (
+    compact_json, project_attractions, project_flight, project_flights, project_hotels,
+    project_itinerary, project_restaurants, project_transport, project_weather,
+)
+
+SERPAPI_FLIGHT = {
+    "price": 5400,
+    "total_duration": 190,
+    "type": "One way",
+    "carbon_emissions": {"this_flight": 120000},
+    "layovers": [{"id": "BOM", "duration": 60}],
+    "flights": [
+        {
+            "airline": "IndiGo",
+            "flight_number": "6E 101",
+            "departure_airport": {"id": "PAT", "time": "2026-10-20 06:00"},
+            "arrival_airport": {"id": "BOM", "time": "2026-10-20 08:10"},
+        },
+        {
+            "airline": "IndiGo",
+            "flight_number": "6E 202",
+            "departure_airport": {"id": "BOM", "time": "2026-10-20 09:10"},
+            "arrival_airport": {"id": "GOI", "time": "2026-10-20 10:10"},
+        },
+    ],
+}
+
+
+def test_compact_json_has_no_padding():
+    assert compact_json({"a": [1, 2], "city": "Pune"}) == '{"a":[1,2],"city":"Pune"}'
+    assert compact_json({"price": "₹500"}) == '{"price":"₹500"}'
+
+
+def test_project_flight_keeps_prompt_fields():
+    assert project_flight(SERPAPI_FLIGHT) == {
+        "price": 5400,
+        "airline": "IndiGo",
+        "from": "PAT",
+        "to": "GOI",
+        "departure_time": "2026-10-20 06:00",
+        "arrival_time": "2026-10-20 10:10",
+        "total_duration": 190,
+        "stops": 1,
+        "flight_numbers": ["6E 101", "6E 202"],
+    }
+
+
+def test_projected_flights_pass_through_and_are_limited():
+    projected = project_flight(SERPAPI_FLIGHT)
+    assert project_flight(projected) == projected
+    assert len(project_flights([SERPAPI_FLIGHT] * 8)) == 5
+    assert project_flights({"error": "no flights"}) == []
+
+
+def test_placeholders_are_dropped():
+    hotels = [{"name": "Sea View", "price_range": "₹3,000", "rating": "Not available",
+               "address": "", "description": "long text"}]
+    assert project_hotels(hotels) == [{"name": "Sea View", "price": "₹3,000"}]
+    restaurants = [{"name": "Thali", "meals_available": [], "avg_meal_price": "₹₹"}, "junk"]
+    assert project_restaurants(restaurants) == [{"name": "Thali", "price": "₹₹"}]
+
+
+def test_project_attractions_keeps_specific_categories():
+    spots = [{"name": "Fort", "categories": ["tourism", "tourism.sights", "tourism.sights.castle"],
+              "opening_hours": "9-5", "address": "Hill Rd", "lat": 1.0}]
+    assert project_attractions(spots) == [{
+        "name": "Fort",
+        "categories": ["tourism.sights", "tourism.sights.castle"],
+        "opening_hours": "9-5",
+        "address": "Hill Rd",
+    }]
+    assert project_attractions(spots, details=False) == [
+        {"name": "Fort", "categories": ["tourism.sights", "tourism.sights.castle"]}
+    ]
+
+
+def test_project_itinerary_one_line_per_stop():
+    itinerary = {
+        "base": {"name": "Sea View"},
+        "days": [{"day": 1, "date": "2026-10-20", "total_km": 4.2, "stops": [
+            {"name": "Fort", "arrive": "09:10", "leave": "10:40", "status": "closes_early"},
+            {"name": "Beach", "arrive": "11:00", "leave": "12:30"},
+        ]}],
+        "unplaced": [],
+    }
+    assert project_itinerary(itinerary) == {
+        "start_from": "Sea View",
+        "days": [{"day": 1, "date": "2026-10-20", "km": 4.2, "stops": [
+            "Fort 09:10-10:40 (closes before the visit ends)",
+            "Beach 11:00-12:30",
+        ]}],
+    }
+    assert project_itinerary(None) is None
+
+
+def test_project_transport_drops_search_metadata():
+    response = {"search_metadata": {"id": "x"},
+                "local_results": [{"title": "Bus Stand", "type": "Bus station", "gps": {}}]}
+    assert project_transport(response) == [{"name": "Bus Stand", "type": "Bus station"}]
+    assert project_transport({"place_results": {"title": "Station"}}) == [{"name": "Station"}]
+    assert project_transport("error") == []
+
+
+def test_project_weather():
+    weather = {"summary": "Sunny", "location": {"lat": 1}, "daily_forecast": [
+        {"date": "2026-10-20", "min_temperature": 21, "max_temperature": 30,
+         "precipitation": 0, "weather_description": "Clear", "wind": 3},
+    ]}
+    assert project_weather(weather) == {"summary": "Sunny", "daily": [
+        {"date": "2026-10-20", "min": 21, "max": 30, "precip": 0, "desc": "Clear"},
+    ]}
+    assert project_weather({"error": "timeout", "extra": 1}) == {"error": "timeout"}
+    assert json.loads(compact_json(project_weather(weather)))["summary"] == "Sunny"
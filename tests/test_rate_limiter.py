@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import deadline
+from utils.rate_limiter import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, Limiter, get_limiter, request_priority,
+)
+
+
+def test_burst_then_rate():
+    limiter = Limiter("test", rate=20, burst=2)
+    start = time.perf_counter()
+    for _ in range(4):
+        with limiter.slot():
+            pass
+    # Two requests go at once, the next two wait for a token each (50 ms apart).
+    assert 0.08 <= time.perf_counter() - start < 0.5
+    assert limiter.stats()["granted"] == 4
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_limit():
+    limiter = Limiter("test", rate=1000, burst=100, max_concurrency=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request():
+        with limiter.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+
+def test_throttling_halves_the_limit_and_pauses_the_bucket():
+    limiter = Limiter("test", rate=10, burst=5, max_concurrency=8)
+    with limiter.slot() as slot:
+        slot.throttled(retry_after=0.2)
+    assert limiter.limit == 4
+    assert limiter.tokens < -1.9
+    start = time.perf_counter()
+    with limiter.slot():
+        pass
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_success_creeps_the_limit_back_up():
+    limiter = Limiter("test", rate=1000, burst=100, max_concurrency=8)
+    limiter.limit = 2.0
+    for _ in range(4):
+        with limiter.slot("hotels"):
+            pass
+    assert 2.0 < limiter.limit <= 8
+
+
+def test_waiters_are_served_by_priority():
+    limiter = Limiter("test", rate=1000, burst=100, max_concurrency=1)
+    order = []
+    limiter.acquire()
+
+    def request(name, priority):
+        with request_priority(priority), limiter.slot():
+            order.append(name)
+
+    batch = threading.Thread(target=request, args=("batch", PRIORITY_BATCH))
+    batch.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=request, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    time.sleep(0.05)
+    limiter.release()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
+
+
+def test_waiting_stops_at_the_deadline():
+    limiter = Limiter("test", rate=1, burst=1)
+    limiter.acquire()
+    with deadline.scope(time.time() + 0.1), pytest.raises(deadline.DeadlineExceeded):
+        limiter.acquire()
+    # The abandoned waiter does not hold a slot.
+    assert limiter.in_flight == 1
+    assert limiter.stats()["queued"] == 0
+
+
+def test_retry_gives_the_slot_back_and_queues_again():
+    limiter = Limiter("test", rate=1000, burst=100, max_concurrency=1)
+
+    async def attempt():
+        async with limiter.slot() as slot:
+            assert limiter.in_flight == 1
+            await slot.aretry(0.01)
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0
+
+    asyncio.run(attempt())
+    assert limiter.stats()["granted"] == 2
+
+
+def test_one_limiter_per_upstream_and_key():
+    serpapi = get_limiter("hotels", {"api_key": "a", "q": "Goa"})
+    assert get_limiter("restaurants", {"api_key": "a", "q": "Pune"}) is serpapi
+    assert get_limiter("hotels", {"api_key": "b"}) is not serpapi
+    assert get_limiter("attractions", {"apiKey": "a"}) is not serpapi
+    assert get_limiter("weather", {}) is None
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.render_pool import RenderPool, RenderQueueFull
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, queue_size=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_submit_and_wait_by_key(pool):
+    started = threading.Event()
+
+    def render(x):
+        started.wait(5)
+        return x * 2
+
+    future = pool.submit(render, 21, key="job")
+    threading.Timer(0.05, started.set).start()
+    assert pool.wait("job", timeout=5) == 42
+    assert future.result() == 42
+
+
+def test_full_queue_rejects_or_times_out(pool):
+    release = threading.Event()
+    pool.submit(release.wait)
+    with pytest.raises(RenderQueueFull):
+        pool.submit(lambda: None, block=False)
+    with pytest.raises(RenderQueueFull):
+        pool.submit(lambda: None, timeout=0.05)
+    release.set()
+    assert pool.submit(lambda: "next", timeout=5).result(timeout=5) == "next"
+    assert pool.stats()["rejected"] == 2
+
+
+def test_asubmit_times_out_when_no_slot_frees(pool):
+    release = threading.Event()
+    pool.submit(release.wait)
+
+    async def submit():
+        return await pool.asubmit(lambda: None, timeout=0.1)
+
+    start = time.perf_counter()
+    with pytest.raises(RenderQueueFull):
+        asyncio.run(submit())
+    assert time.perf_counter() - start < 1
+    release.set()
+
+
+def test_cancelled_asubmit_does_not_leak_a_slot(pool):
+    release = threading.Event()
+    pool.submit(release.wait)
+
+    async def cancel_waiting_submit():
+        waiting = asyncio.ensure_future(pool.asubmit(lambda: None, timeout=5))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(cancel_waiting_submit())
+    release.set()
+    # A leaked slot would leave none to take once the first job is done.
+    assert pool.submit(lambda: "ok", timeout=1).result(timeout=5) == "ok"
+    assert pool.stats()["submitted"] == 2
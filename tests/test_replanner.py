@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import replanner
+from replanner import NODE_OUTPUTS, areplan, replan, stale_nodes
+
+TRIP = {
+    "city": "Goa",
+    "origin_city": "PAT",
+    "destination_city": "GOI",
+    "outbound_date": "2026-10-20",
+    "return_date": "2026-10-23",
+    "num_days": 3,
+}
+
+
+def _previous():
+    state = {"user_input": "Plan a 3-day trip to Goa", "user_input_data": dict(TRIP), "unavailable": {}}
+    state.update({output: f"old {node}" for node, output in NODE_OUTPUTS.items()})
+    return state
+
+
+def test_origin_change_reruns_flights_only():
+    assert stale_nodes(_previous(), dict(TRIP, origin_city="DEL")) == ["flight", "expense", "fusion"]
+
+
+def test_date_change_reruns_dated_nodes():
+    stale = stale_nodes(_previous(), dict(TRIP, outbound_date="2026-10-21", return_date="2026-10-24"))
+    assert stale == ["weather", "flight", "itinerary", "expense", "fusion"]
+
+
+def test_city_change_reruns_everything_but_the_route():
+    stale = stale_nodes(_previous(), dict(TRIP, city="Pune"))
+    assert "flight" not in stale
+    assert stale == ["orchestrator", *(node for node in replanner.FETCH_NODES if node != "flight"),
+                     "itinerary", "expense", "fusion"]
+
+
+def test_unavailable_and_missing_results_rerun():
+    previous = _previous()
+    previous["unavailable"] = {"hotel": "deadline_exceeded"}
+    del previous["transport_info"]
+    assert stale_nodes(previous, dict(TRIP)) == ["hotel", "transport", "itinerary", "expense", "fusion"]
+
+
+@pytest.fixture
+def runners(monkeypatch):
+    calls = []
+
+    def runner(node):
+        def run(state, config=None):
+            calls.append(node)
+            update = {NODE_OUTPUTS[node]: f"new {node}"}
+            if node == "flight":
+                update["unavailable"] = {"flight": "error"}
+            return update
+
+        async def arun(state, config=None):
+            return run(state, config)
+
+        return run, arun
+
+    monkeypatch.setattr(replanner, "NODE_RUNNERS", {node: runner(node) for node in NODE_OUTPUTS})
+    return calls
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_replan_reruns_only_stale_nodes(runners, asynchronous):
+    previous = _previous()
+    previous["unavailable"] = {"weather": "error"}
+    new_input = dict(TRIP, origin_city="DEL")
+    state = asyncio.run(areplan(previous, new_input)) if asynchronous else replan(previous, new_input)
+    assert sorted(runners) == ["expense", "flight", "fusion", "weather"]
+    assert state["flight_info"] == "new flight"
+    assert state["hotel_info"] == "old hotel"
+    assert state["unavailable"] == {"flight": "error"}
+    assert state["user_input_data"]["origin_city"] == "DEL"
+    # The previous state is left untouched.
+    assert previous["flight_info"] == "old flight"
+    assert previous["user_input_data"]["origin_city"] == "PAT"
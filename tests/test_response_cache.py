@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from utils import response_cache
+from utils.response_cache import MISSING, TieredCache, make_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TieredCache(str(tmp_path / "responses.sqlite3"), table="responses", max_memory_entries=2)
+    monkeypatch.setattr(response_cache, "_response_cache", cache)
+    return cache
+
+
+def test_cache_key_ignores_credentials_and_whitespace():
+    url = "https://serpapi.com/search.json"
+    key = make_cache_key("hotels", url, {"q": "hotels in  Goa", "api_key": "a", "hl": None})
+    assert key == make_cache_key("hotels", url, {"q": "hotels in Goa", "api_key": "b"})
+    assert key != make_cache_key("restaurants", url, {"q": "hotels in Goa"})
+
+
+def test_entries_expire(cache):
+    cache.set("k", {"v": 1}, ttl=0.05)
+    assert cache.get("k") == {"v": 1}
+    time.sleep(0.1)
+    assert cache.get("k", MISSING) is MISSING
+    cache.set("never", 1, ttl=0)
+    assert not cache.contains("never")
+
+
+def test_disk_tier_serves_memory_evictions(cache):
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper(), ttl=60)
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.get("a") == "A"
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["sets"] == 3
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = TieredCache(str(tmp_path / "r.sqlite3"), max_memory_entries=1, max_disk_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key, ttl=60)
+    assert cache.stats()["evictions"] == 1
+    assert not cache.contains("a")
+    assert cache.contains("c")
+
+
+def test_store_and_lookup(cache):
+    params = {"q": "Goa", "api_key": "secret"}
+    key, cached = response_cache.lookup("hotels", "https://serpapi.com/search.json", params)
+    assert cached is MISSING
+    response_cache.store("hotels", key, {"properties": []})
+    assert response_cache.lookup("hotels", "https://serpapi.com/search.json", params) == (key, {"properties": []})
+
+
+def test_error_payloads_are_not_cached(cache):
+    key, _ = response_cache.lookup("hotels", "https://serpapi.com/search.json", {"q": "Goa"})
+    response_cache.store("hotels", key, {"error": "Your account has run out of searches."})
+    assert not cache.contains(key)
+    response_cache.store("hotels", key, [{"error": "a field in a listing, not a failed search"}])
+    assert cache.contains(key)
+
+
+def test_uncached_sources(cache):
+    assert response_cache.lookup(None, "https://example.com", {}) == (None, MISSING)
+    assert response_cache.lookup("unknown", "https://example.com", {}) == (None, MISSING)
@@ -0,0 +1,150 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from utils import deadline
+from utils.llm_wrapper import llms, router
+from utils.llm_wrapper.llms import with_timeout
+from utils.llm_wrapper.router import LLMRouter
+
+
+# Names of the threads provider calls ran on.
+_threads: List[str] = []
+
+
+class _Provider(BaseChatModel):
+    reply: str = "ok"
+    delay: float = 0.0
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "test-provider"
+
+    def _answer(self) -> str:
+        _threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.reply} is down")
+        return self.reply
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer()))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for word in self._answer().split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setattr(router, "_stats", {})
+    monkeypatch.setattr(router, "LLM_HEDGE_DEFAULT_MS", 100.0)
+
+    def register(**models):
+        for name, model in models.items():
+            monkeypatch.setitem(llms._instances, name, model)
+        return LLMRouter(providers=list(models))
+
+    return register
+
+
+def _text(chunks) -> str:
+    return "".join(chunk.content for chunk in chunks).strip()
+
+
+def test_rank_skips_providers_that_cannot_fit_the_call():
+    llm_router = LLMRouter(providers=["openai", "gemini"])
+    assert llm_router.rank(prompt_tokens=200000) == ["gemini"]
+    assert llm_router.rank(prompt_tokens=100, output_tokens=2048) == ["openai"]
+    assert llm_router.rank(prompt_tokens=100) == ["openai", "gemini"]
+
+
+def test_failed_provider_falls_through(providers):
+    llm_router = providers(first=_Provider(reply="first", fail=True), second=_Provider(reply="second"))
+    assert llm_router.invoke("hi").content == "second"
+    assert _text(llm_router.stream("hi")) == "second"
+    assert router.get_router_stats()["first"]["errors"] == 2
+
+
+def test_hedge_answers_from_the_faster_provider(providers):
+    llm_router = providers(slow=_Provider(reply="slow", delay=1.0), fast=_Provider(reply="fast"))
+    start = time.perf_counter()
+    assert llm_router.invoke("hi", hedge=True).content == "fast"
+    assert _text(llm_router.stream("hi", hedge=True)) == "fast"
+    assert time.perf_counter() - start < 1.5
+    assert router.get_router_stats()["slow"]["hedged"] == 2
+
+
+def test_streams_run_on_the_router_threads(providers):
+    llm_router = providers(only=_Provider(reply="a streamed answer"))
+    _threads.clear()
+    with deadline.scope(time.time() + 5):
+        assert _text(llm_router.stream("hi")) == "a streamed answer"
+    assert _threads and all(name.startswith("llm-router") for name in _threads)
+
+
+def test_stalled_provider_raises_at_the_deadline(providers):
+    llm_router = providers(stalled=_Provider(delay=1.0))
+    start = time.perf_counter()
+    with deadline.scope(time.time() + 0.2), pytest.raises(deadline.DeadlineExceeded):
+        llm_router.invoke("hi")
+    assert time.perf_counter() - start < 0.5
+
+
+class _Stalled(BaseHTTPRequestHandler):
+    def do_POST(self):
+        time.sleep(2)
+        self.send_response(500)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stalled_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stalled)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _openai(url):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o", api_key="test", base_url=url + "/v1")
+
+
+def _groq(url):
+    from langchain_groq import ChatGroq
+    return ChatGroq(model="llama", api_key="test", base_url=url)
+
+
+def _gemini(url):
+    from langchain_google_genai import GoogleGenerativeAI
+    return GoogleGenerativeAI(model="gemini-1.5-flash", google_api_key="test", base_url=url)
+
+
+@pytest.mark.parametrize("build", [_openai, _groq, _gemini])
+def test_with_timeout_ends_stalled_requests(stalled_url, build):
+    model = build(stalled_url)
+    bounded = with_timeout(model, 0.2)
+    assert bounded is not model
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        bounded.invoke("hi")
+    assert time.perf_counter() - start < 1.0
+
+
+def test_with_timeout_keeps_unknown_models():
+    model = _Provider()
+    assert with_timeout(model, 1.0) is model
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import deadline
+from utils.singleflight import SingleFlight
+
+
+def _run_threads(*targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_calls_share_one_result():
+    group, calls, results = SingleFlight(enabled=True), [], []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 1}
+
+    _run_threads(*[lambda: results.append(group.do("key", fetch)) for _ in range(4)])
+    assert len(calls) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True]
+    assert all(result is results[0][0] for result, _ in results)
+    assert group.stats()["in_flight"] == 0
+
+
+def test_follower_waits_no_longer_than_its_deadline():
+    group, outcome = SingleFlight(enabled=True), {}
+
+    def leader():
+        group.do("key", lambda: time.sleep(0.5))
+
+    def follower():
+        start = time.perf_counter()
+        with deadline.scope(time.time() + 0.1):
+            with pytest.raises(deadline.DeadlineExceeded):
+                group.do("key", lambda: None)
+        outcome["waited"] = time.perf_counter() - start
+
+    _run_threads(leader, follower)
+    assert outcome["waited"] < 0.3
+
+
+def _budgeted_fetch(calls):
+    def fetch():
+        calls.append(1)
+        if deadline.remaining() is not None and deadline.remaining() < 1:
+            time.sleep(max(deadline.remaining(), 0))
+            raise deadline.DeadlineExceeded("out of time")
+        return "fresh"
+    return fetch
+
+
+def test_follower_with_time_left_retries_after_leader_runs_out():
+    group, calls, outcome = SingleFlight(enabled=True), [], {}
+    fetch = _budgeted_fetch(calls)
+
+    def leader():
+        with deadline.scope(time.time() + 0.2):
+            with pytest.raises(deadline.DeadlineExceeded):
+                group.do("key", fetch)
+
+    def follower():
+        with deadline.scope(time.time() + 5):
+            outcome["result"] = group.do("key", fetch)
+
+    _run_threads(leader, follower)
+    assert outcome["result"] == ("fresh", False)
+    assert len(calls) == 2
+
+
+def test_async_follower_retries_after_leader_runs_out():
+    group, calls = SingleFlight(enabled=True), []
+
+    async def fetch():
+        calls.append(1)
+        left = deadline.remaining()
+        if left is not None and left < 1:
+            await asyncio.sleep(max(left, 0))
+            raise deadline.DeadlineExceeded("out of time")
+        return "fresh"
+
+    async def call(budget, delay):
+        await asyncio.sleep(delay)
+        with deadline.scope(time.time() + budget):
+            return await group.ado("key", fetch)
+
+    async def main():
+        return await asyncio.gather(call(0.2, 0), call(5, 0.02), call(0.05, 0.02), return_exceptions=True)
+
+    leader, follower, impatient = asyncio.run(main())
+    assert isinstance(leader, deadline.DeadlineExceeded)
+    assert follower == ("fresh", False)
+    assert isinstance(impatient, deadline.DeadlineExceeded)
+    assert len(calls) == 2
+
+
+def test_cancelled_async_caller_does_not_fail_the_others():
+    group = SingleFlight(enabled=True)
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        return "shared"
+
+    async def main():
+        first = asyncio.ensure_future(group.ado("key", fetch))
+        second = asyncio.ensure_future(group.ado("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == ("shared", True)
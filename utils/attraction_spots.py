@@ -1,8 +1,10 @@
 import os
-import requests
 from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from utils.env_config  import get_env_variable
+from utils.http_client import get_json, aget_json
+from utils.poi_store import get_poi_store, by_distance
+from utils.response_cache import get_ttl
 
 load_dotenv()
 
@@ -17,30 +19,115 @@ class GeoapifyAttractionSpotGenerator:
         self.api_key = get_env_variable("GEOAPIFY_API_KEY")
         if not self.api_key:
             raise ValueError("GEOAPIFY_API_KEY not found in environment variables.")
-        self.base_url = "https://api.geoapify.com/v2/places"
+        self.base_url = get_env_variable("GEOAPIFY_BASE_URL", "https://api.geoapify.com") + "/v2/places"
+
+    def _params(self, bbox: Optional[Tuple[float, float, float, float]] = None) -> Dict:
+        lon1, lat1, lon2, lat2 = bbox or self.get_bounding_box(self.latitude, self.longitude)
+        return {
+            "filter": f"rect:{lon1},{lat1},{lon2},{lat2}",
+            "categories": self.categories,  # e.g., "tourism,tourism.sights,entertainment.museum,leisure.park"
+            "limit": self.limit,
+            "apiKey": self.api_key
+        }
+
+    def _layer(self) -> str:
+        return f"attractions:{self.categories}"
+
+    def _lookup_local(self) -> Optional[List[Dict]]:
+        """
+        Spots from the local POI store when the whole box is fresh there, else None.
+        """
+        store, ttl = get_poi_store(), get_ttl("attractions")
+        if store is None or ttl is None:
+            return None
+        bbox = self.get_bounding_box(self.latitude, self.longitude)
+        spots = store.lookup_bbox(self._layer(), bbox, ttl, min_results=self.limit)
+        if spots is None:
+            return None
+        return by_distance(spots, self.latitude, self.longitude)[:self.limit]
+
+    def _stale_areas(self) -> List[Tuple[float, float, float, float]]:
+        """
+        The stale parts of the box when the rest of it is fresh in the POI store, else [] (fetch it all).
+        """
+        store, ttl = get_poi_store(), get_ttl("attractions")
+        if store is None or ttl is None:
+            return []
+        return store.stale_areas(self._layer(), self.get_bounding_box(self.latitude, self.longitude), ttl)
+
+    def _remember(self, spots: List[Dict], area: Optional[Tuple[float, float, float, float]] = None) -> List[Dict]:
+        store = get_poi_store()
+        if store is not None:
+            # Fewer spots than asked for means the fetched area holds no others.
+            store.merge(self._layer(), area or self.get_bounding_box(self.latitude, self.longitude), spots,
+                        complete=len(spots) < self.limit)
+        return by_distance(spots, self.latitude, self.longitude)
+
+    def _known_spots(self) -> List[Dict]:
+        # After fetching only the stale parts, answer with everything now known inside the box.
+        spots = get_poi_store().places(self._layer(), self.get_bounding_box(self.latitude, self.longitude),
+                                       get_ttl("attractions"))
+        return by_distance(spots, self.latitude, self.longitude)[:self.limit]
 
     def fetch_attraction_spots(self) -> List[Dict]:
         try:
-            lon1, lat1, lon2, lat2 = self.get_bounding_box(self.latitude, self.longitude)
+            params = self._params()
         except Exception as e:
             print(f"Error generating bounding box: {e}")
             return []
 
-        params = {
-            "filter": f"rect:{lon1},{lat1},{lon2},{lat2}",
-            "categories": self.categories,  # e.g., "tourism,tourism.sights,entertainment.museum,leisure.park"
-            "limit": self.limit,
-            "apiKey": self.api_key
-        }
+        spots = self._lookup_local()
+        if spots is not None:
+            return spots
+        areas = self._stale_areas()
+        if areas:
+            for area in areas:
+                try:
+                    data = get_json(self.base_url, params=self._params(area), timeout=10, source="attractions")
+                except Exception as e:
+                    print(f"Error fetching attraction spots: {e}")
+                    continue
+                self._remember(self._parse_spots(data), area)
+            return self._known_spots()
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = get_json(self.base_url, params=params, timeout=10, source="attractions")
         except Exception as e:
             print(f"Error fetching attraction spots: {e}")
             return []
 
+        return self._remember(self._parse_spots(data))
+
+    async def afetch_attraction_spots(self) -> List[Dict]:
+        try:
+            params = self._params()
+        except Exception as e:
+            print(f"Error generating bounding box: {e}")
+            return []
+
+        spots = self._lookup_local()
+        if spots is not None:
+            return spots
+        areas = self._stale_areas()
+        if areas:
+            for area in areas:
+                try:
+                    data = await aget_json(self.base_url, params=self._params(area), timeout=10, source="attractions")
+                except Exception as e:
+                    print(f"Error fetching attraction spots: {e}")
+                    continue
+                self._remember(self._parse_spots(data), area)
+            return self._known_spots()
+
+        try:
+            data = await aget_json(self.base_url, params=params, timeout=10, source="attractions")
+        except Exception as e:
+            print(f"Error fetching attraction spots: {e}")
+            return []
+
+        return self._remember(self._parse_spots(data))
+
+    def _parse_spots(self, data: Dict) -> List[Dict]:
         spots = []
         for feature in data.get('features', []):
             prop = feature.get('properties', {})
@@ -88,3 +175,10 @@ def get_attraction_spots(latitude: float, longitude: float, radius: int = 5000,
     """
     generator = GeoapifyAttractionSpotGenerator(latitude, longitude, radius=radius, limit=limit)
     return generator.fetch_attraction_spots()
+
+async def aget_attraction_spots(latitude: float, longitude: float, radius: int = 5000, limit: int = 10) -> List[Dict]:
+    """
+    Async version of get_attraction_spots.
+    """
+    generator = GeoapifyAttractionSpotGenerator(latitude, longitude, radius=radius, limit=limit)
+    return await generator.afetch_attraction_spots()
@@ -0,0 +1,83 @@
+"""
+Durable plan checkpoints: TravelState is saved to SQLite after every node under
+the plan's id, so a plan that fails or is cancelled can resume from its last
+completed node instead of refetching every upstream.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+from utils.env_config import get_env_variable
+from utils.response_cache import CACHE_DIR
+
+CHECKPOINTS_ENABLED = get_env_variable("CHECKPOINTS_ENABLED", "1") not in ("0", "false", "False")
+CHECKPOINT_PATH = get_env_variable("CHECKPOINT_PATH", os.path.join(CACHE_DIR, "checkpoints.sqlite3"))
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def _saver_class():
+    # langgraph's SQLite saver is imported on first use, like the rest of langgraph.
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class PlanCheckpointer(SqliteSaver):
+        """
+        SqliteSaver that also serves the async graph methods, by running the
+        (small, local) SQLite reads and writes on a worker thread. One compiled
+        graph can then be checkpointed under both invoke and ainvoke.
+        """
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[Any]:
+            for item in await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            ):
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = ""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id: str) -> None:
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    return PlanCheckpointer
+
+
+def open_checkpointer(path: str = CHECKPOINT_PATH):
+    """
+    Open a checkpointer on a SQLite file, creating it if needed.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return _saver_class()(conn)
+
+
+def get_checkpointer():
+    """
+    Return the process-wide checkpointer, or None when CHECKPOINTS_ENABLED is off.
+    """
+    global _checkpointer
+    if not CHECKPOINTS_ENABLED:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = open_checkpointer()
+    return _checkpointer
+
+
+def thread_config(plan_id: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Copy of a run config that files its checkpoints under plan_id.
+    """
+    config = dict(config or {})
+    config["configurable"] = dict(config.get("configurable") or {}, thread_id=plan_id)
+    return config
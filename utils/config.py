@@ -53,6 +53,10 @@ You are an expert travel planner and report generator. You are provided with com
 
 ---
 
+⚠️ Missing Data:
+Sources that failed or ran out of time for this plan. In the matching sections, say that this information is currently unavailable instead of making it up.
+{{unavailable}}
+
 🛫 Flight Details:
 Provide concise information about the selected flight(s), including price, airline, departure/arrival time, and duration.
 {{flight_info}}
@@ -65,6 +69,10 @@ Summarize the weather conditions to help the traveler pack appropriately.
 Highlight top places to visit, entry fees, and any fun/local cultural experiences.
 {{attraction_info}}
 
+🗺️ Day-by-Day Itinerary:
+Visits per day, already ordered for the shortest route from the stay and to fit opening hours (times are suggested arrival and departure). Keep this order and describe each day.
+{{itinerary}}
+
 🍽️ Restaurant Recommendations in {{destination_city}}:
 List 4-5 best-rated restaurants with type of cuisine, price range, and location.
 {{restaurant_info}}
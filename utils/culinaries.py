@@ -1,35 +1,88 @@
-import requests
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 from utils.env_config import get_env_variable
+from utils.http_client import get_json, aget_json
+from utils.poi_store import get_poi_store, by_rating, radius_bbox
+from utils.response_cache import get_ttl
+
+# Area around the destination's coordinates that a restaurant search stands for.
+RESTAURANT_SEARCH_RADIUS_M = int(get_env_variable("RESTAURANT_SEARCH_RADIUS_M", "5000"))
 
 class SerpApiRestaurantFetcher:
-    def __init__(self, city_name : str,topk: int = 10):
+    def __init__(self, city_name : str,topk: int = 10, coordinates: Optional[Tuple[float, float]] = None,
+                 radius: int = RESTAURANT_SEARCH_RADIUS_M):
     
         self.serpapi_key = get_env_variable("SERPER_API_KEY")
         self.topk = topk
-        self.base_url = "https://serpapi.com/search"
+        self.base_url = get_env_variable("SERPAPI_BASE_URL", "https://serpapi.com") + "/search"
         self.city_name = city_name
+        self.coordinates = coordinates
+        self.radius = radius
 
-    def fetch_restaurants(self) -> List[Dict]:
-        # Calculate center point and zoom leve
-        
+    def _params(self) -> Dict:
         params = {
             "engine": "google_maps",
             "type": "search",
             "q": f"restaurants in area {self.city_name}",
             "api_key": self.serpapi_key
         }
+        if self.coordinates:
+            # Search around the destination so the results stand for a known area.
+            latitude, longitude = self.coordinates
+            params["ll"] = f"@{latitude},{longitude},14z"
+        return params
+
+    def _lookup_local(self) -> Optional[List[Dict]]:
+        """
+        Restaurants from the local POI store when the area around the coordinates is fresh there, else None.
+        """
+        store, ttl = get_poi_store(), get_ttl("restaurants")
+        if store is None or ttl is None or not self.coordinates:
+            return None
+        latitude, longitude = self.coordinates
+        restaurants = store.lookup_radius("restaurants", latitude, longitude, self.radius, ttl, min_results=self.topk)
+        return None if restaurants is None else by_rating(restaurants)[:self.topk]
+
+    def _remember(self, restaurants: List[Dict]) -> List[Dict]:
+        store = get_poi_store()
+        if store is None or not self.coordinates:
+            return restaurants[:self.topk]
+        # Maps searches are capped at a page of results, so coverage is never complete.
+        store.merge("restaurants", radius_bbox(*self.coordinates, self.radius), restaurants, complete=False)
+        # Keep the search's own relevance order; rating order is only for local hits, which have none.
+        return restaurants[:self.topk]
+
+    def fetch_restaurants(self) -> List[Dict]:
+        restaurants = self._lookup_local()
+        if restaurants is not None:
+            return restaurants
+
+        try:
+            results = get_json(self.base_url, params=self._params(), timeout=10, source="restaurants").get("local_results", [])
+        except Exception as e:
+            print(f"Error fetching restaurants in area: {e}")
+            return []
+
+        return self._remember(self._parse_restaurants(results))
+
+    async def afetch_restaurants(self) -> List[Dict]:
+        restaurants = self._lookup_local()
+        if restaurants is not None:
+            return restaurants
+
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            results = response.json().get("local_results", [])
+            data = await aget_json(self.base_url, params=self._params(), timeout=10, source="restaurants")
+            results = data.get("local_results", [])
         except Exception as e:
             print(f"Error fetching restaurants in area: {e}")
             return []
 
+        return self._remember(self._parse_restaurants(results))
+
+    def _parse_restaurants(self, results: List[Dict]) -> List[Dict]:
         restaurants = []
-        for r in results[:self.topk]:
+        for r in results:
+            coordinates = r.get("gps_coordinates") or {}
             restaurant = {
                 "name": r.get("title", "Unknown"),
                 "address": r.get("address", ""),
@@ -37,11 +90,18 @@ class SerpApiRestaurantFetcher:
                 "meals_available": r.get("type", "Not available"),
                 "rating": r.get("rating", None),
                 "reviews": r.get("reviews", None),
-                "link": r.get("link", "")
+                "link": r.get("link", ""),
+                "lat": coordinates.get("latitude"),
+                "lon": coordinates.get("longitude"),
+                "place_id": r.get("place_id", "")
             }
             restaurants.append(restaurant)
         return restaurants
 
-def get_topk_restaurants(city_name: str, topk: int = 10) -> List[Dict]:
-    fetcher = SerpApiRestaurantFetcher(city_name, topk)
-    return fetcher.fetch_restaurants() 
\ No newline at end of file
+def get_topk_restaurants(city_name: str, topk: int = 10, coordinates: Optional[Tuple[float, float]] = None) -> List[Dict]:
+    fetcher = SerpApiRestaurantFetcher(city_name, topk, coordinates=coordinates)
+    return fetcher.fetch_restaurants()
+
+async def aget_topk_restaurants(city_name: str, topk: int = 10, coordinates: Optional[Tuple[float, float]] = None) -> List[Dict]:
+    fetcher = SerpApiRestaurantFetcher(city_name, topk, coordinates=coordinates)
+    return await fetcher.afetch_restaurants()
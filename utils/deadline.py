@@ -0,0 +1,149 @@
+"""
+Per-plan time budgets.
+
+A plan carries an absolute deadline (epoch seconds). While a graph node runs,
+the deadline that applies to it is held in a contextvar, so upstream calls
+can shrink their timeouts to the remaining budget without it being threaded
+through every fetcher. Failures inside a node are collected the same way, so
+the node can record why its source is unavailable even when the fetcher
+swallowed the exception and returned an empty result.
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from utils.env_config import get_env_variable
+
+PLAN_DEADLINE_SECONDS = float(get_env_variable("PLAN_DEADLINE_SECONDS", "90"))
+# Budget kept back for the expense and report stages once the fetch agents are done,
+# capped at half the plan budget so short deadlines still leave time to fetch.
+PLAN_REPORT_RESERVE_SECONDS = float(get_env_variable("PLAN_REPORT_RESERVE_SECONDS", "30"))
+
+# Reasons recorded in TravelState["unavailable"].
+UNAVAILABLE_DEADLINE = "deadline_exceeded"
+UNAVAILABLE_ERROR = "error"
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+_failures: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("deadline_failures", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def plan_deadlines(deadline_at: Optional[float] = None, now: Optional[float] = None) -> Dict[str, float]:
+    """
+    Deadlines for a plan starting now: {"plan": ..., "fetch": ...} in epoch seconds.
+    """
+    now = time.time() if now is None else now
+    plan = deadline_at if deadline_at is not None else now + PLAN_DEADLINE_SECONDS
+    reserve = min(PLAN_REPORT_RESERVE_SECONDS, max(0.0, plan - now) / 2)
+    return {"plan": plan, "fetch": plan - reserve}
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current deadline, or None when there is none.
+    """
+    deadline_at = _deadline.get()
+    return None if deadline_at is None else deadline_at - time.time()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def allows(seconds: float) -> bool:
+    """
+    Whether the current deadline leaves more than seconds, e.g. to back off and retry.
+    """
+    left = remaining()
+    return left is None or left > seconds
+
+
+def timeout(default: float) -> float:
+    """
+    The timeout for one upstream call: the default, cut to the remaining budget.
+    Raises DeadlineExceeded when the budget is already spent.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded before the request was sent")
+    return min(default, left)
+
+
+@contextmanager
+def scope(deadline_at: Optional[float]) -> Iterator[None]:
+    """
+    Apply a deadline to the enclosed code; an enclosing, earlier deadline still wins.
+    """
+    current = _deadline.get()
+    if deadline_at is None or (current is not None and current <= deadline_at):
+        yield
+        return
+    token = _deadline.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def reason(error: BaseException) -> str:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or expired():
+        return UNAVAILABLE_DEADLINE
+    return UNAVAILABLE_ERROR
+
+
+def record_failure(error: BaseException) -> None:
+    """
+    Note a failed upstream call for the node that is running, if any.
+    """
+    failures = _failures.get()
+    if failures is not None:
+        failures.append(reason(error))
+
+
+@contextmanager
+def track_failures() -> Iterator[List[str]]:
+    """
+    Collect the reasons of upstream calls that fail in the enclosed code.
+    """
+    failures: List[str] = []
+    token = _failures.set(failures)
+    try:
+        yield failures
+    finally:
+        _failures.reset(token)
+
+
+def unavailable_reason(failures: List[str]) -> Optional[str]:
+    if not failures:
+        return None
+    return UNAVAILABLE_DEADLINE if UNAVAILABLE_DEADLINE in failures else UNAVAILABLE_ERROR
+
+
+async def abounded(iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """
+    Yield from an async iterator until it ends or the current deadline passes,
+    in which case the iterator is closed and iteration stops quietly.
+    """
+    try:
+        while True:
+            left = remaining()
+            if left is not None and left <= 0:
+                return
+            try:
+                yield await asyncio.wait_for(iterator.__anext__(), left)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                # Only our own wait running out stops iteration; the iterator's timeouts propagate.
+                if not expired():
+                    raise
+                return
+    finally:
+        await iterator.aclose()
@@ -1,8 +1,215 @@
-from typing import Dict, Any, List
-from utils.llm_wrapper.llms import llm
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from utils.llm_wrapper.llms import llm_router
 from utils.config import EXPENSE_MANAGEMENT_PROMPT
+from utils.env_config import get_env_variable
+from utils import deadline
+from utils import tracing
+from utils.projection import (
+    compact_json, project_flights, project_hotels, project_transport,
+    project_restaurants, project_attractions,
+)
 from langchain_core.prompts import PromptTemplate
 
+# Set EXPENSE_LLM_NARRATIVE=1 to have the LLM write the expense report instead
+# of the deterministic calculator below.
+EXPENSE_LLM_NARRATIVE = get_env_variable("EXPENSE_LLM_NARRATIVE", "0") == "1"
+
+# Approximate value of one unit of each currency in INR, used to bring
+# prices quoted in other currencies into the report currency.
+FX_TO_INR = {"INR": 1.0, "USD": 83.0, "EUR": 90.0, "GBP": 105.0}
+
+# Ordered so multi-character markers win over the bare symbols they contain.
+CURRENCY_MARKERS = (
+    ("US$", "USD"), ("USD", "USD"), ("$", "USD"),
+    ("INR", "INR"), ("Rs", "INR"), ("₹", "INR"),
+    ("EUR", "EUR"), ("€", "EUR"),
+    ("GBP", "GBP"), ("£", "GBP"),
+)
+
+# Fallbacks (INR, 1 person) used when a source carries no usable price.
+DEFAULT_HOTEL_NIGHTLY = 3000.0
+DEFAULT_MEAL_PRICE = 400.0
+DEFAULT_TRANSPORT_PER_DAY = 500.0
+DEFAULT_ATTRACTION_TICKET = 100.0
+MEALS_PER_DAY = 3
+ATTRACTIONS_PER_DAY = 2
+
+# Google Maps price levels ("₹₹", "$$$") mapped to an INR amount.
+MEAL_PRICE_LEVELS = {1: 250.0, 2: 600.0, 3: 1200.0, 4: 2500.0}
+HOTEL_PRICE_LEVELS = {1: 1500.0, 2: 3000.0, 3: 6000.0, 4: 12000.0}
+
+_AMOUNT_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kK])?")
+
+
+def convert_currency(amount: float, from_currency: str, to_currency: str) -> float:
+    if from_currency == to_currency:
+        return amount
+    return amount * FX_TO_INR.get(from_currency, 1.0) / FX_TO_INR.get(to_currency, 1.0)
+
+
+def parse_price(value: Any, default_currency: str = "INR") -> Optional[Tuple[float, str]]:
+    """
+    Extract (amount, currency) from a price such as 5400, "₹2,500", "$10–20" or "₹1.2K".
+    Ranges resolve to their midpoint. Returns None when no amount is present.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value), default_currency
+    if not isinstance(value, str):
+        return None
+    currency = default_currency
+    for marker, code in CURRENCY_MARKERS:
+        if marker in value:
+            currency = code
+            break
+    amounts = [
+        float(number.replace(",", "")) * (1000 if suffix else 1)
+        for number, suffix in _AMOUNT_RE.findall(value)
+    ][:2]
+    if not amounts:
+        return None
+    return sum(amounts) / len(amounts), currency
+
+
+def price_level(value: Any) -> int:
+    """
+    Number of repeated currency symbols in a price-level string like "₹₹₹"; 0 if none.
+    """
+    if not isinstance(value, str) or _AMOUNT_RE.search(value):
+        return 0
+    return max(value.count(symbol) for symbol in ("₹", "$", "€", "£"))
+
+
+class ExpenseCalculator:
+    """
+    Deterministic per-person expense breakdown following EXPENSE_MANAGEMENT_PROMPT:
+    cheapest flight, average hotel rate and meal price scaled by trip length,
+    and defaults wherever a source has no price.
+    """
+    def __init__(
+        self,
+        currency: str,
+        num_days: int,
+        flight_info: Any,
+        hotel_info: Any,
+        transport_info: Any,
+        restaurant_info: Any,
+        attraction_info: Any
+    ):
+        self.currency = currency
+        self.num_days = max(int(num_days or 1), 1)
+        self.flight_info = flight_info
+        self.hotel_info = hotel_info
+        self.transport_info = transport_info
+        self.restaurant_info = restaurant_info
+        self.attraction_info = attraction_info
+        self.assumptions: List[str] = []
+
+    @staticmethod
+    def _records(data: Any) -> List[Dict[str, Any]]:
+        return [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+
+    def _amounts(self, values: List[Any], levels: Optional[Dict[int, float]] = None) -> List[float]:
+        amounts = []
+        for value in values:
+            parsed = parse_price(value, default_currency=self.currency)
+            if parsed is not None:
+                amounts.append(convert_currency(parsed[0], parsed[1], self.currency))
+            elif levels and price_level(value) in levels:
+                amounts.append(convert_currency(levels[price_level(value)], "INR", self.currency))
+        return amounts
+
+    def _default(self, amount_inr: float, note: str) -> float:
+        self.assumptions.append(note)
+        return convert_currency(amount_inr, "INR", self.currency)
+
+    def flight_cost(self) -> float:
+        prices = self._amounts([flight.get("price") for flight in self._records(self.flight_info)])
+        if not prices:
+            self.assumptions.append("No flight prices available; flight cost excluded.")
+            return 0.0
+        return min(prices)
+
+    def hotel_cost(self) -> float:
+        rates = self._amounts([hotel.get("price_range") for hotel in self._records(self.hotel_info)],
+                              HOTEL_PRICE_LEVELS)
+        nightly = sum(rates) / len(rates) if rates else self._default(
+            DEFAULT_HOTEL_NIGHTLY, "No hotel rates available; assumed a default nightly rate.")
+        return nightly * self.num_days
+
+    def food_cost(self) -> float:
+        meals = self._amounts([r.get("avg_meal_price") for r in self._records(self.restaurant_info)],
+                              MEAL_PRICE_LEVELS)
+        per_meal = sum(meals) / len(meals) if meals else self._default(
+            DEFAULT_MEAL_PRICE, "No restaurant prices available; assumed a default meal price.")
+        return per_meal * MEALS_PER_DAY * self.num_days
+
+    def transport_cost(self) -> float:
+        # Google Maps transit results carry no fares, so local transport is a per-day estimate.
+        return self._default(
+            DEFAULT_TRANSPORT_PER_DAY, "Local transport estimated at a flat daily rate."
+        ) * self.num_days
+
+    def attraction_cost(self) -> float:
+        spots = self._records(self.attraction_info)
+        tickets = self._amounts([spot.get("price") or spot.get("ticket_price") for spot in spots])
+        visits = min(len(spots), ATTRACTIONS_PER_DAY * self.num_days)
+        if tickets:
+            return sum(tickets) / len(tickets) * visits
+        if not visits:
+            return 0.0
+        return self._default(
+            DEFAULT_ATTRACTION_TICKET, "Attraction entry fees estimated with a default ticket price."
+        ) * visits
+
+    def compute(self) -> Dict[str, Any]:
+        self.assumptions = []
+        breakdown = {
+            "flight": self.flight_cost(),
+            "transportation": self.transport_cost(),
+            "food": self.food_cost(),
+            "hotel": self.hotel_cost(),
+            "attractions": self.attraction_cost(),
+        }
+        breakdown = {k: round(v) for k, v in breakdown.items()}
+        total = sum(breakdown.values())
+        return {
+            "currency": self.currency,
+            "num_days": self.num_days,
+            "breakdown": breakdown,
+            "total": total,
+            "per_day": round(total / self.num_days),
+            "assumptions": self.assumptions,
+        }
+
+
+def format_expense_report(city_name: str, expenses: Dict[str, Any]) -> str:
+    """
+    Render a breakdown from ExpenseCalculator.compute in the EXPENSE_MANAGEMENT_PROMPT layout.
+    """
+    currency = expenses["currency"]
+    num_days = expenses["num_days"]
+    breakdown = expenses["breakdown"]
+    lines = [
+        f"Expense Report for {city_name} (1 person, {num_days} day(s), {currency})",
+        f"Flight Cost: {currency} {breakdown['flight']:,}",
+        f"Average Transportation Cost for {num_days} day(s): {currency} {breakdown['transportation']:,}",
+        f"Average Restaurant Food Cost for {num_days} day(s): {currency} {breakdown['food']:,}",
+        f"Average Hotel Cost for {num_days} day(s): {currency} {breakdown['hotel']:,}",
+        f"Average Ticket Cost for Attractions/Fun Activities: {currency} {breakdown['attractions']:,}",
+        "",
+        f"✅ Total Estimated Trip Cost: {currency} {expenses['total']:,}",
+        f"📊 Per Day: {currency} {expenses['per_day']:,}",
+    ]
+    if expenses["assumptions"]:
+        lines.append("")
+        lines.append("Assumptions:")
+        lines.extend(f"- {note}" for note in expenses["assumptions"])
+    return "\n".join(lines)
+
+
 class ExpenseReportGenerator:
     def __init__(
         self,
@@ -24,16 +231,13 @@ class ExpenseReportGenerator:
         self.restaurant_info = restaurant_info
         self.attraction_info = attraction_info
         self.expense_report = ""
-    
-    def generate_report(self) -> str:        
+        self.expenses: Dict[str, Any] = {}
+
+    def calculate(self) -> Dict[str, Any]:
         """
-        Generate a detailed expense report for the trip.
+        Compute the structured expense breakdown without calling the LLM.
         """
-        prompt = PromptTemplate.from_template(
-            EXPENSE_MANAGEMENT_PROMPT
-        )
-        formatted_prompt = prompt.format(
-            city_name=self.city_name,
+        self.expenses = ExpenseCalculator(
             currency=self.currency,
             num_days=self.num_days,
             flight_info=self.flight_info,
@@ -41,16 +245,63 @@ class ExpenseReportGenerator:
             transport_info=self.transport_info,
             restaurant_info=self.restaurant_info,
             attraction_info=self.attraction_info
+        ).compute()
+        return self.expenses
+    
+    def generate_prompt(self) -> str:
+        prompt = PromptTemplate.from_template(
+            EXPENSE_MANAGEMENT_PROMPT
+        )
+        return prompt.format(
+            city_name=self.city_name,
+            currency=self.currency,
+            num_days=self.num_days,
+            flight_info=compact_json(project_flights(self.flight_info)),
+            hotel_info=compact_json(project_hotels(self.hotel_info)),
+            transport_info=compact_json(project_transport(self.transport_info)),
+            restaurant_info=compact_json(project_restaurants(self.restaurant_info)),
+            attraction_info=compact_json(project_attractions(self.attraction_info))
         )
 
-        response = llm.invoke(formatted_prompt)
-        if response and isinstance(response, str):
+    def _set_report(self, response) -> str:
+        if response and isinstance(response.content, str):
             self.expense_report = response.content
         else:
             self.expense_report = "Failed to generate report. Please check the input data or try again later."
 
         return self.expense_report
 
+    def generate_report(self, use_llm: Optional[bool] = None) -> str:        
+        """
+        Generate a detailed expense report for the trip.
+        The numbers are computed locally; the LLM is only used when use_llm is set.
+        """
+        if not (EXPENSE_LLM_NARRATIVE if use_llm is None else use_llm):
+            self.expense_report = format_expense_report(self.city_name, self.calculate())
+            return self.expense_report
+        try:
+            with tracing.llm_span("expense_report", llm_router):
+                response = llm_router.invoke(self.generate_prompt())
+                tracing.record_llm_usage(response)
+        except deadline.DeadlineExceeded:
+            # Out of time for the narrative; the computed numbers still make a report.
+            return self.generate_report(use_llm=False)
+        return self._set_report(response)
+
+    async def agenerate_report(self, use_llm: Optional[bool] = None) -> str:
+        """
+        Async version of generate_report.
+        """
+        if not (EXPENSE_LLM_NARRATIVE if use_llm is None else use_llm):
+            return self.generate_report(use_llm=False)
+        try:
+            with tracing.llm_span("expense_report", llm_router):
+                response = await llm_router.ainvoke(self.generate_prompt())
+                tracing.record_llm_usage(response)
+        except deadline.DeadlineExceeded:
+            return self.generate_report(use_llm=False)
+        return self._set_report(response)
+
 def calculate_expenses(
     city_name: str,
     currency: str,
@@ -59,7 +310,8 @@ def calculate_expenses(
     hotel_info: List[Dict[str, Any]],
     transport_info: Dict[str, Any],
     restaurant_info: List[Dict[str, Any]],
-    attraction_info: List[Dict[str, Any]]
+    attraction_info: List[Dict[str, Any]],
+    use_llm: Optional[bool] = None
 ) -> str:
     """
     Calculate and generate a detailed expense report for the trip.
@@ -72,6 +324,7 @@ def calculate_expenses(
     :param transport_info: Average transportation cost.
     :param restaurant_info: List of top restaurants with meal costs.
     :param attraction_info: List of attractions with ticket prices.
+    :param use_llm: Have the LLM write the report; defaults to EXPENSE_LLM_NARRATIVE.
     
     :return: A formatted expense report as a string.
     """
@@ -86,5 +339,31 @@ def calculate_expenses(
         attraction_info=attraction_info
     )
     
-    return generator.generate_report()
+    return generator.generate_report(use_llm=use_llm)
+
+async def acalculate_expenses(
+    city_name: str,
+    currency: str,
+    num_days: int,
+    flight_info: Dict[str, Any],
+    hotel_info: List[Dict[str, Any]],
+    transport_info: Dict[str, Any],
+    restaurant_info: List[Dict[str, Any]],
+    attraction_info: List[Dict[str, Any]],
+    use_llm: Optional[bool] = None
+) -> str:
+    """
+    Async version of calculate_expenses.
+    """
+    generator = ExpenseReportGenerator(
+        city_name=city_name,
+        currency=currency,
+        num_days=num_days,
+        flight_info=flight_info,
+        hotel_info=hotel_info,
+        transport_info=transport_info,
+        restaurant_info=restaurant_info,
+        attraction_info=attraction_info
+    )
 
+    return await generator.agenerate_report(use_llm=use_llm)
@@ -0,0 +1,211 @@
+"""
+Columnar flight results.
+
+A SerpAPI Google Flights search returns a few dozen nested options, and a
+batch across date windows and routes many more. FlightTable keeps each option
+as one row of flat numpy columns (price, total duration, stops, departure and
+arrival times, airline) next to its projected record, so filtering and
+ranking are array operations and only the top few records are carried in
+TravelState and sent to the LLM.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from utils.env_config import get_env_variable
+from utils.projection import project_flight
+
+# How many options go downstream, and how they are picked: one of RANKINGS or "pareto".
+FLIGHT_TOP_N = int(get_env_variable("FLIGHT_TOP_N", "5"))
+FLIGHT_RANKING = get_env_variable("FLIGHT_RANKING", "pareto")
+
+# Ranking name -> columns to sort by, most significant first.
+RANKINGS = {
+    "cheapest": ("price", "duration", "stops"),
+    "fastest": ("duration", "price", "stops"),
+    "fewest_stops": ("stops", "duration", "price"),
+}
+
+
+def _float(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def _times(values: Sequence[Optional[str]]) -> np.ndarray:
+    try:
+        return np.array(values, dtype="datetime64[m]")
+    except ValueError:
+        # A malformed time only loses that value, not the whole column.
+        return np.array([_time(value) for value in values], dtype="datetime64[m]")
+
+
+def _time(value: Optional[str]) -> np.datetime64:
+    try:
+        return np.datetime64(value, "m")
+    except (TypeError, ValueError):
+        return np.datetime64("NaT")
+
+
+class FlightTable:
+    """
+    Flight options as parallel columns plus their projected records.
+    Filtering returns a new table; ranking returns row indices.
+    """
+    def __init__(self, records: List[Dict[str, Any]], price: np.ndarray, duration: np.ndarray,
+                 stops: np.ndarray, departure: np.ndarray, arrival: np.ndarray, airline: np.ndarray):
+        self.records = records
+        self.price = price
+        self.duration = duration
+        self.stops = stops
+        self.departure = departure
+        self.arrival = arrival
+        self.airline = airline
+        self._keys: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "FlightTable":
+        """
+        Build a table from projected records (see utils.projection.project_flight).
+        """
+        records = list(records)
+        return cls(
+            records,
+            price=np.array([_float(r.get("price")) for r in records], dtype=float),
+            duration=np.array([_float(r.get("total_duration")) for r in records], dtype=float),
+            stops=np.array([_float(r.get("stops")) for r in records], dtype=float),
+            departure=_times([r.get("departure_time") for r in records]),
+            arrival=_times([r.get("arrival_time") for r in records]),
+            airline=np.array([r.get("airline") or "" for r in records], dtype=str),
+        )
+
+    @classmethod
+    def from_results(cls, flights: Iterable[Dict[str, Any]]) -> "FlightTable":
+        """
+        Build a table from SerpAPI best_flights / other_flights options.
+        """
+        return cls.from_records(project_flight(flight) for flight in flights if isinstance(flight, dict))
+
+    @classmethod
+    def concat(cls, tables: Sequence["FlightTable"]) -> "FlightTable":
+        """
+        One table over several searches, e.g. every date window of a route.
+        """
+        if not tables:
+            return cls.from_records([])
+        return cls(
+            [record for table in tables for record in table.records],
+            *(np.concatenate([getattr(table, column) for table in tables])
+              for column in ("price", "duration", "stops", "departure", "arrival", "airline")),
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def take(self, indices: np.ndarray) -> "FlightTable":
+        return FlightTable(
+            [self.records[i] for i in indices],
+            self.price[indices], self.duration[indices], self.stops[indices],
+            self.departure[indices], self.arrival[indices], self.airline[indices],
+        )
+
+    def filter(self, max_price: Optional[float] = None, max_duration: Optional[float] = None,
+               max_stops: Optional[int] = None, depart_after: Optional[str] = None,
+               depart_before: Optional[str] = None, airlines: Optional[Sequence[str]] = None) -> "FlightTable":
+        """
+        Keep the options that meet every given bound. Times are "YYYY-MM-DD HH:MM";
+        airlines keeps options with at least one leg on one of them.
+        Options missing a bounded value are dropped.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if max_duration is not None:
+            mask &= self.duration <= max_duration
+        if max_stops is not None:
+            mask &= self.stops <= max_stops
+        if depart_after is not None:
+            mask &= self.departure >= np.datetime64(depart_after, "m")
+        if depart_before is not None:
+            mask &= self.departure <= np.datetime64(depart_before, "m")
+        if airlines:
+            mask &= np.logical_or.reduce([np.char.find(self.airline, airline) >= 0 for airline in airlines])
+        return self.take(np.flatnonzero(mask))
+
+    def _key(self, column: str) -> np.ndarray:
+        key = self._keys.get(column)
+        if key is None:
+            # Unknown prices, durations and stop counts rank last.
+            values = getattr(self, column)
+            key = np.where(np.isnan(values), np.inf, values) if values.dtype.kind == "f" else values
+            self._keys[column] = key
+        return key
+
+    def order(self, by: str = "cheapest", n: Optional[int] = None) -> np.ndarray:
+        """
+        Row indices sorted by one of RANKINGS, or only the first n of them;
+        ties keep the search's own order.
+        """
+        keys = [self._key(column) for column in RANKINGS[by]]
+        rows = np.arange(len(self))
+        if n is not None and n < len(self):
+            # Only rows up to the n-th smallest primary key can make the top n; sort just those.
+            cutoff = np.partition(keys[0], n - 1)[n - 1]
+            rows = np.flatnonzero(keys[0] <= cutoff)
+        # lexsort sorts by its last key first.
+        ranked = rows[np.lexsort([key[rows] for key in reversed(keys)])]
+        return ranked if n is None else ranked[:n]
+
+    def pareto_front(self) -> np.ndarray:
+        """
+        Indices of the options no other option beats on price, duration and stops
+        at once, cheapest first. Of identical options only the first is kept.
+        """
+        price, duration, stops = self._key("price"), self._key("duration"), self._key("stops")
+        rows = np.arange(len(self))
+        if len(rows):
+            # The best option of each ranking is on the front; whatever one of them
+            # dominates can be dropped before sorting.
+            candidates = np.ones(len(rows), dtype=bool)
+            for by in RANKINGS:
+                seed = self.order(by, 1)[0]
+                candidates &= ((price < price[seed]) | (duration < duration[seed]) | (stops < stops[seed])
+                               | (rows == seed))
+            rows = np.flatnonzero(candidates)
+        order = rows[np.lexsort((stops[rows], duration[rows], price[rows]))]
+        duration, stops = duration[order], stops[order]
+        dominated = np.zeros(len(order), dtype=bool)
+        # An option is dominated when an earlier (no more expensive) one with no
+        # more stops is no slower; stop counts are few, so one pass per count.
+        # NaN stands for "no such option yet", so unknown (inf) durations still compare.
+        for level in np.unique(stops):
+            fastest = np.fmin.accumulate(np.where(stops <= level, duration, np.nan))
+            fastest_before = np.concatenate(([np.nan], fastest[:-1]))
+            dominated |= (stops == level) & (fastest_before <= duration)
+        return order[~dominated]
+
+    def top_indices(self, n: int = FLIGHT_TOP_N, by: str = FLIGHT_RANKING) -> np.ndarray:
+        """
+        Indices of the n best options. "pareto" takes the Pareto front cheapest
+        first and fills up with the cheapest of the rest.
+        """
+        if by != "pareto":
+            return self.order(by, n)
+        front = self.pareto_front()[:n]
+        if len(front) < n:
+            rest = self.order("cheapest", n)
+            front = np.concatenate((front, rest[~np.isin(rest, front)][:n - len(front)]))
+        return front
+
+    def top(self, n: int = FLIGHT_TOP_N, by: str = FLIGHT_RANKING) -> List[Dict[str, Any]]:
+        """
+        Records of the n best options, best first.
+        """
+        return [self.records[i] for i in self.top_indices(n, by)]
+
+
+def rank_flights(flights: Iterable[Dict[str, Any]], n: int = FLIGHT_TOP_N,
+                 by: str = FLIGHT_RANKING) -> List[Dict[str, Any]]:
+    """
+    Project SerpAPI flight options and keep the n best.
+    """
+    return FlightTable.from_results(flights).top(n, by)
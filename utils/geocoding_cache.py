@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from utils.env_config import get_env_variable
+
+GEOCODE_CACHE_PATH = get_env_variable("GEOCODE_CACHE_PATH", os.path.join(".cache", "geocode.sqlite3"))
+
+
+def normalize_city_name(city_name: str) -> str:
+    """
+    Cache key for a city: case-folded with whitespace collapsed.
+    """
+    return " ".join(city_name.split()).casefold()
+
+
+class GeocodingCache:
+    """
+    Persistent city -> (latitude, longitude) store backed by SQLite.
+
+    City coordinates do not change, so entries never expire. A dict in front
+    of the database keeps repeat lookups in the same process off the disk.
+    """
+    def __init__(self, path: str = GEOCODE_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "city TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, city_name: str) -> Optional[Tuple[float, float]]:
+        key = normalize_city_name(city_name)
+        with self._lock:
+            coordinates = self._memory.get(key)
+            if coordinates is None:
+                row = self._connection().execute(
+                    "SELECT latitude, longitude FROM geocode WHERE city = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    coordinates = self._memory[key] = (row[0], row[1])
+            if coordinates is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return coordinates
+
+    def set(self, city_name: str, latitude: float, longitude: float) -> None:
+        key = normalize_city_name(city_name)
+        with self._lock:
+            self._memory[key] = (latitude, longitude)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (city, latitude, longitude, updated_at) VALUES (?, ?, ?, ?)",
+                (key, latitude, longitude, time.time()),
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries_in_memory": len(self._memory)}
+
+
+_geocoding_cache: Optional[GeocodingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_geocoding_cache() -> GeocodingCache:
+    """
+    Return the process-wide geocoding cache.
+    """
+    global _geocoding_cache
+    if _geocoding_cache is None:
+        with _cache_lock:
+            if _geocoding_cache is None:
+                _geocoding_cache = GeocodingCache()
+    return _geocoding_cache
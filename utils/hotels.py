@@ -1,18 +1,23 @@
-from typing import List, Dict
-import requests
+from typing import List, Dict, Optional, Tuple
 from utils.env_config import get_env_variable
+from utils.http_client import get_json, aget_json
+from utils.poi_store import get_poi_store, by_rating, radius_bbox
+from utils.response_cache import get_ttl
+
+# Area around the destination's coordinates that a hotel search stands for.
+HOTEL_SEARCH_RADIUS_M = int(get_env_variable("HOTEL_SEARCH_RADIUS_M", "5000"))
 
 class SerpAPIHotelsFetcher:
-    def __init__(self, city_name: str, topk: int = 10):
+    def __init__(self, city_name: str, topk: int = 10, coordinates: Optional[Tuple[float, float]] = None,
+                 radius: int = HOTEL_SEARCH_RADIUS_M):
         self.serpapi_key = get_env_variable("SERPER_API_KEY")
         self.topk = topk
-        self.base_url = "https://serpapi.com/search"
+        self.base_url = get_env_variable("SERPAPI_BASE_URL", "https://serpapi.com") + "/search"
         self.city_name = city_name
+        self.coordinates = coordinates
+        self.radius = radius
 
-    def fetch_hotels(self) -> List[Dict]:
-        """
-        Fetch a list of hotels in the specified city using SerpAPI.
-        """
+    def _params(self) -> Dict:
         params = {
             "engine": "google_maps",
             "type": "search",
@@ -20,17 +25,69 @@ class SerpAPIHotelsFetcher:
             "api_key": self.serpapi_key,
             "gl": "in",  
         }
+        if self.coordinates:
+            # Search around the destination so the results stand for a known area.
+            latitude, longitude = self.coordinates
+            params["ll"] = f"@{latitude},{longitude},14z"
+        return params
+
+    def _lookup_local(self) -> Optional[List[Dict]]:
+        """
+        Hotels from the local POI store when the area around the coordinates is fresh there, else None.
+        """
+        store, ttl = get_poi_store(), get_ttl("hotels")
+        if store is None or ttl is None or not self.coordinates:
+            return None
+        latitude, longitude = self.coordinates
+        hotels = store.lookup_radius("hotels", latitude, longitude, self.radius, ttl, min_results=self.topk)
+        return None if hotels is None else by_rating(hotels)[:self.topk]
+
+    def _remember(self, hotels: List[Dict]) -> List[Dict]:
+        store = get_poi_store()
+        if store is None or not self.coordinates:
+            return hotels[:self.topk]
+        # Maps searches are capped at a page of results, so coverage is never complete.
+        store.merge("hotels", radius_bbox(*self.coordinates, self.radius), hotels, complete=False)
+        # Keep the search's own relevance order; rating order is only for local hits, which have none.
+        return hotels[:self.topk]
+
+    def fetch_hotels(self) -> List[Dict]:
+        """
+        Fetch a list of hotels in the specified city using SerpAPI.
+        """
+        hotels = self._lookup_local()
+        if hotels is not None:
+            return hotels
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            results = response.json().get("local_results", [])
+            results = get_json(self.base_url, params=self._params(), timeout=10, source="hotels").get("local_results", [])
         except Exception as e:
             print(f"Error fetching hotels in area: {e}")
             return []
 
+        return self._remember(self._parse_hotels(results))
+
+    async def afetch_hotels(self) -> List[Dict]:
+        """
+        Async version of fetch_hotels.
+        """
+        hotels = self._lookup_local()
+        if hotels is not None:
+            return hotels
+
+        try:
+            data = await aget_json(self.base_url, params=self._params(), timeout=10, source="hotels")
+            results = data.get("local_results", [])
+        except Exception as e:
+            print(f"Error fetching hotels in area: {e}")
+            return []
+
+        return self._remember(self._parse_hotels(results))
+
+    def _parse_hotels(self, results: List[Dict]) -> List[Dict]:
         hotels = []
-        for h in results[:self.topk]:
+        for h in results:
+            coordinates = h.get("gps_coordinates") or {}
             hotel = {
                 "name": h.get("title", "Unknown"),
                 "address": h.get("address", ""),
@@ -38,19 +95,30 @@ class SerpAPIHotelsFetcher:
                 "type": h.get("type", "Not available"),
                 "rating": h.get("rating", None),
                 "reviews": h.get("reviews", None),
-                "link": h.get("link", "")
+                "link": h.get("link", ""),
+                "lat": coordinates.get("latitude"),
+                "lon": coordinates.get("longitude"),
+                "place_id": h.get("place_id", "")
             }
             hotels.append(hotel)
 
         return hotels
 
-def get_topk_hotels(city_name: str, topk: int = 10) -> List[Dict]:
+def get_topk_hotels(city_name: str, topk: int = 10, coordinates: Optional[Tuple[float, float]] = None) -> List[Dict]:
     """
     Get the top K hotels in a specified city.
     
     :param city_name: Name of the city to search for hotels.
     :param topk: Number of top hotels to return.
+    :param coordinates: (latitude, longitude) of the city; lets repeat searches be served from the POI store.
     :return: List of dictionaries containing hotel information.
     """
-    fetcher = SerpAPIHotelsFetcher(city_name, topk)
-    return fetcher.fetch_hotels()
\ No newline at end of file
+    fetcher = SerpAPIHotelsFetcher(city_name, topk, coordinates=coordinates)
+    return fetcher.fetch_hotels()
+
+async def aget_topk_hotels(city_name: str, topk: int = 10, coordinates: Optional[Tuple[float, float]] = None) -> List[Dict]:
+    """
+    Async version of get_topk_hotels.
+    """
+    fetcher = SerpAPIHotelsFetcher(city_name, topk, coordinates=coordinates)
+    return await fetcher.afetch_hotels()
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from utils.env_config import get_env_variable
+from utils import deadline
+from utils import response_cache
+from utils.rate_limiter import Slot, get_limiter
+from utils.singleflight import get_singleflight
+from utils import tracing
+
+logger = logging.getLogger(__name__)
+
+# Pool sizing: POOL_CONNECTIONS is how many hosts keep a pool, POOL_MAXSIZE is
+# how many keep-alive connections each host pool holds.
+POOL_CONNECTIONS = int(get_env_variable("HTTP_POOL_CONNECTIONS", "10"))
+POOL_MAXSIZE = int(get_env_variable("HTTP_POOL_MAXSIZE", "20"))
+MAX_RETRIES = int(get_env_variable("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(get_env_variable("HTTP_BACKOFF_FACTOR", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_delay(backoff_factor: float, attempt: int, retry_after: Optional[str]) -> float:
+    delay = _retry_after(retry_after)
+    return delay if delay is not None else backoff_factor * (2 ** attempt)
+
+
+def _slot_delay(delay: float, status: Optional[int]) -> float:
+    # After a 429 the limiter has paused for Retry-After itself, so queueing for a new slot is the backoff.
+    return 0.0 if status == 429 else delay
+
+
+class HTTPClient:
+    """
+    Pooled requests session. Retries are done here rather than by urllib3, so
+    every attempt and every backoff sleep fits in the plan's remaining deadline.
+    """
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+            headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Send one GET request over the pooled session.
+        """
+        return self.session.get(url, params=params, timeout=timeout, headers=headers)
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                 headers: Optional[Dict[str, str]] = None, slot: Optional[Slot] = None) -> Any:
+        """
+        GET a URL and return the decoded JSON body, retrying connection errors
+        and 429/5xx with backoff while the deadline allows; raises on HTTP errors.
+        Every 429 is reported to the rate limiter slot if given, and every retry
+        gives the slot back and queues for a new one.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                # A read timeout means the upstream is slow; retrying it would only
+                # multiply the wait, so it is not retried.
+                response = self.get(url, params=params, timeout=deadline.timeout(timeout), headers=headers)
+            except requests.exceptions.ConnectionError:
+                delay = _retry_delay(self.backoff_factor, attempt, None)
+                if attempt >= self.max_retries or not deadline.allows(delay):
+                    raise
+                self._back_off(delay, slot)
+                continue
+            if response.status_code == 429 and slot is not None:
+                slot.throttled(_retry_after(response.headers.get("Retry-After")))
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = _retry_delay(self.backoff_factor, attempt, response.headers.get("Retry-After"))
+                # No point sleeping for a retry that cannot finish in time.
+                if deadline.allows(delay):
+                    logger.debug(f"Retrying {url} after HTTP {response.status_code} in {delay:.2f}s")
+                    self._back_off(delay, slot, response.status_code)
+                    continue
+            tracing.annotate(status=response.status_code, bytes=len(response.content), retries=attempt)
+            response.raise_for_status()
+            return response.json()
+
+    def _back_off(self, delay: float, slot: Optional[Slot], status: Optional[int] = None) -> None:
+        if slot is not None:
+            slot.retry(_slot_delay(delay, status))
+        else:
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    Return the process-wide HTTP client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient()
+    return _client
+
+
+def _http_span(url: str, source: Optional[str]):
+    host = urlsplit(url).hostname
+    return tracing.span(source or host or url, kind="http", host=host, source=source)
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+             headers: Optional[Dict[str, str]] = None, source: Optional[str] = None) -> Any:
+    """
+    Convenience function to GET JSON through the shared client.
+    When source names a cache policy, fresh cached responses are served without a request.
+    """
+    with _http_span(url, source):
+        key, cached = response_cache.lookup(source, url, params)
+        if cached is not response_cache.MISSING:
+            tracing.annotate(cache="hit")
+            return cached
+        if key is not None:
+            tracing.annotate(cache="miss")
+        limiter = get_limiter(source, params)
+
+        def fetch() -> Any:
+            with limiter.slot(source) if limiter is not None else nullcontext() as slot:
+                # The plan's remaining budget caps each attempt, measured once a slot is free.
+                return get_http_client().get_json(url, params=params, timeout=timeout, headers=headers, slot=slot)
+
+        # Identical requests already in flight share that response instead of sending another.
+        try:
+            data, coalesced = get_singleflight().do(key or response_cache.make_cache_key(source, url, params), fetch)
+        except Exception as e:
+            deadline.record_failure(e)
+            raise
+        if coalesced:
+            tracing.annotate(coalesced=True)
+        else:
+            response_cache.store(source, key, data)
+        return data
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _query_params(params: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Encode params the way requests does: drop None values, stringify the rest.
+    """
+    return {k: str(v) for k, v in (params or {}).items() if v is not None}
+
+
+class AsyncHTTPClient:
+    """
+    aiohttp counterpart of HTTPClient, bound to the event loop that created it.
+    """
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+    ):
+        self.limit = pool_connections * pool_maxsize
+        self.limit_per_host = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+
+    def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                       headers: Optional[Dict[str, str]] = None, slot: Optional[Slot] = None) -> Any:
+        """
+        GET a URL and return the decoded JSON body, retrying connection errors
+        and 429/5xx with backoff while the deadline allows; raises on HTTP errors.
+        Every 429 is reported to the rate limiter slot if given, and every retry
+        gives the slot back and queues for a new one.
+        """
+        import aiohttp
+
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            client_timeout = aiohttp.ClientTimeout(total=deadline.timeout(timeout))
+            status = None
+            try:
+                async with session.get(url, params=_query_params(params), timeout=client_timeout,
+                                       headers=headers) as response:
+                    if response.status == 429 and slot is not None:
+                        slot.throttled(_retry_after(response.headers.get("Retry-After")))
+                    delay = None
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = _retry_delay(self.backoff_factor, attempt, response.headers.get("Retry-After"))
+                    if delay is None or not deadline.allows(delay):
+                        body = await response.read()
+                        tracing.annotate(status=response.status, bytes=len(body), retries=attempt)
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+                    logger.debug(f"Retrying {url} after HTTP {response.status} in {delay:.2f}s")
+                    status = response.status
+            except aiohttp.ClientConnectionError as e:
+                delay = _retry_delay(self.backoff_factor, attempt, None)
+                # Timeouts mean the upstream is slow and are not retried, as in HTTPClient.
+                if isinstance(e, asyncio.TimeoutError) or attempt >= self.max_retries or not deadline.allows(delay):
+                    raise
+            # Back off with the connection back in the pool.
+            await self._back_off(delay, slot, status)
+
+    async def _back_off(self, delay: float, slot: Optional[Slot], status: Optional[int] = None) -> None:
+        if slot is not None:
+            await slot.aretry(_slot_delay(delay, status))
+        else:
+            await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_async_clients: Dict[asyncio.AbstractEventLoop, AsyncHTTPClient] = {}
+
+
+def get_async_http_client() -> AsyncHTTPClient:
+    """
+    Return the async HTTP client for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        for stale_loop in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale_loop]
+        client = _async_clients[loop] = AsyncHTTPClient()
+    return client
+
+
+async def aget_json(url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10,
+                    headers: Optional[Dict[str, str]] = None, source: Optional[str] = None) -> Any:
+    """
+    Convenience function to GET JSON through the running loop's async client.
+    """
+    with _http_span(url, source):
+        key, cached = response_cache.lookup(source, url, params)
+        if cached is not response_cache.MISSING:
+            tracing.annotate(cache="hit")
+            return cached
+        if key is not None:
+            tracing.annotate(cache="miss")
+        limiter = get_limiter(source, params)
+
+        async def fetch() -> Any:
+            async with limiter.slot(source) if limiter is not None else nullcontext() as slot:
+                return await get_async_http_client().get_json(url, params=params, timeout=timeout,
+                                                              headers=headers, slot=slot)
+
+        try:
+            data, coalesced = await get_singleflight().ado(key or response_cache.make_cache_key(source, url, params),
+                                                           fetch)
+        except Exception as e:
+            deadline.record_failure(e)
+            raise
+        if coalesced:
+            tracing.annotate(coalesced=True)
+        else:
+            response_cache.store(source, key, data)
+        return data
+
+
+async def aclose_async_http_client() -> None:
+    """
+    Close the running loop's async client; call this before the loop shuts down.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,359 @@
+import math
+import re
+from datetime import date, timedelta
+from itertools import permutations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from utils.env_config import get_env_variable
+
+# Minutes after midnight the first visit of a day can start, and the latest a visit may end.
+DAY_START_MINUTES = 9 * 60
+DAY_END_MINUTES = 20 * 60
+VISIT_MINUTES = int(get_env_variable("ITINERARY_VISIT_MINUTES", "90"))
+# Visits one day can hold; also keeps each day's 2-opt search small.
+MAX_STOPS_PER_DAY = int(get_env_variable(
+    "ITINERARY_MAX_STOPS_PER_DAY", str((DAY_END_MINUTES - DAY_START_MINUTES) // VISIT_MINUTES)))
+# Average door-to-door city travel speed used to turn distances into travel time.
+TRAVEL_SPEED_KMH = float(get_env_variable("ITINERARY_TRAVEL_SPEED_KMH", "20"))
+
+EARTH_RADIUS_KM = 6371.0
+WEEKDAYS = ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su")
+# Route cost per minute of waiting for a place to open / of arriving too late, and per closed visit.
+WAIT_PENALTY_KM = 0.05
+LATE_PENALTY_KM = 1.0
+CLOSED_PENALTY_KM = 1000.0
+
+Hours = Dict[int, List[Tuple[int, int]]]
+
+_TIME_RANGE = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$")
+
+
+def _parse_days(spec: str) -> Optional[List[int]]:
+    days: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, _, last = part.partition("-")
+            if first not in WEEKDAYS or last not in WEEKDAYS:
+                return None
+            start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+            days.extend((start + i) % 7 for i in range((end - start) % 7 + 1))
+        elif part in WEEKDAYS:
+            days.append(WEEKDAYS.index(part))
+        else:
+            return None
+    return days
+
+
+def _parse_times(spec: str) -> Optional[List[Tuple[int, int]]]:
+    if spec in ("off", "closed"):
+        return []
+    windows = []
+    for part in spec.split(","):
+        match = _TIME_RANGE.match(part.strip())
+        if not match:
+            return None
+        h1, m1, h2, m2 = (int(g) for g in match.groups())
+        opens, closes = h1 * 60 + m1, h2 * 60 + m2
+        if closes <= opens:
+            # Open past midnight; the evening part is what matters for sightseeing.
+            closes = 24 * 60
+        windows.append((opens, closes))
+    return windows
+
+
+def parse_opening_hours(text: Any) -> Optional[Hours]:
+    """
+    Weekday (0 = Monday) -> [(opens, closes)] in minutes after midnight, from an
+    OpenStreetMap opening_hours string such as "Mo-Fr 09:00-17:00; Sa 10:00-14:00; Su off".
+    Days a rule does not mention are closed. Returns None when the value is
+    missing or uses syntax beyond plain weekday rules (public holidays, months, ...),
+    in which case the place is treated as always open.
+    """
+    if not isinstance(text, str) or not text.strip() or text == "Not available":
+        return None
+    text = text.strip()
+    if text == "24/7":
+        return {day: [(0, 24 * 60)] for day in range(7)}
+    hours: Hours = {day: [] for day in range(7)}
+    for rule in text.split(";"):
+        rule = rule.strip()
+        if not rule:
+            continue
+        days_spec, _, times_spec = rule.partition(" ")
+        if days_spec[:2] in WEEKDAYS:
+            days = _parse_days(days_spec)
+            times = _parse_times(times_spec.strip())
+        else:
+            days, times = list(range(7)), _parse_times(rule)
+        if days is None or times is None:
+            return None
+        # Later rules override earlier ones for the days they name.
+        for day in days:
+            hours[day] = times
+    return hours
+
+
+def distance_matrix(latitudes: Sequence[float], longitudes: Sequence[float]):
+    """
+    n x n great-circle distances in km, computed for all pairs at once.
+    """
+    import numpy as np
+
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    d_lat = lat[:, None] - lat[None, :]
+    d_lon = lon[:, None] - lon[None, :]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def cluster(latitudes: Sequence[float], longitudes: Sequence[float], k: int, iterations: int = 25) -> List[int]:
+    """
+    Split points into k geographic clusters of near-equal size (at most ceil(n / k) each).
+    k-means on a local planar projection, seeded deterministically with
+    farthest-point picks, then a capacity-bounded assignment to the centroids.
+    """
+    import numpy as np
+
+    n = len(latitudes)
+    if k <= 1 or n <= 1:
+        return [0] * n
+    k = min(k, n)
+    lat = np.asarray(latitudes, dtype=float)
+    lon = np.asarray(longitudes, dtype=float)
+    points = np.column_stack((lon * math.cos(math.radians(float(lat.mean()))) * 111.32, lat * 110.57))
+
+    seeds = [int(np.argmax(((points - points.mean(axis=0)) ** 2).sum(axis=1)))]
+    while len(seeds) < k:
+        nearest = ((points[:, None, :] - points[seeds][None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        seeds.append(int(np.argmax(nearest)))
+    centroids = points[seeds].copy()
+    for _ in range(iterations):
+        labels = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        updated = np.array([
+            points[labels == c].mean(axis=0) if (labels == c).any() else centroids[c] for c in range(k)
+        ])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    capacity = math.ceil(n / k)
+    distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    labels = [-1] * n
+    sizes = [0] * k
+    for flat in np.argsort(distances, axis=None):
+        point, c = divmod(int(flat), k)
+        if labels[point] == -1 and sizes[c] < capacity:
+            labels[point] = c
+            sizes[c] += 1
+    return labels
+
+
+def _clock(minutes: float) -> str:
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def schedule(order: Sequence[int], matrix, hours: Sequence[Optional[Hours]], weekday: Optional[int],
+             start: int = 0) -> Tuple[float, List[Dict[str, Any]]]:
+    """
+    Walk the visits in order from the start point (matrix index start), waiting
+    for places that are not open yet. Returns (cost, stops) where cost is the
+    distance in km plus penalties for waiting, late arrivals and closed places.
+    """
+    cost, clock, previous, stops = 0.0, float(DAY_START_MINUTES), start, []
+    for place in order:
+        km = float(matrix[previous, place])
+        cost += km
+        clock += km / TRAVEL_SPEED_KMH * 60
+        windows = None
+        if hours[place] is not None and weekday is not None:
+            windows = hours[place].get(weekday, [])
+        status = "open"
+        if windows == []:
+            status = "closed"
+            cost += CLOSED_PENALTY_KM
+        elif windows:
+            # First window the visit still fits in, else the last one (arriving late).
+            window = next((w for w in windows if clock + VISIT_MINUTES <= w[1]), windows[-1])
+            if clock < window[0]:
+                cost += (window[0] - clock) * WAIT_PENALTY_KM
+                clock = float(window[0])
+            late = clock + VISIT_MINUTES - window[1]
+            if late > 0:
+                status = "closes_early"
+                cost += late * LATE_PENALTY_KM
+        if clock + VISIT_MINUTES > DAY_END_MINUTES:
+            cost += (clock + VISIT_MINUTES - DAY_END_MINUTES) * LATE_PENALTY_KM
+        stops.append({"index": place, "travel_km": round(km, 2), "arrive": _clock(clock),
+                      "leave": _clock(clock + VISIT_MINUTES), "end": clock + VISIT_MINUTES, "status": status})
+        clock += VISIT_MINUTES
+        previous = place
+    return cost, stops
+
+
+def order_visits(places: Sequence[int], matrix, hours: Sequence[Optional[Hours]], weekday: Optional[int],
+                 start: int = 0) -> Tuple[float, List[Dict[str, Any]]]:
+    """
+    Nearest-neighbour route from the start point, improved with 2-opt moves
+    scored by schedule() so opening hours count as well as distance.
+    """
+    remaining, order, current = list(places), [], start
+    while remaining:
+        current = min(remaining, key=lambda place: matrix[current, place])
+        remaining.remove(current)
+        order.append(current)
+
+    best_cost, best_stops = schedule(order, matrix, hours, weekday, start)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                cost, stops = schedule(candidate, matrix, hours, weekday, start)
+                if cost < best_cost - 1e-9:
+                    order, best_cost, best_stops, improved = candidate, cost, stops, True
+    return best_cost, best_stops
+
+
+def _open_on(hours: Optional[Hours], weekday: Optional[int]) -> bool:
+    return hours is None or weekday is None or bool(hours.get(weekday))
+
+
+def _closeness(i: int, day: int, days: List[int], matrix) -> float:
+    # Distance from spot i to the nearest other spot on that day, or to the base if it has none.
+    members = [j for j, other in enumerate(days) if other == day and j != i]
+    return min((float(matrix[i + 1, j + 1]) for j in members), default=float(matrix[i + 1, 0]))
+
+
+def _assign_days(labels: List[int], k: int, matrix, hours: Sequence[Optional[Hours]],
+                 weekdays: Sequence[Optional[int]]) -> List[int]:
+    """
+    Trip day for each spot: clusters are matched to days so the fewest spots
+    land on a day they are closed, then any spot still closed on its day moves
+    to the nearest day's group that it is open for.
+    """
+    n_days = len(weekdays)
+    closed = [[sum(1 for i, label in enumerate(labels) if label == c and not _open_on(hours[i + 1], weekdays[d]))
+               for d in range(n_days)] for c in range(k)]
+    if n_days <= 7:
+        day_of_cluster = min(permutations(range(n_days), k),
+                             key=lambda days_for: sum(closed[c][d] for c, d in enumerate(days_for)))
+    else:
+        day_of_cluster = tuple(range(k))
+    days = [day_of_cluster[label] for label in labels]
+
+    for i, day in enumerate(days):
+        if _open_on(hours[i + 1], weekdays[day]):
+            continue
+        options = [d for d in range(n_days) if _open_on(hours[i + 1], weekdays[d])]
+        if not options:
+            continue
+        days[i] = min(options, key=lambda d: _closeness(i, d, days, matrix))
+    return days
+
+
+def _cap_days(days: List[int], n_days: int, matrix, hours: Sequence[Optional[Hours]],
+              weekdays: Sequence[Optional[int]], capacity: int = MAX_STOPS_PER_DAY) -> List[int]:
+    """
+    Keep at most capacity spots per day, the first ones in input order (the
+    upstream ranking). The rest move to the nearest day with room that they
+    are open on, or get day -1 when there is none.
+    """
+    days = list(days)
+    counts = [0] * n_days
+    overflow = []
+    for i, day in enumerate(days):
+        if counts[day] < capacity:
+            counts[day] += 1
+        else:
+            overflow.append(i)
+            days[i] = -1
+    for i in overflow:
+        options = [d for d in range(n_days) if counts[d] < capacity and _open_on(hours[i + 1], weekdays[d])]
+        if options:
+            days[i] = min(options, key=lambda d: _closeness(i, d, days, matrix))
+            counts[days[i]] += 1
+    return days
+
+
+def plan_itinerary(attractions: Sequence[Dict[str, Any]], num_days: int, start_date: Optional[str] = None,
+                   base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Day-by-day visiting plan for attractions with lat/lon.
+
+    Spots are split into num_days geographic clusters, clusters are matched to
+    trip days by opening days, and each day is ordered as a route from base
+    (e.g. the hotel; defaults to the spots' centre) that respects opening
+    hours where they can be parsed. A day holds at most MAX_STOPS_PER_DAY
+    spots and ends by DAY_END_MINUTES; spots that do not fit, and spots
+    without coordinates, are listed in "unplaced".
+    """
+    placed, unplaced = [], []
+    for spot in attractions:
+        if spot.get("lat") is not None and spot.get("lon") is not None:
+            placed.append(spot)
+        else:
+            unplaced.append(spot.get("name", "Unknown"))
+    num_days = max(int(num_days or 1), 1)
+    try:
+        first_day = date.fromisoformat(start_date) if start_date else None
+    except ValueError:
+        first_day = None
+    dates = [first_day + timedelta(days=i) if first_day else None for i in range(num_days)]
+    weekdays = [day.weekday() if day else None for day in dates]
+
+    if base is None or base.get("lat") is None or base.get("lon") is None:
+        base = {
+            "name": "City centre",
+            "lat": sum(s["lat"] for s in placed) / len(placed) if placed else None,
+            "lon": sum(s["lon"] for s in placed) / len(placed) if placed else None,
+        }
+    plan: Dict[str, Any] = {
+        "base": {"name": base.get("name"), "lat": base.get("lat"), "lon": base.get("lon")},
+        "days": [],
+        "unplaced": unplaced,
+    }
+    if not placed:
+        plan["days"] = [{"day": i + 1, "date": d.isoformat() if d else None, "total_km": 0.0, "stops": []}
+                        for i, d in enumerate(dates)]
+        return plan
+
+    # Row/column 0 of the matrix is the base; spot i is index i + 1.
+    matrix = distance_matrix([base["lat"]] + [s["lat"] for s in placed], [base["lon"]] + [s["lon"] for s in placed])
+    hours = [None] + [parse_opening_hours(spot.get("opening_hours")) for spot in placed]
+    k = min(num_days, len(placed))
+    labels = cluster([s["lat"] for s in placed], [s["lon"] for s in placed], k)
+    days = _cap_days(_assign_days(labels, k, matrix, hours, weekdays), num_days, matrix, hours, weekdays)
+    plan["unplaced"] += [placed[i].get("name", "Unknown") for i, day in enumerate(days) if day == -1]
+
+    for day, day_date in enumerate(dates):
+        members = [i + 1 for i, assigned in enumerate(days) if assigned == day]
+        cost, stops = order_visits(members, matrix, hours, weekdays[day]) if members else (0.0, [])
+        # Visits run in clock order, so once one ends after the day does, so do the rest.
+        late = next((n for n, stop in enumerate(stops) if stop["end"] > DAY_END_MINUTES), len(stops))
+        plan["unplaced"] += [placed[stop["index"] - 1].get("name", "Unknown") for stop in stops[late:]]
+        stops = stops[:late]
+        total_km = sum(stop["travel_km"] for stop in stops)
+        if stops:
+            total_km += float(matrix[stops[-1]["index"], 0])
+        plan["days"].append({
+            "day": day + 1,
+            "date": day_date.isoformat() if day_date else None,
+            "total_km": round(total_km, 2),
+            "stops": [
+                {
+                    "name": placed[stop["index"] - 1].get("name", "Unknown"),
+                    "lat": placed[stop["index"] - 1]["lat"],
+                    "lon": placed[stop["index"] - 1]["lon"],
+                    "arrive": stop["arrive"],
+                    "leave": stop["leave"],
+                    "travel_km": stop["travel_km"],
+                    "opening_hours": placed[stop["index"] - 1].get("opening_hours"),
+                    "status": stop["status"],
+                }
+                for stop in stops
+            ],
+        })
+    return plan
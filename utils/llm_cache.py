@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.llms import BaseLLM
+from langchain_core.load import dumps
+from langchain_core.messages import message_chunk_to_message, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from utils.env_config import get_env_variable
+from utils.response_cache import CACHE_DIR, TieredCache
+from utils import tracing
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = get_env_variable("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+LLM_CACHE_PATH = get_env_variable("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.sqlite3"))
+LLM_CACHE_TTL = int(get_env_variable("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(get_env_variable("LLM_CACHE_MEMORY_ENTRIES", "128"))
+LLM_CACHE_DISK_ENTRIES = int(get_env_variable("LLM_CACHE_DISK_ENTRIES", "5000"))
+
+
+def make_llm_cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Hash of the model identity and parameters (llm_string) and the serialized prompt.
+    """
+    payload = json.dumps([llm_string, prompt])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode(generation: Generation) -> Dict[str, Any]:
+    if isinstance(generation, ChatGeneration):
+        return {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+    return {"text": generation.text, "generation_info": generation.generation_info}
+
+
+def _decode(entry: Dict[str, Any]) -> Generation:
+    if "message" in entry:
+        (message,) = messages_from_dict([entry["message"]])
+        return ChatGeneration(message=message, generation_info=entry.get("generation_info"))
+    return Generation(text=entry["text"], generation_info=entry.get("generation_info"))
+
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache backed by a TieredCache (in-memory LRU over SQLite).
+
+    Passed as cache= to a chat or completion model, it is consulted by every
+    invoke/ainvoke, so identical prompts to a model with identical parameters are answered
+    without a completion request. It is attached to each provider client rather
+    than to the router, so the key names the model that wrote the answer.
+    """
+    def __init__(self, store: TieredCache, ttl: float = LLM_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self._counters = {"hits": 0, "misses": 0}
+
+    def record_lookup(self, hit: bool) -> None:
+        self._counters["hits" if hit else "misses"] += 1
+        tracing.annotate(cache="hit" if hit else "miss")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        value = self.store.get(make_llm_cache_key(prompt, llm_string))
+        self.record_lookup(value is not None)
+        if value is None:
+            return None
+        try:
+            return [_decode(entry) for entry in value]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable LLM cache entry: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.store.set(make_llm_cache_key(prompt, llm_string), [_encode(g) for g in return_val], self.ttl)
+
+    def contains(self, prompt: str, llm_string: str) -> bool:
+        return self.store.contains(make_llm_cache_key(prompt, llm_string))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+    # Lookups are a dict probe or one indexed SQLite read; not worth a thread hop.
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Prompt-level hits and misses (streamed prompts included) plus the storage tier counters.
+        """
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self.store.stats(),
+            **self._counters,
+            "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+        }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Return the process-wide LLM response cache, or None when LLM_CACHE_ENABLED is off.
+    """
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        with _cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache(TieredCache(
+                    LLM_CACHE_PATH,
+                    table="llm_responses",
+                    max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                    max_disk_entries=LLM_CACHE_DISK_ENTRIES,
+                ))
+    return _llm_cache
+
+
+def _cache_entry(model: Any, prompt: Any, stop: Optional[List[str]] = None):
+    """
+    (cache, serialized prompt, llm_string) the way BaseChatModel or BaseLLM keys
+    an invoke, or None when the model does not use an LLMResponseCache.
+    """
+    cache = getattr(model, "cache", None)
+    if not isinstance(cache, LLMResponseCache):
+        return None
+    if isinstance(model, BaseChatModel):
+        messages = model._convert_input(prompt).to_messages()
+        return cache, dumps(messages), model._get_llm_string(stop=stop)
+    if isinstance(model, BaseLLM):
+        # Completion models key on the prompt text and their sorted parameters (see get_prompts).
+        params = model._dict_for_compat()
+        params["stop"] = stop
+        return cache, model._convert_input(prompt).to_string(), str(sorted(params.items()))
+    return None
+
+
+def is_cached(model: Any, prompt: Any, stop: Optional[List[str]] = None) -> bool:
+    """
+    Whether model would answer prompt from its cache without a completion request.
+    """
+    entry = _cache_entry(model, prompt, stop)
+    return entry is not None and entry[0].contains(entry[1], entry[2])
+
+
+def _store_stream(entry, chunks: List[Any]) -> None:
+    if entry is None or not chunks:
+        return
+    cache, prompt, llm_string = entry
+    if isinstance(chunks[0], str):
+        # Completion models stream plain text.
+        cache.update(prompt, llm_string, [Generation(text="".join(chunks))])
+        return
+    full = chunks[0]
+    for chunk in chunks[1:]:
+        full = full + chunk
+    cache.update(prompt, llm_string, [ChatGeneration(message=message_chunk_to_message(full))])
+
+
+def stream_with_cache(model: Any, prompt: Any, stop: Optional[List[str]] = None, **kwargs: Any) -> Iterator[Any]:
+    """
+    model.stream(prompt), but answered from the model's cache when possible.
+
+    Neither BaseChatModel.stream nor BaseLLM.stream reads or writes the cache, so a hit is served
+    through invoke (one chunk, still reported to callbacks) and a completed
+    stream is stored under the same key invoke would use. kwargs (e.g. config)
+    go to invoke/stream.
+    """
+    entry = _cache_entry(model, prompt, stop)
+    if entry is not None and entry[0].contains(entry[1], entry[2]):
+        yield model.invoke(prompt, stop=stop, **kwargs)
+        return
+    if entry is not None:
+        entry[0].record_lookup(False)
+    chunks = []
+    for chunk in model.stream(prompt, stop=stop, **kwargs):
+        chunks.append(chunk)
+        yield chunk
+    _store_stream(entry, chunks)
+
+
+async def astream_with_cache(model: Any, prompt: Any, stop: Optional[List[str]] = None,
+                             **kwargs: Any) -> AsyncIterator[Any]:
+    """
+    Async version of stream_with_cache.
+    """
+    entry = _cache_entry(model, prompt, stop)
+    if entry is not None and entry[0].contains(entry[1], entry[2]):
+        yield await model.ainvoke(prompt, stop=stop, **kwargs)
+        return
+    if entry is not None:
+        entry[0].record_lookup(False)
+    chunks = []
+    async for chunk in model.astream(prompt, stop=stop, **kwargs):
+        chunks.append(chunk)
+        yield chunk
+    _store_stream(entry, chunks)
@@ -1,18 +1,138 @@
-from langchain_google_genai import GoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+import threading
+from typing import Any, Callable, Dict
 from utils.env_config import get_env_variable
-gemini_llm = GoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    temperature=0.2,
-    google_api_key=get_env_variable("GEMINI_API_KEY"),
-    max_output_tokens=1024,)
+
+# Provider SDKs (langchain_openai, langchain_groq, langchain_google_genai) take
+# seconds to import, so each client is built the first time it is used.
+# The clients share the LLM response cache; its keys carry each client's
+# model and parameters, so one provider's answer is never served as another's.
+
+GEMINI_MAX_OUTPUT_TOKENS = 1024
+
+def _build_gemini():
+    from langchain_google_genai import GoogleGenerativeAI
+    from utils.llm_cache import get_llm_cache
+    return GoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        temperature=0.2,
+        google_api_key=get_env_variable("GEMINI_API_KEY"),
+        max_output_tokens=GEMINI_MAX_OUTPUT_TOKENS,
+        cache=get_llm_cache(),)
 
 model_name = "deepseek-r1-distill-llama-70b"
-llm_groq = ChatGroq(model=model_name, api_key=get_env_variable("GROQ_API_KEY"))
 
-llm = ChatOpenAI(
-        model="gpt-4o",    
+def _build_groq():
+    from langchain_groq import ChatGroq
+    from utils.llm_cache import get_llm_cache
+    # deepseek-r1 thinks out loud; keep the reasoning out of report text.
+    return ChatGroq(model=model_name, api_key=get_env_variable("GROQ_API_KEY"), reasoning_format="hidden",
+                    cache=get_llm_cache())
+
+def _build_openai():
+    from langchain_openai import ChatOpenAI
+    from utils.llm_cache import get_llm_cache
+    return ChatOpenAI(
+        model="gpt-4o",
         temperature=0,
-        api_key=get_env_variable("OPENAI_API_KEY"), 
-    )
\ No newline at end of file
+        api_key=get_env_variable("OPENAI_API_KEY"),
+        # Report token usage on streamed completions too, for the LLM trace spans.
+        stream_usage=True,
+        cache=get_llm_cache(),
+    )
+
+def with_timeout(model: Any, seconds: float) -> Any:
+    """
+    Copy of a provider client whose requests give up after seconds, with the
+    SDK's own retries off so the whole call fits in that time. Clients this
+    module does not build (e.g. fakes passed to set_llm) are returned as they are.
+    """
+    root = getattr(model, "root_client", None)
+    if root is not None:
+        # ChatOpenAI keeps the SDK clients next to the completions resources it calls.
+        root = root.with_options(timeout=seconds, max_retries=0)
+        aroot = model.root_async_client.with_options(timeout=seconds, max_retries=0)
+        return model.model_copy(update={"root_client": root, "client": root.chat.completions,
+                                        "root_async_client": aroot, "async_client": aroot.chat.completions})
+    sdk = getattr(getattr(model, "client", None), "_client", None)
+    if hasattr(sdk, "with_options"):
+        # ChatGroq keeps only the completions resources.
+        asdk = model.async_client._client
+        return model.model_copy(update={
+            "client": sdk.with_options(timeout=seconds, max_retries=0).chat.completions,
+            "async_client": asdk.with_options(timeout=seconds, max_retries=0).chat.completions,
+        })
+    chat = getattr(model, "client", None)
+    if "timeout" in getattr(type(model), "model_fields", {}) and "timeout" in getattr(type(chat), "model_fields", {}):
+        # GoogleGenerativeAI delegates to a ChatGoogleGenerativeAI, which reads both per request.
+        options = {"timeout": seconds, "max_retries": 0}
+        return model.model_copy(update={**options, "client": chat.model_copy(update=options)})
+    return model
+
+def _build_router():
+    from utils.llm_wrapper.router import LLMRouter
+    # Caching happens in the provider clients, once the answering provider is known.
+    return LLMRouter()
+
+
+_providers: Dict[str, Callable[[], Any]] = {
+    "gemini": _build_gemini,
+    "groq": _build_groq,
+    "openai": _build_openai,
+    "router": _build_router,
+}
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register_llm(name: str, factory: Callable[[], Any]) -> None:
+    """
+    Register (or replace) a provider factory; the client is built on first use.
+    """
+    with _lock:
+        _providers[name] = factory
+        _instances.pop(name, None)
+
+
+def set_llm(name: str, model: Any) -> None:
+    """
+    Use an already built model for a provider, e.g. a fake chat model in benchmarks.
+    """
+    with _lock:
+        _instances[name] = model
+
+
+def get_llm(name: str = "openai") -> Any:
+    """
+    Return the client for a provider, building it on first use.
+    """
+    model = _instances.get(name)
+    if model is None:
+        with _lock:
+            model = _instances.get(name)
+            if model is None:
+                if name not in _providers:
+                    raise KeyError(f"Unknown LLM provider: {name}")
+                model = _instances[name] = _providers[name]()
+    return model
+
+
+class LazyLLM:
+    """
+    Stand-in for a provider client that forwards every attribute to get_llm(name),
+    so modules can import it at load time without building the client.
+    """
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(get_llm(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"LazyLLM({self._name!r})"
+
+
+gemini_llm = LazyLLM("gemini")
+llm_groq = LazyLLM("groq")
+llm = LazyLLM("openai")
+# What the report and expense generators call: picks among the providers above.
+llm_router = LazyLLM("router")
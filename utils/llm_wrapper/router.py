@@ -0,0 +1,649 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, BaseMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from utils.env_config import get_env_variable
+from utils.llm_cache import astream_with_cache, is_cached, stream_with_cache
+from utils.llm_wrapper.llms import GEMINI_MAX_OUTPUT_TOKENS, get_llm, with_timeout
+from utils import deadline
+from utils import tracing
+
+logger = logging.getLogger(__name__)
+
+# Preference order: the first healthy provider that fits the prompt (and the
+# latency target, when one is given) gets the call.
+LLM_ROUTER_PROVIDERS = [p.strip() for p in get_env_variable("LLM_ROUTER_PROVIDERS", "openai,groq,gemini").split(",") if p.strip()]
+LLM_HEDGING = get_env_variable("LLM_HEDGING", "0") not in ("0", "false", "False")
+# Hedge once the primary is slower than this percentile of its own recent calls.
+LLM_HEDGE_PERCENTILE = float(get_env_variable("LLM_HEDGE_PERCENTILE", "95"))
+# Threshold used until a provider has MIN_SAMPLES calls of history, and the lower bound after.
+LLM_HEDGE_DEFAULT_MS = float(get_env_variable("LLM_HEDGE_DEFAULT_MS", "10000"))
+LLM_HEDGE_MIN_MS = float(get_env_variable("LLM_HEDGE_MIN_MS", "250"))
+# Threads shared by every provider call that runs in the background: hedged
+# calls, calls under a deadline, and provider streams.
+LLM_ROUTER_THREADS = int(get_env_variable("LLM_ROUTER_THREADS", "32"))
+
+# Context windows in tokens; prompts that do not fit are never routed there.
+PROVIDER_CONTEXT_TOKENS = {"openai": 128000, "groq": 128000, "gemini": 1000000}
+# Longest answer each provider's client allows; calls that need more (output_tokens)
+# are not routed there. Providers not listed are not capped.
+PROVIDER_OUTPUT_TOKENS = {"openai": 16384, "gemini": GEMINI_MAX_OUTPUT_TOKENS}
+# Latency is tracked separately for small, medium and large prompts (upper bounds in tokens).
+PROMPT_SIZE_CLASSES = (("small", 2000), ("medium", 8000), ("large", float("inf")))
+CHARS_PER_TOKEN = 4
+WINDOW = 200
+MIN_SAMPLES = 10
+EWMA_ALPHA = 0.2
+# A provider with this many consecutive errors sits out for COOLDOWN_SECONDS.
+MAX_CONSECUTIVE_ERRORS = 3
+COOLDOWN_SECONDS = 30.0
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // CHARS_PER_TOKEN
+
+
+def size_class(prompt_tokens: int) -> str:
+    for name, upper in PROMPT_SIZE_CLASSES:
+        if prompt_tokens <= upper:
+            return name
+    return PROMPT_SIZE_CLASSES[-1][0]
+
+
+def _percentile(values: Deque[float], pct: float) -> Optional[float]:
+    if len(values) < MIN_SAMPLES:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100.0)))]
+
+
+class ProviderStats:
+    """
+    Rolling latency (total and time to first token, per prompt size class),
+    EWMA latency and error counters of one provider.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.latency: Dict[str, Deque[float]] = {cls: deque(maxlen=WINDOW) for cls, _ in PROMPT_SIZE_CLASSES}
+        self.first_token: Dict[str, Deque[float]] = {cls: deque(maxlen=WINDOW) for cls, _ in PROMPT_SIZE_CLASSES}
+        self.ewma_ms: Optional[float] = None
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error_at = 0.0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record_success(self, cls: str, latency_ms: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.consecutive_errors = 0
+            self.latency[cls].append(latency_ms)
+            self.ewma_ms = latency_ms if self.ewma_ms is None else (
+                EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms)
+
+    def record_first_token(self, cls: str, latency_ms: float) -> None:
+        with self._lock:
+            self.first_token[cls].append(latency_ms)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+            self.consecutive_errors += 1
+            self.last_error_at = time.monotonic()
+
+    def record_hedge(self, won: bool = False) -> None:
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+
+    def healthy(self) -> bool:
+        return (self.consecutive_errors < MAX_CONSECUTIVE_ERRORS
+                or time.monotonic() - self.last_error_at > COOLDOWN_SECONDS)
+
+    def percentile(self, cls: str, pct: float, first_token: bool = False) -> Optional[float]:
+        """
+        Latency percentile for a prompt size class, falling back to all sizes
+        while the class has too little history. None until MIN_SAMPLES calls.
+        """
+        samples = self.first_token if first_token else self.latency
+        with self._lock:
+            value = _percentile(samples[cls], pct)
+            if value is None:
+                value = _percentile(deque(v for window in samples.values() for v in window), pct)
+            return value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "ewma_ms": self.ewma_ms,
+            "healthy": self.healthy(),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            **{f"p50_{cls}_ms": self.percentile(cls, 50) for cls, _ in PROMPT_SIZE_CLASSES},
+            **{f"p95_{cls}_ms": self.percentile(cls, 95) for cls, _ in PROMPT_SIZE_CLASSES},
+        }
+
+
+_stats: Dict[str, ProviderStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_provider_stats(name: str) -> ProviderStats:
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = ProviderStats(name)
+        return _stats[name]
+
+
+def get_router_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: stats.snapshot() for name, stats in list(_stats.items())}
+
+
+def _wait_seconds(hedge_after: Optional[float]) -> Optional[float]:
+    """
+    How long to wait on providers: until it is time to hedge, but never past the plan's deadline.
+    """
+    left = deadline.remaining()
+    if left is None:
+        return hedge_after
+    left = max(0.0, left)
+    return left if hedge_after is None else min(hedge_after, left)
+
+
+def _check_deadline() -> None:
+    if deadline.expired():
+        raise deadline.DeadlineExceeded("deadline exceeded while waiting for the LLM")
+
+
+def _bounded(model: Any) -> Any:
+    # Under a deadline the provider request itself gives up when it passes, so a
+    # stalled call frees its thread instead of holding it after the router moved on.
+    left = deadline.remaining()
+    return model if left is None else with_timeout(model, deadline.timeout(left))
+
+
+def _as_message(result: Any) -> AIMessage:
+    # Chat models return messages; completion models (GoogleGenerativeAI) return str.
+    if isinstance(result, BaseMessage):
+        return AIMessage(content=result.content, usage_metadata=getattr(result, "usage_metadata", None),
+                         response_metadata=getattr(result, "response_metadata", {}) or {})
+    return AIMessage(content=str(result))
+
+
+def _as_chunk(result: Any) -> AIMessageChunk:
+    if isinstance(result, BaseMessageChunk):
+        return AIMessageChunk(content=result.content, usage_metadata=getattr(result, "usage_metadata", None))
+    if isinstance(result, BaseMessage):
+        return AIMessageChunk(content=result.content)
+    return AIMessageChunk(content=str(result))
+
+
+# Provider calls run with their own callbacks silenced: the router's run
+# already reports the winning tokens, and a losing hedge must not leak any.
+_SILENT = {"callbacks": []}
+_END = object()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_ROUTER_THREADS, thread_name_prefix="llm-router")
+        return _executor
+
+
+def _submit(func, *args: Any):
+    # Provider calls run in a copy of the caller's context, so they see its deadline.
+    return _get_executor().submit(contextvars.copy_context().run, func, *args)
+
+
+class LLMRouter(BaseChatModel):
+    """
+    Chat model that forwards each call to one of several providers.
+
+    Providers are tried in preference order, skipping ones whose context window
+    is too small for the prompt or whose output cap is below the call's
+    output_tokens, that are cooling down after repeated errors,
+    or whose recent latency for this prompt size misses latency_target_ms.
+    A failed call falls through to the next provider. With hedging enabled, a
+    call that outlives the primary's LLM_HEDGE_PERCENTILE latency (time to first
+    token when streaming) is raced against the next provider and the first
+    answer wins. Under a plan deadline, providers are waited on in the
+    background and the call raises DeadlineExceeded once the deadline passes;
+    each provider request gets the time left as its timeout, so it ends then too.
+    """
+    providers: List[str] = LLM_ROUTER_PROVIDERS
+    hedging: bool = LLM_HEDGING
+    hedge_percentile: float = LLM_HEDGE_PERCENTILE
+    latency_target_ms: Optional[float] = None
+    output_tokens: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"providers": self.providers}
+
+    @property
+    def model_name(self) -> str:
+        return "router:" + ",".join(self.providers)
+
+    def rank(self, prompt_tokens: int, latency_target_ms: Optional[float] = None,
+             output_tokens: Optional[int] = None) -> List[str]:
+        """
+        Providers to try for a prompt, best first.
+        """
+        cls = size_class(prompt_tokens)
+        output_tokens = output_tokens if output_tokens is not None else self.output_tokens
+        fitting = [
+            p for p in self.providers
+            if PROVIDER_CONTEXT_TOKENS.get(p, 0) >= prompt_tokens
+            and PROVIDER_OUTPUT_TOKENS.get(p, float("inf")) >= (output_tokens or 0)
+        ] or list(self.providers)
+        healthy = [p for p in fitting if get_provider_stats(p).healthy()]
+        ranked = healthy + [p for p in fitting if p not in healthy]
+        target = latency_target_ms if latency_target_ms is not None else self.latency_target_ms
+        if target is None:
+            return ranked
+
+        def meets_target(name: str) -> bool:
+            p90 = get_provider_stats(name).percentile(cls, 90)
+            return p90 is None or p90 <= target
+
+        def expected_ms(name: str) -> float:
+            p50 = get_provider_stats(name).percentile(cls, 50)
+            return p50 if p50 is not None else float("inf")
+
+        on_target = [p for p in healthy if meets_target(p)]
+        return on_target + sorted([p for p in ranked if p not in on_target], key=expected_ms)
+
+    def hedge_after_seconds(self, name: str, prompt_tokens: int, first_token: bool = False) -> float:
+        threshold = get_provider_stats(name).percentile(size_class(prompt_tokens), self.hedge_percentile, first_token)
+        return max(threshold if threshold is not None else LLM_HEDGE_DEFAULT_MS, LLM_HEDGE_MIN_MS) / 1000.0
+
+    def _plan(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> Tuple[List[str], int, bool]:
+        prompt_tokens = estimate_tokens(messages)
+        order = self.rank(prompt_tokens, kwargs.pop("latency_target_ms", None), kwargs.pop("output_tokens", None))
+        hedge = kwargs.pop("hedge", self.hedging) and len(order) > 1
+        return order, prompt_tokens, hedge
+
+    @staticmethod
+    def _record_winner(name: str, hedged: bool, hedge_won: bool) -> None:
+        if hedge_won:
+            get_provider_stats(name).record_hedge(won=True)
+        tracing.annotate(provider=name, hedged=hedged or None)
+
+    # --- single provider calls ---
+
+    # A provider answering from its response cache says nothing about its latency,
+    # so cached calls are left out of the provider stats.
+
+    def _invoke_one(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]], cls: str) -> AIMessage:
+        model = _bounded(get_llm(name))
+        if is_cached(model, messages, stop):
+            return _as_message(model.invoke(messages, stop=stop, config=_SILENT))
+        stats = get_provider_stats(name)
+        start = time.perf_counter()
+        try:
+            result = model.invoke(messages, stop=stop, config=_SILENT)
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(cls, (time.perf_counter() - start) * 1000.0)
+        return _as_message(result)
+
+    async def _ainvoke_one(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                           cls: str) -> AIMessage:
+        model = _bounded(get_llm(name))
+        if is_cached(model, messages, stop):
+            return _as_message(await model.ainvoke(messages, stop=stop, config=_SILENT))
+        stats = get_provider_stats(name)
+        start = time.perf_counter()
+        try:
+            result = await model.ainvoke(messages, stop=stop, config=_SILENT)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(cls, (time.perf_counter() - start) * 1000.0)
+        return _as_message(result)
+
+    def _stream_one(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]], cls: str,
+                    cancelled: Optional[threading.Event] = None) -> Iterator[AIMessageChunk]:
+        model = _bounded(get_llm(name))
+        cached = is_cached(model, messages, stop)
+        stats = get_provider_stats(name)
+        start = time.perf_counter()
+        first = True
+        try:
+            for chunk in stream_with_cache(model, messages, stop=stop, config=_SILENT):
+                if cancelled is not None and cancelled.is_set():
+                    return
+                chunk = _as_chunk(chunk)
+                if not chunk.content and not chunk.usage_metadata:
+                    continue
+                if first and not cached:
+                    stats.record_first_token(cls, (time.perf_counter() - start) * 1000.0)
+                first = False
+                yield chunk
+        except Exception:
+            stats.record_error()
+            raise
+        if not cached:
+            stats.record_success(cls, (time.perf_counter() - start) * 1000.0)
+
+    async def _astream_one(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                           cls: str) -> AsyncIterator[AIMessageChunk]:
+        model = _bounded(get_llm(name))
+        cached = is_cached(model, messages, stop)
+        stats = get_provider_stats(name)
+        start = time.perf_counter()
+        first = True
+        try:
+            async for chunk in astream_with_cache(model, messages, stop=stop, config=_SILENT):
+                chunk = _as_chunk(chunk)
+                if not chunk.content and not chunk.usage_metadata:
+                    continue
+                if first and not cached:
+                    stats.record_first_token(cls, (time.perf_counter() - start) * 1000.0)
+                first = False
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+        if not cached:
+            stats.record_success(cls, (time.perf_counter() - start) * 1000.0)
+
+    # --- invoke ---
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        order, prompt_tokens, hedge = self._plan(messages, kwargs)
+        cls = size_class(prompt_tokens)
+        if not hedge and deadline.remaining() is None:
+            last_error: Optional[Exception] = None
+            for name in order:
+                try:
+                    message = self._invoke_one(name, messages, stop, cls)
+                    self._record_winner(name, False, False)
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+                except Exception as e:
+                    logger.warning(f"LLM provider {name} failed, trying the next one: {e}")
+                    last_error = e
+            raise last_error
+
+        pending = {_submit(self._invoke_one, order[0], messages, stop, cls): order[0]}
+        launched, hedged = 1, False
+        timeout = self.hedge_after_seconds(order[0], prompt_tokens) if hedge else None
+        done, _ = wait(pending, timeout=_wait_seconds(timeout))
+        last_error = None
+        try:
+            while True:
+                if not done:
+                    _check_deadline()
+                if not done and hedge and not hedged:
+                    hedged = True
+                    get_provider_stats(order[0]).record_hedge()
+                    pending[_submit(self._invoke_one, order[launched], messages, stop, cls)] = order[launched]
+                    launched += 1
+                for future in done:
+                    name = pending.pop(future)
+                    if future.exception() is None:
+                        self._record_winner(name, hedged, name != order[0])
+                        return ChatResult(generations=[ChatGeneration(message=future.result())])
+                    last_error = future.exception()
+                    logger.warning(f"LLM provider {name} failed: {last_error}")
+                if not pending:
+                    if launched >= len(order):
+                        raise last_error
+                    pending[_submit(self._invoke_one, order[launched], messages, stop, cls)] = order[launched]
+                    launched += 1
+                can_hedge = hedge and not hedged and launched < len(order)
+                timeout = self.hedge_after_seconds(order[0], prompt_tokens) if can_hedge else None
+                done, _ = wait(pending, timeout=_wait_seconds(timeout), return_when=FIRST_COMPLETED)
+        finally:
+            # Calls still queued are dropped; running ones end at the deadline (see _bounded).
+            for future in pending:
+                future.cancel()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        order, prompt_tokens, hedge = self._plan(messages, kwargs)
+        cls = size_class(prompt_tokens)
+        pending: Dict[asyncio.Task, str] = {}
+        launched, hedged = 0, False
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            nonlocal launched
+            name = order[launched]
+            pending[asyncio.ensure_future(self._ainvoke_one(name, messages, stop, cls))] = name
+            launched += 1
+
+        launch()
+        try:
+            while True:
+                can_hedge = hedge and not hedged and launched < len(order)
+                timeout = self.hedge_after_seconds(order[0], prompt_tokens) if can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=_wait_seconds(timeout),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    _check_deadline()
+                    if not can_hedge:
+                        continue
+                    hedged = True
+                    get_provider_stats(order[0]).record_hedge()
+                    launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        self._record_winner(name, hedged, name != order[0])
+                        return ChatResult(generations=[ChatGeneration(message=task.result())])
+                    last_error = task.exception()
+                    logger.warning(f"LLM provider {name} failed: {last_error}")
+                if not pending:
+                    if launched >= len(order):
+                        raise last_error
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- stream ---
+
+    def _emit(self, chunk: AIMessageChunk, run_manager: Optional[CallbackManagerForLLMRun]) -> ChatGenerationChunk:
+        generation = ChatGenerationChunk(message=chunk)
+        if run_manager:
+            run_manager.on_llm_new_token(chunk.content if isinstance(chunk.content, str) else "", chunk=generation)
+        return generation
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        order, prompt_tokens, hedge = self._plan(messages, kwargs)
+        cls = size_class(prompt_tokens)
+        if not hedge and deadline.remaining() is None:
+            for i, name in enumerate(order):
+                started = False
+                try:
+                    for chunk in self._stream_one(name, messages, stop, cls):
+                        if not started:
+                            self._record_winner(name, False, False)
+                            started = True
+                        yield self._emit(chunk, run_manager)
+                    return
+                except Exception as e:
+                    # Once tokens have gone out, switching providers would garble the text.
+                    if started or i == len(order) - 1:
+                        raise
+                    logger.warning(f"LLM provider {name} failed before its first token, trying the next one: {e}")
+            return
+
+        # Each provider streams on a router thread into a shared queue; the first
+        # one to produce a chunk wins and the others are told to stop. Waiting on
+        # the queue rather than the provider keeps a stalled stream within the deadline.
+        events: "queue.Queue[Tuple[str, Any, Optional[BaseException]]]" = queue.Queue()
+        cancelled: Dict[str, threading.Event] = {}
+        pumps = []
+
+        def pump(name: str) -> None:
+            try:
+                for chunk in self._stream_one(name, messages, stop, cls, cancelled[name]):
+                    events.put((name, chunk, None))
+                events.put((name, _END, None))
+            except Exception as e:
+                events.put((name, None, e))
+
+        def launch(index: int) -> None:
+            name = order[index]
+            cancelled[name] = threading.Event()
+            pumps.append(_submit(pump, name))
+
+        launch(0)
+        launched, hedged, failed = 1, False, 0
+        winner: Optional[str] = None
+        try:
+            while True:
+                can_hedge = hedge and winner is None and not hedged and launched < len(order)
+                timeout = self.hedge_after_seconds(order[0], prompt_tokens, first_token=True) if can_hedge else None
+                try:
+                    name, chunk, error = events.get(timeout=_wait_seconds(timeout))
+                except queue.Empty:
+                    _check_deadline()
+                    if not can_hedge:
+                        continue
+                    hedged = True
+                    get_provider_stats(order[0]).record_hedge()
+                    launch(launched)
+                    launched += 1
+                    continue
+                if winner is None:
+                    if error is not None:
+                        failed += 1
+                        logger.warning(f"LLM provider {name} failed before its first token: {error}")
+                        if failed < launched:
+                            continue
+                        if launched >= len(order):
+                            raise error
+                        launch(launched)
+                        launched += 1
+                        continue
+                    winner = name
+                    self._record_winner(name, hedged, name != order[0])
+                    for other, event in cancelled.items():
+                        if other != winner:
+                            event.set()
+                if name != winner:
+                    continue
+                if error is not None:
+                    raise error
+                if chunk is _END:
+                    return
+                yield self._emit(chunk, run_manager)
+        finally:
+            # Losing and abandoned streams stop at their next chunk, or at the deadline.
+            for event in cancelled.values():
+                event.set()
+            for future in pumps:
+                future.cancel()
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        order, prompt_tokens, hedge = self._plan(messages, kwargs)
+        cls = size_class(prompt_tokens)
+
+        async def first_chunk(name: str):
+            stream = self._astream_one(name, messages, stop, cls)
+            try:
+                return name, stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return name, stream, None
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        pending: Dict[asyncio.Task, str] = {}
+        launched, hedged = 0, False
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            nonlocal launched
+            pending[asyncio.ensure_future(first_chunk(order[launched]))] = order[launched]
+            launched += 1
+
+        launch()
+        winner = None
+        try:
+            while winner is None:
+                can_hedge = hedge and not hedged and launched < len(order)
+                timeout = self.hedge_after_seconds(order[0], prompt_tokens, first_token=True) if can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=_wait_seconds(timeout),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    _check_deadline()
+                    if not can_hedge:
+                        continue
+                    hedged = True
+                    get_provider_stats(order[0]).record_hedge()
+                    launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    if winner is None and task.exception() is None:
+                        winner = task.result()
+                    elif task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"LLM provider stream failed before its first token: {last_error}")
+                    else:
+                        # Lost the race by a hair; close its stream.
+                        await task.result()[1].aclose()
+                if winner is None and not pending:
+                    if launched >= len(order):
+                        raise last_error
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        name, stream, chunk = winner
+        self._record_winner(name, hedged, name != order[0])
+        async with contextlib.aclosing(stream):
+            if chunk is not None:
+                yield await self._aemit(chunk, run_manager)
+            async for chunk in stream:
+                yield await self._aemit(chunk, run_manager)
+
+    async def _aemit(self, chunk: AIMessageChunk,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun]) -> ChatGenerationChunk:
+        generation = ChatGenerationChunk(message=chunk)
+        if run_manager:
+            await run_manager.on_llm_new_token(chunk.content if isinstance(chunk.content, str) else "",
+                                               chunk=generation)
+        return generation
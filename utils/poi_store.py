@@ -0,0 +1,341 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from utils.env_config import get_env_variable
+from utils.response_cache import CACHE_DIR
+from utils import tracing
+
+POI_STORE_ENABLED = get_env_variable("POI_STORE_ENABLED", "1") not in ("0", "false", "False")
+POI_STORE_PATH = get_env_variable("POI_STORE_PATH", os.path.join(CACHE_DIR, "poi.sqlite3"))
+# Geohash length of the grid cells; 5 characters is about 4.9 x 4.9 km at the equator.
+POI_GRID_PRECISION = int(get_env_variable("POI_GRID_PRECISION", "5"))
+
+# Separate fetches a partly stale query may be split into before fetching its bounding box instead.
+MAX_STALE_AREAS = 4
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371000.0
+
+BBox = Tuple[float, float, float, float]
+
+
+def geohash(latitude: float, longitude: float, precision: int = POI_GRID_PRECISION) -> str:
+    """
+    Standard base32 geohash of a point.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int = POI_GRID_PRECISION) -> Tuple[float, float]:
+    """
+    (height, width) of a geohash cell in degrees.
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def normalize_bbox(bbox: BBox) -> BBox:
+    """
+    (west, south, east, north) from a (lon1, lat1, lon2, lat2) box given in any corner order.
+    """
+    lon1, lat1, lon2, lat2 = bbox
+    return min(lon1, lon2), min(lat1, lat2), max(lon1, lon2), max(lat1, lat2)
+
+
+def _grid(bbox: BBox, precision: int, inside_only: bool) -> List[Tuple[str, BBox]]:
+    west, south, east, north = normalize_bbox(bbox)
+    height, width = cell_size(precision)
+    cells = []
+    row = math.floor((south + 90.0) / height)
+    while row * height - 90.0 < north:
+        cell_south = row * height - 90.0
+        column = math.floor((west + 180.0) / width)
+        while column * width - 180.0 < east:
+            cell_west = column * width - 180.0
+            inside = (cell_south >= south and cell_south + height <= north
+                      and cell_west >= west and cell_west + width <= east)
+            if inside or not inside_only:
+                cell = geohash(cell_south + height / 2, cell_west + width / 2, precision)
+                cells.append((cell, (cell_west, cell_south, cell_west + width, cell_south + height)))
+            column += 1
+        row += 1
+    return cells
+
+
+def grid_cells(bbox: BBox, precision: int = POI_GRID_PRECISION, inside_only: bool = False) -> List[str]:
+    """
+    Geohash cells overlapping the box, or only those lying entirely inside it.
+    """
+    return [cell for cell, _ in _grid(bbox, precision, inside_only)]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def radius_bbox(latitude: float, longitude: float, radius_m: float) -> BBox:
+    """
+    (west, south, east, north) box enclosing a circle.
+    """
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    d_lon = d_lat / max(math.cos(math.radians(latitude)), 1e-6)
+    return longitude - d_lon, latitude - d_lat, longitude + d_lon, latitude + d_lat
+
+
+def by_rating(places: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Highest rated first, more reviews breaking ties.
+    """
+    return sorted(places, key=lambda place: (place.get("rating") or 0, place.get("reviews") or 0), reverse=True)
+
+
+def by_distance(places: Sequence[Dict[str, Any]], latitude: float, longitude: float) -> List[Dict[str, Any]]:
+    """
+    Nearest to the point first; places without coordinates last.
+    """
+    def distance(place: Dict[str, Any]) -> float:
+        if place.get("lat") is None or place.get("lon") is None:
+            return float("inf")
+        return haversine_m(latitude, longitude, place["lat"], place["lon"])
+    return sorted(places, key=distance)
+
+
+class POIStore:
+    """
+    Local store of places (attractions, hotels, restaurants) keyed by place id
+    and indexed by geohash grid cell, backed by SQLite.
+
+    Places are kept per layer (e.g. "attractions:<categories>" or "hotels").
+    Each fetch from an upstream marks the grid cells its query area covered
+    as fresh; a later box or radius query is answered locally when the cells
+    it spans are still fresh and either hold enough places or were covered by
+    a fetch that returned everything it had (fewer results than its limit).
+    """
+    def __init__(self, path: str = POI_STORE_PATH, precision: int = POI_GRID_PRECISION):
+        self.path = path
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pois ("
+                "layer TEXT NOT NULL, place_id TEXT NOT NULL, cell TEXT NOT NULL, "
+                "latitude REAL NOT NULL, longitude REAL NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (layer, place_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pois_cell ON pois (layer, cell)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                "layer TEXT NOT NULL, cell TEXT NOT NULL, fetched_at REAL NOT NULL, complete INTEGER NOT NULL, "
+                "PRIMARY KEY (layer, cell))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _query_grid(self, bbox: BBox) -> List[Tuple[str, BBox]]:
+        # Cells inside the box decide freshness; slivers along its edges are not
+        # required (they are covered by neighbouring queries at best), unless
+        # the box is smaller than a cell.
+        return _grid(bbox, self.precision, True) or _grid(bbox, self.precision, False)
+
+    def _query_cells(self, bbox: BBox) -> List[str]:
+        return [cell for cell, _ in self._query_grid(bbox)]
+
+    def _fresh(self, conn: sqlite3.Connection, layer: str, cells: Sequence[str], ttl: float) -> Optional[bool]:
+        """
+        None if any cell is stale, otherwise whether every cell was covered completely.
+        """
+        placeholders = ",".join("?" * len(cells))
+        rows = conn.execute(
+            f"SELECT complete FROM coverage WHERE layer = ? AND fetched_at >= ? AND cell IN ({placeholders})",
+            (layer, time.time() - ttl, *cells),
+        ).fetchall()
+        if len(rows) < len(cells):
+            return None
+        return all(row[0] for row in rows)
+
+    def _places(self, conn: sqlite3.Connection, layer: str, bbox: BBox, ttl: float) -> List[Dict[str, Any]]:
+        west, south, east, north = normalize_bbox(bbox)
+        cells = grid_cells(bbox, self.precision)
+        placeholders = ",".join("?" * len(cells))
+        rows = conn.execute(
+            f"SELECT latitude, longitude, data FROM pois "
+            f"WHERE layer = ? AND updated_at >= ? AND cell IN ({placeholders})",
+            (layer, time.time() - ttl, *cells),
+        ).fetchall()
+        return [
+            json.loads(data) for latitude, longitude, data in rows
+            if south <= latitude <= north and west <= longitude <= east
+        ]
+
+    def lookup_bbox(self, layer: str, bbox: BBox, ttl: float, min_results: int = 1) -> Optional[List[Dict[str, Any]]]:
+        """
+        Places inside the box, or None when the area has to be fetched again.
+        """
+        with self._lock:
+            conn = self._connection()
+            complete = self._fresh(conn, layer, self._query_cells(bbox), ttl)
+            places = self._places(conn, layer, bbox, ttl) if complete is not None else []
+            hit = complete is not None and (complete or len(places) >= min_results)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        tracing.annotate(poi_store="hit" if hit else "miss")
+        return places if hit else None
+
+    def lookup_radius(self, layer: str, latitude: float, longitude: float, radius_m: float, ttl: float,
+                      min_results: int = 1) -> Optional[List[Dict[str, Any]]]:
+        """
+        Places within radius_m of a point, nearest first, or None when the area has to be fetched again.
+        """
+        bbox = radius_bbox(latitude, longitude, radius_m)
+        with self._lock:
+            conn = self._connection()
+            complete = self._fresh(conn, layer, self._query_cells(bbox), ttl)
+            places = []
+            if complete is not None:
+                places = [
+                    place for place in self._places(conn, layer, bbox, ttl)
+                    if haversine_m(latitude, longitude, place["lat"], place["lon"]) <= radius_m
+                ]
+            hit = complete is not None and (complete or len(places) >= min_results)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        tracing.annotate(poi_store="hit" if hit else "miss")
+        return by_distance(places, latitude, longitude) if hit else None
+
+    def stale_areas(self, layer: str, bbox: BBox, ttl: float) -> List[BBox]:
+        """
+        When only part of the box is stale, a few (west, south, east, north) boxes
+        covering its stale cells, so fetches can be limited to those; [] when all
+        or none of it is.
+        """
+        grid = self._query_grid(bbox)
+        with self._lock:
+            placeholders = ",".join("?" * len(grid))
+            fresh = {row[0] for row in self._connection().execute(
+                f"SELECT cell FROM coverage WHERE layer = ? AND fetched_at >= ? AND cell IN ({placeholders})",
+                (layer, time.time() - ttl, *(cell for cell, _ in grid)),
+            )}
+        stale = [bounds for cell, bounds in grid if cell not in fresh]
+        if not fresh or not stale:
+            return []
+        # Runs of stale cells per grid row, stacked into rectangles where
+        # consecutive rows have the same run.
+        rows: Dict[float, List[BBox]] = {}
+        for bounds in stale:
+            rows.setdefault(bounds[1], []).append(bounds)
+        open_areas: Dict[Tuple[float, float], List[float]] = {}
+        areas: List[BBox] = []
+        for south in sorted(rows):
+            runs: List[List[float]] = []
+            for west, _, east, north in sorted(rows[south]):
+                if runs and abs(runs[-1][1] - west) < 1e-9:
+                    runs[-1][1] = east
+                else:
+                    runs.append([west, east, north])
+            current = {}
+            for west, east, north in runs:
+                area = open_areas.pop((west, east), None)
+                current[(west, east)] = [west, area[1] if area else south, east, north]
+            areas.extend(tuple(area) for area in open_areas.values())
+            open_areas = current
+        areas.extend(tuple(area) for area in open_areas.values())
+        if len(areas) > MAX_STALE_AREAS:
+            return [(min(a[0] for a in areas), min(a[1] for a in areas),
+                     max(a[2] for a in areas), max(a[3] for a in areas))]
+        return areas
+
+    def places(self, layer: str, bbox: BBox, ttl: float) -> List[Dict[str, Any]]:
+        """
+        Fresh places inside the box, whether or not the area is fully covered.
+        """
+        with self._lock:
+            return self._places(self._connection(), layer, bbox, ttl)
+
+    def merge(self, layer: str, bbox: BBox, places: Sequence[Dict[str, Any]], complete: bool) -> None:
+        """
+        Upsert fetched places (dicts with place_id, lat and lon) and mark the cells
+        inside bbox as freshly covered. Places without coordinates are not indexed.
+        """
+        now = time.time()
+        rows = [
+            (layer, str(place["place_id"]), geohash(place["lat"], place["lon"], self.precision),
+             place["lat"], place["lon"], json.dumps(place, default=str), now)
+            for place in places
+            if place.get("place_id") and place.get("lat") is not None and place.get("lon") is not None
+        ]
+        coverage = [(layer, cell, now, int(complete)) for cell in self._query_cells(bbox)]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO pois (layer, place_id, cell, latitude, longitude, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (layer, place_id) DO UPDATE SET "
+                    "cell = excluded.cell, latitude = excluded.latitude, longitude = excluded.longitude, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    rows,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO coverage (layer, cell, fetched_at, complete) VALUES (?, ?, ?, ?)",
+                    coverage,
+                )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            places = self._connection().execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "places": places}
+
+
+_poi_store: Optional[POIStore] = None
+_store_lock = threading.Lock()
+
+
+def get_poi_store() -> Optional[POIStore]:
+    """
+    Return the process-wide POI store, or None when POI_STORE_ENABLED is off.
+    """
+    global _poi_store
+    if not POI_STORE_ENABLED:
+        return None
+    if _poi_store is None:
+        with _store_lock:
+            if _poi_store is None:
+                _poi_store = POIStore()
+    return _poi_store
@@ -0,0 +1,171 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Placeholder values the fetchers use for missing fields; they carry no
+# information for the LLM, so projected records leave them out.
+_EMPTY_VALUES = (None, "", "Not available", [], {})
+
+
+def _prune(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in record.items() if v not in _EMPTY_VALUES}
+
+
+def _as_list(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    return []
+
+
+def compact_json(data: Any) -> str:
+    """
+    Serialize without indentation or padding; whitespace is pure prompt overhead.
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def project_flight(flight: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a SerpAPI Google Flights option to price, airlines, times, duration and stops.
+    Records that are already projected (no "flights" legs) pass through.
+    """
+    if "flights" not in flight:
+        return _prune(flight)
+    legs = flight.get("flights") or []
+    first_leg = legs[0] if legs else {}
+    last_leg = legs[-1] if legs else {}
+    airlines = []
+    for leg in legs:
+        airline = leg.get("airline")
+        if airline and airline not in airlines:
+            airlines.append(airline)
+    return _prune({
+        "price": flight.get("price"),
+        "airline": ", ".join(airlines),
+        "from": (first_leg.get("departure_airport") or {}).get("id"),
+        "to": (last_leg.get("arrival_airport") or {}).get("id"),
+        "departure_time": (first_leg.get("departure_airport") or {}).get("time"),
+        "arrival_time": (last_leg.get("arrival_airport") or {}).get("time"),
+        "total_duration": flight.get("total_duration"),
+        "stops": len(flight.get("layovers") or []),
+        "flight_numbers": [leg.get("flight_number") for leg in legs if leg.get("flight_number")],
+    })
+
+
+def project_flights(flight_info: Any, limit: int = 5) -> List[Dict[str, Any]]:
+    return [project_flight(flight) for flight in _as_list(flight_info)[:limit]]
+
+
+def project_hotels(hotel_info: Any, limit: int = 5) -> List[Dict[str, Any]]:
+    return [
+        _prune({
+            "name": hotel.get("name"),
+            "type": hotel.get("type"),
+            "price": hotel.get("price_range"),
+            "rating": hotel.get("rating"),
+            "reviews": hotel.get("reviews"),
+            "address": hotel.get("address"),
+        })
+        for hotel in _as_list(hotel_info)[:limit]
+    ]
+
+
+def project_restaurants(restaurant_info: Any, limit: int = 5) -> List[Dict[str, Any]]:
+    return [
+        _prune({
+            "name": restaurant.get("name"),
+            "cuisine": restaurant.get("meals_available"),
+            "price": restaurant.get("avg_meal_price"),
+            "rating": restaurant.get("rating"),
+            "reviews": restaurant.get("reviews"),
+            "address": restaurant.get("address"),
+        })
+        for restaurant in _as_list(restaurant_info)[:limit]
+    ]
+
+
+def project_attractions(attraction_info: Any, limit: int = 10, details: bool = True) -> List[Dict[str, Any]]:
+    """
+    details=False keeps only names and categories, for when an itinerary carries the rest.
+    """
+    projected = []
+    for spot in _as_list(attraction_info)[:limit]:
+        # Geoapify categories are hierarchical ("tourism.sights.castle"); the
+        # most specific ones are enough to describe the place.
+        categories = [c for c in spot.get("categories") or [] if "." in c][:3]
+        projected.append(_prune({
+            "name": spot.get("name"),
+            "categories": categories,
+            "opening_hours": spot.get("opening_hours") if details else None,
+            "address": spot.get("address") if details else None,
+        }))
+    return projected
+
+
+_STOP_NOTES = {"closed": " (closed that day)", "closes_early": " (closes before the visit ends)"}
+
+
+def project_itinerary(itinerary: Any) -> Optional[Dict[str, Any]]:
+    """
+    One line per stop ("name arrive-leave"), per day with its travel distance.
+    """
+    if not isinstance(itinerary, dict):
+        return None
+    days = [
+        _prune({
+            "day": day.get("day"),
+            "date": day.get("date"),
+            "km": day.get("total_km"),
+            "stops": [
+                f"{stop.get('name')} {stop.get('arrive')}-{stop.get('leave')}{_STOP_NOTES.get(stop.get('status'), '')}"
+                for stop in _as_list(day.get("stops"))
+            ],
+        })
+        for day in _as_list(itinerary.get("days"))
+    ]
+    return _prune({
+        "start_from": (itinerary.get("base") or {}).get("name"),
+        "days": days,
+        "not_placed": itinerary.get("unplaced"),
+    })
+
+
+def project_transport(transport_info: Any, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Keep the places from a SerpAPI Google Maps response, dropping search metadata.
+    """
+    if isinstance(transport_info, list):
+        places = _as_list(transport_info)
+    elif isinstance(transport_info, dict):
+        places = _as_list(transport_info.get("local_results"))
+        if not places and isinstance(transport_info.get("place_results"), dict):
+            places = [transport_info["place_results"]]
+    else:
+        places = []
+    return [
+        _prune({
+            "name": place.get("title") or place.get("name"),
+            "type": place.get("type"),
+            "rating": place.get("rating"),
+            "address": place.get("address"),
+            "hours": place.get("hours"),
+        })
+        for place in places[:limit]
+    ]
+
+
+def project_weather(weather_info: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(weather_info, dict):
+        return None
+    if "error" in weather_info:
+        return {"error": weather_info["error"]}
+    daily = [
+        _prune({
+            "date": day.get("date"),
+            "min": day.get("min_temperature"),
+            "max": day.get("max_temperature"),
+            "precip": day.get("precipitation"),
+            "desc": day.get("weather_description"),
+        })
+        for day in _as_list(weather_info.get("daily_forecast"))
+    ]
+    return _prune({"summary": weather_info.get("summary"), "daily": daily})
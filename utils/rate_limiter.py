@@ -0,0 +1,354 @@
+"""
+Client-side rate limiting for the quota-bound upstreams.
+
+Each (upstream, API key) pair gets one Limiter shared by every fetcher: a token
+bucket caps the request rate at the quota, and an adaptive concurrency limit
+(additive increase, multiplicative decrease) backs off on 429s and latency
+spikes and creeps back up while the upstream keeps up. Requests waiting for a
+token or a slot are served by priority, so interactive plans go ahead of batch
+and cache-warming work.
+"""
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from utils.env_config import get_env_variable
+from utils import deadline
+
+RATE_LIMIT_ENABLED = get_env_variable("RATE_LIMIT_ENABLED", "1") not in ("0", "false", "False")
+# Requests per second and burst size per API key; SerpAPI serves flights, transport, hotels and restaurants.
+UPSTREAM_RATES = {
+    "serpapi": (float(get_env_variable("SERPAPI_RATE_PER_SECOND", "5")),
+                int(get_env_variable("SERPAPI_BURST", "10"))),
+    "geoapify": (float(get_env_variable("GEOAPIFY_RATE_PER_SECOND", "5")),
+                 int(get_env_variable("GEOAPIFY_BURST", "5"))),
+}
+SOURCE_UPSTREAMS = {
+    "flights": "serpapi",
+    "local_transport": "serpapi",
+    "nearby_transport": "serpapi",
+    "hotels": "serpapi",
+    "restaurants": "serpapi",
+    "attractions": "geoapify",
+}
+RATE_LIMIT_MAX_CONCURRENCY = int(get_env_variable("RATE_LIMIT_MAX_CONCURRENCY", "16"))
+# A response this many times slower than the recent average counts as a latency spike.
+LATENCY_SPIKE_FACTOR = float(get_env_variable("RATE_LIMIT_LATENCY_SPIKE_FACTOR", "3"))
+# Minimum seconds between two concurrency decreases, so one burst of 429s halves the limit once.
+BACKOFF_COOLDOWN_SECONDS = 1.0
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_WARMUP = 20
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def set_priority(level: int) -> None:
+    """
+    Set the priority for the rest of this context, e.g. as a thread pool initializer.
+    """
+    _priority.set(level)
+
+
+@contextmanager
+def request_priority(level: int) -> Iterator[None]:
+    """
+    Run the enclosed upstream requests (and tasks started inside) at the given priority; lower goes first.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _wait_time(delay: Optional[float]) -> Optional[float]:
+    """
+    How long a waiter may sleep: until the next token, but never past the plan's deadline.
+    """
+    left = deadline.remaining()
+    if left is None:
+        return delay
+    if left <= 0:
+        raise deadline.DeadlineExceeded("deadline exceeded while waiting for the rate limiter")
+    return left if delay is None else min(delay, left)
+
+
+class _Waiter:
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+
+class Limiter:
+    """
+    Token bucket plus adaptive concurrency limit with a priority wait queue,
+    usable from threads (acquire) and coroutines (aacquire).
+    """
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+                 min_concurrency: int = 1):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.tokens = float(burst)
+        self.in_flight = 0
+        # Recent latency per source: SerpAPI flight searches are much slower than maps lookups.
+        self.ewma_ms: Dict[str, float] = {}
+        self._updated = time.monotonic()
+        self._last_backoff = 0.0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = {"granted": 0, "waited": 0, "wait_ms": 0.0, "throttled": 0, "latency_spikes": 0}
+
+    def _dispatch(self) -> Optional[float]:
+        """
+        Grant queued waiters while tokens and slots allow; return seconds until
+        the next token if waiters are left starved of tokens. Call with the lock held.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        while self._queue and self.in_flight < int(self.limit) and self.tokens >= 1:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            self.tokens -= 1
+            self.in_flight += 1
+            waiter.granted = True
+            waiter.wake()
+        if self._queue and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return None
+
+    def _enqueue(self, waiter: _Waiter) -> Optional[float]:
+        heapq.heappush(self._queue, (current_priority(), next(self._seq), waiter))
+        return self._dispatch()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            waiter.cancelled = True
+            if waiter.granted:
+                self.in_flight -= 1
+                self._dispatch()
+
+    def _count_wait(self, start: float) -> None:
+        waited_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._counters["granted"] += 1
+            if waited_ms >= 1:
+                self._counters["waited"] += 1
+                self._counters["wait_ms"] += waited_ms
+
+    def acquire(self) -> None:
+        """
+        Block until this thread may send a request.
+        """
+        start = time.monotonic()
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        with self._lock:
+            delay = self._enqueue(waiter)
+        try:
+            while True:
+                event.wait(_wait_time(delay))
+                with self._lock:
+                    if waiter.granted:
+                        break
+                    event.clear()
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        break
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self._count_wait(start)
+
+    async def aacquire(self) -> None:
+        """
+        Wait until this coroutine may send a request.
+        """
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(event.set))
+        with self._lock:
+            delay = self._enqueue(waiter)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(event.wait(), _wait_time(delay))
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    if waiter.granted:
+                        break
+                    event.clear()
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        break
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self._count_wait(start)
+
+    def release(self, latency_ms: Optional[float] = None, throttled: bool = False, source: str = "") -> None:
+        """
+        Free a slot and feed the request's outcome into the concurrency limit.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if latency_ms is not None and not throttled:
+                ewma = self.ewma_ms.get(source)
+                if ewma is not None and latency_ms > ewma * LATENCY_SPIKE_FACTOR:
+                    self._counters["latency_spikes"] += 1
+                    self._decrease(0.9)
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.ewma_ms[source] = latency_ms if ewma is None else 0.8 * ewma + 0.2 * latency_ms
+            self._dispatch()
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Record a 429: halve the concurrency limit and pause the bucket for retry_after seconds.
+        """
+        with self._lock:
+            self._counters["throttled"] += 1
+            self._decrease(0.5)
+            self.tokens = min(self.tokens, -self.rate * (retry_after or 0))
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_backoff >= BACKOFF_COOLDOWN_SECONDS:
+            self.limit = max(self.min_concurrency, self.limit * factor)
+            self._last_backoff = now
+
+    def slot(self, source: str = "") -> "Slot":
+        return Slot(self, source)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._counters,
+                rate=self.rate,
+                limit=round(self.limit, 2),
+                in_flight=self.in_flight,
+                queued=sum(1 for _, _, waiter in self._queue if not waiter.cancelled),
+                ewma_ms={source: round(ms, 1) for source, ms in self.ewma_ms.items()},
+            )
+
+
+class Slot:
+    """
+    One request's hold on a limiter, as a sync or async context manager.
+    The HTTP client calls throttled() on every 429 it sees while holding it,
+    and retry() before each retry so every attempt waits for a token.
+    """
+    def __init__(self, limiter: Limiter, source: str = ""):
+        self.limiter = limiter
+        self.source = source
+        self.was_throttled = False
+        self._start = 0.0
+        self._held = False
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        self.was_throttled = True
+        self.limiter.throttled(retry_after)
+
+    def _hold(self) -> None:
+        self._held = True
+        self._start = time.perf_counter()
+
+    def _release(self, failed: bool) -> None:
+        # Not held when re-acquiring for a retry failed, e.g. at the deadline.
+        if not self._held:
+            return
+        self._held = False
+        latency_ms = None if failed else (time.perf_counter() - self._start) * 1000
+        self.limiter.release(latency_ms, self.was_throttled, self.source)
+
+    def retry(self, delay: float = 0.0) -> None:
+        """
+        Give the slot back after a throttled or failed attempt, wait delay
+        seconds, and queue again. A 429 has already paused the bucket.
+        """
+        self._release(failed=True)
+        self.was_throttled = False
+        if delay > 0:
+            time.sleep(delay)
+        self.limiter.acquire()
+        self._hold()
+
+    async def aretry(self, delay: float = 0.0) -> None:
+        """
+        Async version of retry.
+        """
+        self._release(failed=True)
+        self.was_throttled = False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.limiter.aacquire()
+        self._hold()
+
+    def __enter__(self) -> "Slot":
+        self.limiter.acquire()
+        self._hold()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._release(exc_type is not None)
+
+    async def __aenter__(self) -> "Slot":
+        await self.limiter.aacquire()
+        self._hold()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._release(exc_type is not None)
+
+
+_limiters: Dict[Tuple[str, str], Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _key_fingerprint(params: Optional[Dict[str, Any]]) -> str:
+    from utils.response_cache import SECRET_PARAMS
+
+    secret = next((str(v) for k, v in (params or {}).items() if k in SECRET_PARAMS and v), "")
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:8]
+
+
+def get_limiter(source: Optional[str], params: Optional[Dict[str, Any]] = None) -> Optional[Limiter]:
+    """
+    Return the shared limiter for a request's upstream and API key, or None when it is not rate limited.
+    """
+    upstream = SOURCE_UPSTREAMS.get(source)
+    if not RATE_LIMIT_ENABLED or upstream is None:
+        return None
+    key = (upstream, _key_fingerprint(params))
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                rate, burst = UPSTREAM_RATES[upstream]
+                limiter = _limiters[key] = Limiter(f"{upstream}:{key[1]}", rate, burst)
+    return limiter
+
+
+def get_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {limiter.name: limiter.stats() for limiter in list(_limiters.values())}
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from utils.env_config import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = int(get_env_variable("PDF_RENDER_WORKERS", "2"))
+# Render jobs that may be queued or running at once; submitters block beyond that.
+PDF_RENDER_QUEUE_SIZE = int(get_env_variable("PDF_RENDER_QUEUE_SIZE", "16"))
+# "thread" or "process". Processes sidestep the GIL for reportlab's pure-Python layout.
+PDF_RENDER_EXECUTOR = get_env_variable("PDF_RENDER_EXECUTOR", "thread")
+# How long an async submitter waits for a free slot before RenderQueueFull.
+PDF_RENDER_SUBMIT_TIMEOUT = float(get_env_variable("PDF_RENDER_SUBMIT_TIMEOUT", "60"))
+# Async submitters poll for a slot, backing off up to this interval.
+ASYNC_POLL_MAX_SECONDS = 0.1
+
+
+class RenderQueueFull(RuntimeError):
+    pass
+
+
+class RenderPool:
+    """
+    Background worker pool with a bounded number of outstanding jobs.
+
+    submit() returns a Future right away while there is room; once queue_size
+    jobs are queued or running it blocks (backpressure) until one finishes, or
+    raises RenderQueueFull if the caller asked not to wait or the timeout passed.
+    """
+    def __init__(
+        self,
+        workers: int = PDF_RENDER_WORKERS,
+        queue_size: int = PDF_RENDER_QUEUE_SIZE,
+        use_processes: bool = PDF_RENDER_EXECUTOR == "process",
+    ):
+        self.workers = workers
+        self.queue_size = max(queue_size, workers)
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "blocked_seconds": 0.0}
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-render")
+            return self._executor
+
+    def _count_wait(self, start: float, acquired: bool) -> None:
+        with self._lock:
+            self._counters["blocked_seconds"] += time.perf_counter() - start
+            if not acquired:
+                self._counters["rejected"] += 1
+        if not acquired:
+            raise RenderQueueFull(f"{self.queue_size} render jobs already outstanding")
+
+    def _acquire(self, block: bool, timeout: Optional[float]) -> None:
+        start = time.perf_counter()
+        acquired = self._slots.acquire(blocking=True, timeout=timeout) if block else self._slots.acquire(blocking=False)
+        self._count_wait(start, acquired)
+
+    async def _aacquire(self, timeout: float) -> None:
+        # Polled on the loop rather than blocking a worker thread: a thread would
+        # go on to take the slot after its caller was cancelled, and never free it.
+        start = time.perf_counter()
+        delay = 0.005
+        try:
+            while not self._slots.acquire(blocking=False):
+                left = timeout - (time.perf_counter() - start)
+                if left <= 0:
+                    break
+                await asyncio.sleep(min(delay, left))
+                delay = min(delay * 2, ASYNC_POLL_MAX_SECONDS)
+            else:
+                self._count_wait(start, True)
+                return
+        except asyncio.CancelledError:
+            with self._lock:
+                self._counters["blocked_seconds"] += time.perf_counter() - start
+            raise
+        self._count_wait(start, False)
+
+    def _done(self, key: Optional[str], future: Future) -> None:
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._counters["failed" if error or future.cancelled() else "completed"] += 1
+            if key is not None and self._pending.get(key) is future:
+                del self._pending[key]
+        if error:
+            logger.error(f"Render job {key or ''} failed: {error}")
+
+    def _start(self, func: Callable[..., Any], args: tuple, key: Optional[str]) -> Future:
+        # The caller already holds a slot; it is released when the job finishes.
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._counters["submitted"] += 1
+            if key is not None:
+                self._pending[key] = future
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def submit(self, func: Callable[..., Any], *args: Any, key: Optional[str] = None,
+               block: bool = True, timeout: Optional[float] = None) -> Future:
+        """
+        Queue func(*args) on the pool. key (e.g. the output path) lets wait() find the job later.
+        """
+        self._acquire(block, timeout)
+        return self._start(func, args, key)
+
+    async def asubmit(self, func: Callable[..., Any], *args: Any, key: Optional[str] = None,
+                      timeout: float = PDF_RENDER_SUBMIT_TIMEOUT) -> Future:
+        """
+        Async version of submit; waits up to timeout for a free slot without blocking
+        the event loop. A caller cancelled while waiting holds no slot.
+        """
+        if not self._slots.acquire(blocking=False):
+            await self._aacquire(timeout)
+        return self._start(func, args, key)
+
+    def wait(self, key: str, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the job submitted under key finishes and return its result.
+        Returns None when no such job is outstanding (it already finished or never existed).
+        """
+        with self._lock:
+            future = self._pending.get(key)
+        return future.result(timeout=timeout) if future is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "outstanding": len(self._pending), "queue_size": self.queue_size}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pdf_pool: Optional[RenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_render_pool() -> RenderPool:
+    """
+    Return the process-wide PDF render pool, creating it on first use.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = RenderPool()
+    return _pdf_pool
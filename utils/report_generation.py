@@ -1,16 +1,148 @@
-from typing import Dict, Any, List
-from utils.llm_wrapper.llms import llm
+from typing import Dict, Any, List, Iterator, AsyncIterator, Optional
+from utils.env_config import get_env_variable
+from utils.llm_wrapper.llms import llm_router
 from utils.config import FINAL_REPORT_GENERATION_PROMPT
+from utils import tracing
+from utils.projection import (
+    compact_json, project_flights, project_weather, project_attractions, project_itinerary,
+    project_restaurants, project_hotels, project_transport,
+)
+from utils.render_pool import get_pdf_render_pool
 from langchain_core.prompts import PromptTemplate
-import json
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
+from concurrent.futures import Future
 from datetime import datetime
+from functools import lru_cache
 import os
 import re
 
+# Tokens a full report may run to; the router skips providers capped below it.
+REPORT_OUTPUT_TOKENS = int(get_env_variable("REPORT_OUTPUT_TOKENS", "2048"))
+
+# --- PDF rendering ---
+# Emojis the built-in Helvetica font cannot draw; they are stripped before layout.
+EMOJI_REPLACEMENTS = {
+    '✈️': '',
+    '🌦️': '',
+    '🌧️': '',
+    '☀️': '',
+    '🏛️': '',
+    '🎯': '',
+    '📍': '',
+    '🕐': '',
+    '💰': '',
+    '🌡️': '',
+    '🎪': '',
+    '🏨': '',
+    '🍽️': ''
+}
+_EMOJI_RE = re.compile("|".join(re.escape(emoji) for emoji in EMOJI_REPLACEMENTS))
+_NUMBERED_BOLD_RE = re.compile(r"\d+\.\s+\*\*(.*?)\*\*")
+_LABEL_VALUE_RE = re.compile(r"- \*\*(.+?)\*\*: (.+)")
+_BOLD_MARKER_RE = re.compile(r"\*\*")
+
+
+def replace_emojis(text: str) -> str:
+    return _EMOJI_RE.sub(lambda match: EMOJI_REPLACEMENTS[match.group(0)], text)
+
+
+@lru_cache(maxsize=1)
+def _pdf_styles():
+    """
+    The report stylesheet, built once per process instead of once per PDF.
+    """
+    # reportlab is only needed for PDFs; importing it lazily keeps it off the startup path.
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="CustomHeading1", fontName="Helvetica-Bold", fontSize=16, leading=20,
+                            spaceAfter=10, textColor=colors.HexColor("#1F4E79")))
+    styles.add(ParagraphStyle(name="CustomHeading2", fontName="Helvetica-Bold", fontSize=13, leading=18,
+                            spaceAfter=6, textColor=colors.HexColor("#1F4E79")))
+    styles.add(ParagraphStyle(name="CustomBody", fontName="Helvetica", fontSize=11, leading=15))
+    styles.add(ParagraphStyle(name="CustomBullet", fontName="Helvetica", fontSize=11, leftIndent=15, bulletIndent=5))
+    return styles
+
+
+def render_report_pdf(report_text: str, file_path: str) -> str:
+    """
+    Lay out markdown-ish report text as a PDF at file_path and return the path.
+    Module-level so the render pool can run it in a thread or a separate process.
+    """
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.pagesizes import A4
+
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Setup PDF doc
+    doc = SimpleDocTemplate(file_path, pagesize=A4,
+                            leftMargin=50, rightMargin=50,
+                            topMargin=60, bottomMargin=40)
+    styles = _pdf_styles()
+
+    content = []
+    bullet_buffer = []
+
+    def flush_bullets():
+        nonlocal bullet_buffer
+        for line in bullet_buffer:
+            content.append(Paragraph(line, styles["CustomBullet"]))
+        bullet_buffer = []
+
+    for line in report_text.splitlines():
+        line = line.strip()
+        if not line:
+            flush_bullets()
+            content.append(Spacer(1, 10))
+            continue
+
+        if line.startswith("# "):
+            flush_bullets()
+            content.append(Paragraph(replace_emojis(line[2:]), styles["CustomHeading1"]))
+
+        elif line.startswith("## "):
+            flush_bullets()
+            content.append(Paragraph(replace_emojis(line[3:]), styles["CustomHeading2"]))
+
+        elif line.startswith("### "):
+            flush_bullets()
+            content.append(Paragraph(replace_emojis(line[4:]), styles["CustomHeading2"]))
+
+        elif _NUMBERED_BOLD_RE.match(line):
+            flush_bullets()
+            label = _BOLD_MARKER_RE.sub("", line)
+            content.append(Paragraph(label, styles["CustomBody"]))
+
+        elif line.startswith("- ") and _LABEL_VALUE_RE.match(line):
+            flush_bullets()
+            label, value = _LABEL_VALUE_RE.match(line).groups()
+            formatted = f"<b>{label}:</b> {value}"
+            content.append(Paragraph(formatted, styles["CustomBody"]))
+
+        elif line.startswith("- "):
+            bullet_buffer.append(line[2:])
+
+        else:
+            flush_bullets()
+            content.append(Paragraph(line, styles["CustomBody"]))
+
+    flush_bullets()
+    doc.build(content)
+    return file_path
+
+
+def wait_for_pdf(pdf_path: Optional[str], timeout: Optional[float] = None) -> Optional[str]:
+    """
+    Block until a PDF queued by submit_pdf has been written; returns its path,
+    or None if there is no such file.
+    """
+    if not pdf_path:
+        return None
+    get_pdf_render_pool().wait(pdf_path, timeout=timeout)
+    return pdf_path if os.path.exists(pdf_path) else None
+
 
 class ReportGenerator:
     def __init__(
@@ -27,6 +159,8 @@ class ReportGenerator:
         expense_report_text: str,
         outbound_date: str = "",
         return_date: str = "",
+        itinerary: Optional[Dict[str, Any]] = None,
+        unavailable: Optional[Dict[str, str]] = None,
         output_dir: str = "generated_reports",
     ):
         self.origin_city = origin_city
@@ -43,7 +177,12 @@ class ReportGenerator:
         self.currency = "INR"  # Default currency, can be modified if needed
         self.outbound_date = outbound_date
         self.return_date = return_date
+        self.itinerary = itinerary
+        # Fetch node -> why its data is missing (see utils/deadline.py).
+        self.unavailable = unavailable or {}
         self.final_report = ""
+        self.pdf_path: Optional[str] = None
+        self.pdf_future: Optional[Future] = None
 
     def generate_prompt(self) -> str:
         prompt = PromptTemplate.from_template(FINAL_REPORT_GENERATION_PROMPT)
@@ -51,125 +190,123 @@ class ReportGenerator:
             origin_city=self.origin_city,
             destination_city=self.destination_city,
             num_days=self.num_days,
-            flight_info=json.dumps(self.flight_info, indent=2),
-            weather_info=json.dumps(self.weather_info, indent=2),
-            attraction_info=json.dumps(self.attraction_info, indent=2),
-            restaurant_info=json.dumps(self.restaurant_info, indent=2),
-            hotel_info=json.dumps(self.hotel_info, indent=2),
-            transport_info=json.dumps(self.transport_info, indent=2),
+            flight_info=compact_json(project_flights(self.flight_info)),
+            weather_info=compact_json(project_weather(self.weather_info)),
+            # Opening hours and addresses are already worked into the itinerary.
+            attraction_info=compact_json(project_attractions(self.attraction_info, details=not self.itinerary)),
+            itinerary=compact_json(project_itinerary(self.itinerary)),
+            restaurant_info=compact_json(project_restaurants(self.restaurant_info)),
+            hotel_info=compact_json(project_hotels(self.hotel_info)),
+            transport_info=compact_json(project_transport(self.transport_info)),
             currency=self.currency,
             expense_report_text=self.expense_report_text,
             outbound_date=self.outbound_date,
-            return_date=self.return_date
+            return_date=self.return_date,
+            unavailable=", ".join(f"{source} ({reason})" for source, reason in sorted(self.unavailable.items())) or "none"
         )
 
     def call_llm(self, prompt: str) -> str:
-        response = llm.invoke(prompt)
+        with tracing.llm_span("final_report", llm_router):
+            response = llm_router.invoke(prompt, output_tokens=REPORT_OUTPUT_TOKENS)
+            tracing.record_llm_usage(response)
         return response.content.strip() if isinstance(response.content, str) else "Failed to generate report."
 
-    def save_pdf(self, report_text: str, output_dir: str = "generated_reports") -> str:
+    async def acall_llm(self, prompt: str) -> str:
+        with tracing.llm_span("final_report", llm_router):
+            response = await llm_router.ainvoke(prompt, output_tokens=REPORT_OUTPUT_TOKENS)
+            tracing.record_llm_usage(response)
+        return response.content.strip() if isinstance(response.content, str) else "Failed to generate report."
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        return chunk.content if isinstance(chunk.content, str) else ""
 
-        # --- Emoji replacement map ---
-        emoji_replacements = {
-            '✈️': '',
-            '🌦️': '',
-            '🌧️': '',
-            '☀️': '',
-            '🏛️': '',
-            '🎯': '',
-            '📍': '',
-            '🕐': '',
-            '💰': '',
-            '🌡️': '',
-            '🎪': '',
-            '🏨': '',
-            '🍽️': ''
-        }
-
-        def replace_emojis(text: str) -> str:
-            for emoji, replacement in emoji_replacements.items():
-                text = text.replace(emoji, replacement)
-            return text
-
-        # File naming
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def _finish_stream(self, chunks: List[str]) -> str:
+        self.final_report = "".join(chunks).strip() or "Failed to generate report."
+        return self.final_report
+
+    def pdf_file_path(self, output_dir: Optional[str] = None) -> str:
+        # Microseconds keep concurrent plans for the same route from sharing a file.
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         filename = f"{self.origin_city}_to_{self.destination_city}_{timestamp}.pdf"
-        os.makedirs(output_dir, exist_ok=True)
-        file_path = os.path.join(output_dir, filename)
-
-        # Setup PDF doc
-        doc = SimpleDocTemplate(file_path, pagesize=A4,
-                                leftMargin=50, rightMargin=50,
-                                topMargin=60, bottomMargin=40)
-
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name="CustomHeading1", fontName="Helvetica-Bold", fontSize=16, leading=20,
-                                spaceAfter=10, textColor=colors.HexColor("#1F4E79")))
-        styles.add(ParagraphStyle(name="CustomHeading2", fontName="Helvetica-Bold", fontSize=13, leading=18,
-                                spaceAfter=6, textColor=colors.HexColor("#1F4E79")))
-        styles.add(ParagraphStyle(name="CustomBody", fontName="Helvetica", fontSize=11, leading=15))
-        styles.add(ParagraphStyle(name="CustomBullet", fontName="Helvetica", fontSize=11, leftIndent=15, bulletIndent=5))
-
-        content = []
-        lines = report_text.splitlines()
-        bullet_buffer = []
+        return os.path.join(output_dir or self.output_dir, filename)
+
+    def save_pdf(self, report_text: str, output_dir: str = "generated_reports") -> str:
+        """
+        Render the report to a PDF now, on the calling thread, and return its path.
+        """
+        return render_report_pdf(report_text, self.pdf_file_path(output_dir))
+
+    def submit_pdf(self, report_text: str) -> Future:
+        """
+        Queue the PDF on the background render pool and return its future right away.
+        The destination is known up front and kept in self.pdf_path.
+        """
+        self.pdf_path = self.pdf_file_path()
+        self.pdf_future = get_pdf_render_pool().submit(render_report_pdf, report_text, self.pdf_path, key=self.pdf_path)
+        return self.pdf_future
 
-        def flush_bullets():
-            nonlocal bullet_buffer
-            for line in bullet_buffer:
-                content.append(Paragraph(line, styles["CustomBullet"]))
-            bullet_buffer = []
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                flush_bullets()
-                content.append(Spacer(1, 10))
-                continue
-
-            if line.startswith("# "):
-                flush_bullets()
-                content.append(Paragraph(replace_emojis(line[2:]), styles["CustomHeading1"]))
-
-            elif line.startswith("## "):
-                flush_bullets()
-                content.append(Paragraph(replace_emojis(line[3:]), styles["CustomHeading2"]))
-
-            elif line.startswith("### "):
-                flush_bullets()
-                content.append(Paragraph(replace_emojis(line[4:]), styles["CustomHeading2"]))
-
-            elif re.match(r"\d+\.\s+\*\*(.*?)\*\*", line):
-                flush_bullets()
-                label = re.sub(r"\*\*", "", line)
-                content.append(Paragraph(label, styles["CustomBody"]))
-
-            elif re.match(r"- \*\*(.+?)\*\*: (.+)", line):
-                flush_bullets()
-                match = re.match(r"- \*\*(.+?)\*\*: (.+)", line)
-                if match:
-                    label, value = match.groups()
-                    formatted = f"<b>{label}:</b> {value}"
-                    content.append(Paragraph(formatted, styles["CustomBody"]))
-
-            elif line.startswith("- "):
-                bullet_buffer.append(line[2:])
-
-            else:
-                flush_bullets()
-                content.append(Paragraph(line, styles["CustomBody"]))
-
-        flush_bullets()
-        doc.build(content)
-        return file_path
-
-    def generate_and_save_report(self) -> Dict[str, str]:
+    async def asubmit_pdf(self, report_text: str) -> Future:
+        """
+        Async version of submit_pdf.
+        """
+        self.pdf_path = self.pdf_file_path()
+        self.pdf_future = await get_pdf_render_pool().asubmit(render_report_pdf, report_text, self.pdf_path,
+                                                              key=self.pdf_path)
+        return self.pdf_future
+
+    def generate_and_save_report(self) -> str:
+        """
+        Return the report text as soon as the LLM answers; the PDF renders in the
+        background (see self.pdf_path / self.pdf_future).
+        """
         prompt = self.generate_prompt()
         report_text = self.call_llm(prompt)
         self.final_report = report_text
-        pdf_path = self.save_pdf(report_text)
+        self.submit_pdf(report_text)
         return report_text
 
+    async def agenerate_and_save_report(self) -> str:
+        prompt = self.generate_prompt()
+        report_text = await self.acall_llm(prompt)
+        self.final_report = report_text
+        await self.asubmit_pdf(report_text)
+        return report_text
+
+    def stream_report(self) -> Iterator[str]:
+        """
+        Yield report tokens as the LLM produces them, then queue the PDF of the full text.
+        """
+        chunks = []
+        with tracing.llm_span("final_report", llm_router) as span:
+            for chunk in llm_router.stream(self.generate_prompt(), output_tokens=REPORT_OUTPUT_TOKENS):
+                tracing.record_llm_usage(chunk)
+                text = self._chunk_text(chunk)
+                if text:
+                    if span is not None and not chunks:
+                        span.set(first_token_ms=span.elapsed_ms())
+                    chunks.append(text)
+                    yield text
+        with tracing.span("submit_pdf"):
+            self.submit_pdf(self._finish_stream(chunks))
+
+    async def astream_report(self) -> AsyncIterator[str]:
+        """
+        Async version of stream_report.
+        """
+        chunks = []
+        with tracing.llm_span("final_report", llm_router) as span:
+            async for chunk in llm_router.astream(self.generate_prompt(), output_tokens=REPORT_OUTPUT_TOKENS):
+                tracing.record_llm_usage(chunk)
+                text = self._chunk_text(chunk)
+                if text:
+                    if span is not None and not chunks:
+                        span.set(first_token_ms=span.elapsed_ms())
+                    chunks.append(text)
+                    yield text
+        with tracing.span("submit_pdf"):
+            await self.asubmit_pdf(self._finish_stream(chunks))
+
 def generate_final_report(
     origin_city: str,
     destination_city: str,
@@ -183,9 +320,11 @@ def generate_final_report(
     expense_report_text: str,
     outbound_date: str = "",
     return_date: str = "",
+    itinerary: Optional[Dict[str, Any]] = None,
+    unavailable: Optional[Dict[str, str]] = None,
 ) -> Dict[str, str]:
     """
-    Generate a final travel report and save it as a PDF.
+    Generate a final travel report and queue its PDF on the background render pool.
     """
     report_generator = ReportGenerator(
         origin_city=origin_city,
@@ -200,7 +339,127 @@ def generate_final_report(
         expense_report_text=expense_report_text,
         outbound_date=outbound_date,
         return_date=return_date,
+        itinerary=itinerary,
+        unavailable=unavailable,
         output_dir="generated_reports"  # Default output directory
     )
     
-    return report_generator.generate_and_save_report()  
+    return report_generator.generate_and_save_report()
+
+async def agenerate_final_report(
+    origin_city: str,
+    destination_city: str,
+    num_days: int,
+    flight_info: Dict[str, Any],
+    weather_info: Dict[str, Any],
+    attraction_info: List[Dict[str, Any]],
+    restaurant_info: List[Dict[str, Any]],
+    hotel_info: List[Dict[str, Any]],
+    transport_info: Dict[str, Any],
+    expense_report_text: str,
+    outbound_date: str = "",
+    return_date: str = "",
+    itinerary: Optional[Dict[str, Any]] = None,
+    unavailable: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Async version of generate_final_report.
+    """
+    report_generator = ReportGenerator(
+        origin_city=origin_city,
+        destination_city=destination_city,
+        num_days=num_days,
+        flight_info=flight_info,
+        weather_info=weather_info,
+        attraction_info=attraction_info,
+        restaurant_info=restaurant_info,
+        hotel_info=hotel_info,
+        transport_info=transport_info,
+        expense_report_text=expense_report_text,
+        outbound_date=outbound_date,
+        return_date=return_date,
+        itinerary=itinerary,
+        unavailable=unavailable,
+        output_dir="generated_reports"
+    )
+
+    return await report_generator.agenerate_and_save_report()
+
+def stream_final_report(
+    origin_city: str,
+    destination_city: str,
+    num_days: int,
+    flight_info: Dict[str, Any],
+    weather_info: Dict[str, Any],
+    attraction_info: List[Dict[str, Any]],
+    restaurant_info: List[Dict[str, Any]],
+    hotel_info: List[Dict[str, Any]],
+    transport_info: Dict[str, Any],
+    expense_report_text: str,
+    outbound_date: str = "",
+    return_date: str = "",
+    itinerary: Optional[Dict[str, Any]] = None,
+    unavailable: Optional[Dict[str, str]] = None,
+) -> Iterator[str]:
+    """
+    Stream the final travel report token by token; the PDF is queued once the stream ends.
+    """
+    report_generator = ReportGenerator(
+        origin_city=origin_city,
+        destination_city=destination_city,
+        num_days=num_days,
+        flight_info=flight_info,
+        weather_info=weather_info,
+        attraction_info=attraction_info,
+        restaurant_info=restaurant_info,
+        hotel_info=hotel_info,
+        transport_info=transport_info,
+        expense_report_text=expense_report_text,
+        outbound_date=outbound_date,
+        return_date=return_date,
+        itinerary=itinerary,
+        unavailable=unavailable,
+        output_dir="generated_reports"
+    )
+
+    yield from report_generator.stream_report()
+
+async def astream_final_report(
+    origin_city: str,
+    destination_city: str,
+    num_days: int,
+    flight_info: Dict[str, Any],
+    weather_info: Dict[str, Any],
+    attraction_info: List[Dict[str, Any]],
+    restaurant_info: List[Dict[str, Any]],
+    hotel_info: List[Dict[str, Any]],
+    transport_info: Dict[str, Any],
+    expense_report_text: str,
+    outbound_date: str = "",
+    return_date: str = "",
+    itinerary: Optional[Dict[str, Any]] = None,
+    unavailable: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[str]:
+    """
+    Async version of stream_final_report.
+    """
+    report_generator = ReportGenerator(
+        origin_city=origin_city,
+        destination_city=destination_city,
+        num_days=num_days,
+        flight_info=flight_info,
+        weather_info=weather_info,
+        attraction_info=attraction_info,
+        restaurant_info=restaurant_info,
+        hotel_info=hotel_info,
+        transport_info=transport_info,
+        expense_report_text=expense_report_text,
+        outbound_date=outbound_date,
+        return_date=return_date,
+        itinerary=itinerary,
+        unavailable=unavailable,
+        output_dir="generated_reports"
+    )
+
+    async for token in report_generator.astream_report():
+        yield token
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from utils.env_config import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = get_env_variable("CACHE_DIR", ".cache")
+RESPONSE_CACHE_ENABLED = get_env_variable("RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+RESPONSE_CACHE_PATH = get_env_variable("RESPONSE_CACHE_PATH", os.path.join(CACHE_DIR, "responses.sqlite3"))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(get_env_variable("RESPONSE_CACHE_MEMORY_ENTRIES", "512"))
+RESPONSE_CACHE_DISK_ENTRIES = int(get_env_variable("RESPONSE_CACHE_DISK_ENTRIES", "20000"))
+
+# Seconds a response stays fresh, per upstream source. Flight prices move
+# quickly; places and their ratings barely change within a day.
+DEFAULT_TTLS = {
+    "flights": 15 * 60,
+    # Open-Meteo refreshes its forecasts about hourly.
+    "weather": 3600,
+    "local_transport": 24 * 3600,
+    "nearby_transport": 24 * 3600,
+    "hotels": 24 * 3600,
+    "restaurants": 24 * 3600,
+    "attractions": 7 * 24 * 3600,
+}
+
+# Credentials never take part in a cache key.
+SECRET_PARAMS = {"api_key", "apiKey", "apikey", "key"}
+
+# Returned by lookup() on a miss, since None is a legitimate cached body.
+MISSING = object()
+
+
+def get_ttl(source: str) -> Optional[int]:
+    """
+    TTL for a source, overridable with RESPONSE_CACHE_TTL_<SOURCE>. None means do not cache.
+    """
+    override = get_env_variable(f"RESPONSE_CACHE_TTL_{source.upper()}")
+    if override is not None:
+        return int(override)
+    return DEFAULT_TTLS.get(source)
+
+
+def make_cache_key(source: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash of the source, URL and normalized request parameters, without API keys.
+    """
+    normalized = {
+        k: " ".join(str(v).split()) if isinstance(v, str) else v
+        for k, v in (params or {}).items()
+        if k not in SECRET_PARAMS and v is not None
+    }
+    payload = json.dumps([source, url, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier TTL cache for JSON-serialisable values.
+
+    Reads go to an in-memory LRU first and fall back to a SQLite table that
+    survives restarts. Both tiers are size-bounded: the LRU drops its least
+    recently used entry, and the table drops its least recently read rows.
+    """
+    def __init__(
+        self,
+        path: str,
+        table: str = "entries",
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 20000,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.table = table
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            conn = self._connection()
+            row = conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._remember(key, row[1], value)
+                self._counters["disk_hits"] += 1
+                return value
+            if row is not None:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                conn.commit()
+
+            self._counters["misses"] += 1
+            return default
+
+    def contains(self, key: str) -> bool:
+        """
+        Whether a fresh entry exists, without counting a hit or miss.
+        """
+        if not self.enabled:
+            return False
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                return True
+            row = self._connection().execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            return row is not None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if not self.enabled or ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Not caching unserialisable value for {key}: {e}")
+            return
+        with self._lock:
+            self._remember(key, expires_at, value)
+            conn = self._connection()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, expires_at, now),
+            )
+            self._counters["sets"] += 1
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._counters["evictions"] += overflow
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        counters["hit_rate"] = hits / lookups if lookups else 0.0
+        counters["entries_in_memory"] = len(self._memory)
+        return counters
+
+
+_response_cache: Optional[TieredCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> TieredCache:
+    """
+    Return the process-wide upstream response cache.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _cache_lock:
+            if _response_cache is None:
+                _response_cache = TieredCache(
+                    RESPONSE_CACHE_PATH,
+                    table="responses",
+                    max_memory_entries=RESPONSE_CACHE_MEMORY_ENTRIES,
+                    max_disk_entries=RESPONSE_CACHE_DISK_ENTRIES,
+                    enabled=RESPONSE_CACHE_ENABLED,
+                )
+    return _response_cache
+
+
+def lookup(source: Optional[str], url: str, params: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Any]:
+    """
+    Return (cache key, cached value or MISSING). The key is None when the source is not cached.
+    """
+    if source is None or get_ttl(source) is None or not get_response_cache().enabled:
+        return None, MISSING
+    key = make_cache_key(source, url, params)
+    return key, get_response_cache().get(key, MISSING)
+
+
+def store(source: Optional[str], key: Optional[str], value: Any) -> None:
+    """
+    Save a fresh response under the key returned by lookup(). Error payloads
+    (SerpAPI reports quota, key and empty-result errors as HTTP 200) are not cached.
+    """
+    if source is None or key is None:
+        return
+    if isinstance(value, dict) and "error" in value:
+        return
+    get_response_cache().set(key, value, get_ttl(source))
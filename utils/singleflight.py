@@ -0,0 +1,155 @@
+"""
+Single-flight coalescing: while a call for a key is in flight, callers asking
+for the same key wait for its result instead of making their own call.
+
+Like cached responses, the coalesced result object is shared between callers.
+Callers wait at most until their own deadline. When the leader fails because
+its deadline ran out, callers with time left do not take its error: one of
+them makes the call again.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from utils import deadline
+from utils.env_config import get_env_variable
+
+SINGLEFLIGHT_ENABLED = get_env_variable("HTTP_SINGLEFLIGHT", "1") not in ("0", "false", "False")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Whether the call failed because the leader's own deadline ran out.
+        self.out_of_time = False
+        self.task: Optional[asyncio.Future] = None
+
+
+def _out_of_time(error: BaseException) -> bool:
+    # Called in the leader's context, so this is the leader's deadline.
+    return isinstance(error, deadline.DeadlineExceeded) or deadline.expired()
+
+
+def _wait_timeout() -> Optional[float]:
+    left = deadline.remaining()
+    return None if left is None else max(left, 0.0)
+
+
+def _shared_error(call: _Call) -> bool:
+    # Retry rather than fail when only the leader ran out of time.
+    return not call.out_of_time or deadline.expired()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls, in threads (do) and on event loops (ado).
+    Async calls only coalesce with others on the same loop.
+    """
+    def __init__(self, enabled: bool = SINGLEFLIGHT_ENABLED):
+        self.enabled = enabled
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[asyncio.AbstractEventLoop, str], _Call] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() unless a call for key is already running; return (result, coalesced).
+        """
+        if not self.enabled:
+            return fn(), False
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._counters["calls"] += 1
+                else:
+                    self._counters["coalesced"] += 1
+            if leader:
+                return self._lead(key, call, fn), False
+            if not call.done.wait(_wait_timeout()):
+                raise deadline.DeadlineExceeded("deadline exceeded waiting for a coalesced call")
+            if call.error is None:
+                return call.result, True
+            if _shared_error(call):
+                raise call.error
+
+    def _lead(self, key: str, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            call.out_of_time = _out_of_time(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await fn() unless a call for key is already running on this loop; return (result, coalesced).
+        The call runs as its own task, so one caller being cancelled does not fail the others.
+        """
+        if not self.enabled:
+            return await fn(), False
+        task_key = (asyncio.get_running_loop(), key)
+        while True:
+            with self._lock:
+                call = self._tasks.get(task_key)
+                coalesced = call is not None
+                if coalesced:
+                    self._counters["coalesced"] += 1
+                else:
+                    call = self._tasks[task_key] = _Call()
+                    call.task = asyncio.ensure_future(self._alead(call, fn))
+                    self._counters["calls"] += 1
+                    call.task.add_done_callback(lambda done, call=call: self._forget(task_key, call))
+            if not coalesced:
+                return await asyncio.shield(call.task), False
+            # asyncio.wait neither cancels the shared task on timeout nor when this caller is cancelled.
+            done, _ = await asyncio.wait({call.task}, timeout=_wait_timeout())
+            if not done:
+                raise deadline.DeadlineExceeded("deadline exceeded waiting for a coalesced call")
+            error = call.task.exception()
+            if error is None:
+                return call.task.result(), True
+            if _shared_error(call):
+                raise error
+
+    async def _alead(self, call: _Call, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        except BaseException as e:
+            call.out_of_time = _out_of_time(e)
+            raise
+
+    def _forget(self, task_key: Tuple[asyncio.AbstractEventLoop, str], call: _Call) -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is call:
+                del self._tasks[task_key]
+        # Every waiter may have been cancelled; mark the error as seen so asyncio does not log it.
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls) + len(self._tasks))
+
+
+_singleflight = SingleFlight()
+
+
+def get_singleflight() -> SingleFlight:
+    """
+    Return the process-wide group the HTTP helpers coalesce upstream requests in.
+    """
+    return _singleflight
+
+
+def get_singleflight_stats() -> Dict[str, Any]:
+    return _singleflight.stats()
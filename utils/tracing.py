@@ -0,0 +1,302 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from utils.env_config import get_env_variable
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = get_env_variable("TRACING_ENABLED", "1") not in ("0", "false", "False")
+# When set, every finished span is appended to this file as one JSON object per line.
+TRACE_EXPORT_PATH = get_env_variable("TRACE_EXPORT_PATH")
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Numeric span attributes that are also summed into per-span counters.
+COUNTED_ATTRIBUTES = ("bytes", "retries", "input_tokens", "output_tokens")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation: a graph node, an upstream HTTP call or an LLM call.
+    """
+    def __init__(self, name: str, kind: str, parent: Optional["Span"] = None, **attributes: Any):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = {k: v for k, v in attributes.items() if v is not None}
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add(self, name: str, amount: float) -> None:
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000.0
+
+    def finish(self) -> None:
+        self.duration_ms = self.elapsed_ms()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram, cheap enough to update on every span.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Estimate a percentile by interpolating inside the bucket that holds it.
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * pct / 100.0
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def bucket_labels(self) -> List[str]:
+        return [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class JSONLinesExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """
+    Collects finished spans into per-(kind, name) histograms and counters,
+    and hands them to the configured exporters.
+    """
+    def __init__(self, enabled: bool = TRACING_ENABLED, export_path: Optional[str] = TRACE_EXPORT_PATH):
+        self.enabled = enabled
+        self.exporters: List[Any] = [JSONLinesExporter(export_path)] if export_path else []
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._counters: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        Time the enclosed block. Works in sync and async code; spans opened
+        inside it, including in copied contexts, become its children.
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, kind, parent=_current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Closed from another context, e.g. an abandoned streaming generator.
+                pass
+            span.finish()
+            self.record(span)
+
+    def record(self, span: Span) -> None:
+        key = (span.kind, span.name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+                self._counters[key] = {}
+            histogram.observe(span.duration_ms)
+            counters = self._counters[key]
+            if span.error:
+                counters["errors"] = counters.get("errors", 0) + 1
+            cache = span.attributes.get("cache")
+            if cache:
+                counters[f"cache_{cache}"] = counters.get(f"cache_{cache}", 0) + 1
+            for name in COUNTED_ATTRIBUTES:
+                value = span.attributes.get(name)
+                if isinstance(value, (int, float)):
+                    counters[name] = counters.get(name, 0) + value
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Latency percentiles (ms) and counters per span kind and name.
+        """
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (kind, name), histogram in sorted(self._histograms.items()):
+                result.setdefault(kind, {})[name] = {**histogram.summary(), **self._counters[(kind, name)]}
+            return result
+
+    def render_metrics(self) -> str:
+        """
+        Prometheus text exposition of the span histograms and counters.
+        """
+        lines = ["# TYPE travel_span_duration_ms histogram"]
+        counter_lines: Dict[str, List[str]] = {}
+        with self._lock:
+            for (kind, name), histogram in sorted(self._histograms.items()):
+                labels = f'kind="{kind}",name="{name}"'
+                cumulative = 0
+                for bound, count in zip(histogram.bucket_labels(), histogram.counts):
+                    cumulative += count
+                    lines.append(f'travel_span_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"travel_span_duration_ms_sum{{{labels}}} {histogram.total:.3f}")
+                lines.append(f"travel_span_duration_ms_count{{{labels}}} {histogram.count}")
+                for counter, value in sorted(self._counters[(kind, name)].items()):
+                    counter_lines.setdefault(counter, []).append(f"travel_span_{counter}_total{{{labels}}} {value}")
+        for counter, counter_values in sorted(counter_lines.items()):
+            lines.append(f"# TYPE travel_span_{counter}_total counter")
+            lines.extend(counter_values)
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, kind: str = "internal", **attributes: Any):
+    """
+    Convenience function to open a span on the process-wide tracer.
+    """
+    return _tracer.span(name, kind, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """
+    Set attributes on the innermost open span, if any.
+    """
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def record_llm_usage(message: Any) -> None:
+    """
+    Add the prompt and completion token counts of an LLM message or chunk to the current span.
+    """
+    active = _current_span.get()
+    usage = getattr(message, "usage_metadata", None)
+    # A cached answer replays the original usage, but no tokens were spent.
+    if active is None or not usage or active.attributes.get("cache") == "hit":
+        return
+    active.add("input_tokens", usage.get("input_tokens", 0))
+    active.add("output_tokens", usage.get("output_tokens", 0))
+
+
+def llm_span(name: str, model: Any):
+    """
+    Span for one LLM call, labelled with the model name.
+    """
+    model_name = getattr(model, "model_name", None) or getattr(model, "model", None)
+    return _tracer.span(name, kind="llm", model=str(model_name) if model_name else None)
+
+
+def traced(name: str, kind: str = "node") -> Callable[[Callable], Callable]:
+    """
+    Decorator that runs a sync or async function inside a span.
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.span(name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_trace_summary() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    return _tracer.summary()
+
+
+def render_metrics() -> str:
+    return _tracer.render_metrics()
@@ -1,8 +1,8 @@
 from typing import List, Dict, Optional, Any
 import requests
 from utils.env_config import get_env_variable
+from utils.http_client import get_json, aget_json
 import logging
-import aiohttp
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +15,19 @@ class FlightRequest:
         self.outbound_date = outbound_date
         self.return_date = return_date
 
+def _ranked_flights(search_results: Dict[str, Any]) -> List[Dict]:
+    # numpy is only needed once flights come in; keep it off the import path.
+    from utils.flight_table import rank_flights
+
+    return rank_flights(search_results.get("best_flights", []) + search_results.get("other_flights", []))
+
 class TransportationService:
     def __init__(self):
         self.serpapi_key = SERP_API_KEY
-        self.base_url = "https://serpapi.com/search.json"
-
-    def search_flights(self, origin_city: str, destination_city: str,
-                       outbound_date: str, return_date: Optional[str] = None) -> List[Dict]:
-        """
-        Search for flights using SerpAPI Google Flights engine.
-        """
-        logger.info(f"Searching flights: {origin_city} to {destination_city}")
+        self.base_url = get_env_variable("SERPAPI_BASE_URL", "https://serpapi.com") + "/search.json"
 
+    def _flight_params(self, origin_city: str, destination_city: str,
+                       outbound_date: str, return_date: Optional[str] = None) -> Dict[str, Any]:
         params = {
             "api_key": self.serpapi_key,
             "engine": "google_flights",
@@ -42,16 +43,24 @@ class TransportationService:
         if return_date:
             params["return_date"] = return_date
 
+        return params
+
+    def search_flights(self, origin_city: str, destination_city: str,
+                       outbound_date: str, return_date: Optional[str] = None) -> List[Dict]:
+        """
+        Search for flights using SerpAPI Google Flights engine.
+        Returns the FLIGHT_TOP_N best options as projected records (see utils/flight_table.py).
+        """
+        logger.info(f"Searching flights: {origin_city} to {destination_city}")
+
+        params = self._flight_params(origin_city, destination_city, outbound_date, return_date)
+        all_flights: List[Dict] = []
+
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            search_results = response.json()
+            search_results = get_json(self.base_url, params=params, timeout=30, source="flights")
             logger.debug(f"Search results: {search_results}")
 
-            best_flights = search_results.get("best_flights", [])
-            other_flights = search_results.get("other_flights", [])
-
-            all_flights = best_flights + other_flights
+            all_flights = _ranked_flights(search_results)
         except requests.exceptions.RequestException as e:
             logger.error(f"HTTP error while fetching flights: {e}")
         except Exception as e:
@@ -59,14 +68,26 @@ class TransportationService:
 
         return all_flights
 
-    def get_local_transportation(self, origin_lat: float, origin_lon: float,
-                                  dest_lat: float, dest_lon: float,
-                                  mode: str = "transit") -> Dict[str, Any]:
+    async def asearch_flights(self, origin_city: str, destination_city: str,
+                              outbound_date: str, return_date: Optional[str] = None) -> List[Dict]:
         """
-        Get local transportation options using SerpAPI Google Maps engine.
+        Async version of search_flights.
         """
-        logger.info(f"Searching local transportation via {mode}")
+        logger.info(f"Searching flights: {origin_city} to {destination_city}")
+
+        params = self._flight_params(origin_city, destination_city, outbound_date, return_date)
 
+        try:
+            search_results = await aget_json(self.base_url, params=params, timeout=30, source="flights")
+            logger.debug(f"Search results: {search_results}")
+            # Inside the try, as in search_flights: a malformed response must not fail the node.
+            return _ranked_flights(search_results)
+        except Exception as e:
+            logger.error(f"Error fetching flights: {e}")
+            return []
+
+    def _local_transportation_params(self, origin_lat: float, origin_lon: float,
+                                     dest_lat: float, dest_lon: float, mode: str) -> Dict[str, Any]:
         # Midpoint for the search area
         center_lat = (origin_lat + dest_lat) / 2
         center_lon = (origin_lon + dest_lon) / 2
@@ -83,39 +104,79 @@ class TransportationService:
             "ll": f"@{center_lat},{center_lon},{zoom}z",
             "hl": "en"
         }
+        return params
 
-        try:
-            response = requests.get(self.base_url, params=params, timeout=15)
-            response.raise_for_status()
+    def get_local_transportation(self, origin_lat: float, origin_lon: float,
+                                  dest_lat: float, dest_lon: float,
+                                  mode: str = "transit") -> Dict[str, Any]:
+        """
+        Get local transportation options using SerpAPI Google Maps engine.
+        """
+        logger.info(f"Searching local transportation via {mode}")
+
+        params = self._local_transportation_params(origin_lat, origin_lon, dest_lat, dest_lon, mode)
 
-            return response.json()
+        try:
+            return get_json(self.base_url, params=params, timeout=15, source="local_transport")
         except Exception as e:
             logger.error(f"Error fetching local transportation: {e}")
             return {}
 
-    def get_nearby_transport_options(self, lat: float, lon: float, transport_type: str = "public_transport") -> List[Dict]:
+    async def aget_local_transportation(self, origin_lat: float, origin_lon: float,
+                                        dest_lat: float, dest_lon: float,
+                                        mode: str = "transit") -> Dict[str, Any]:
         """
-        Get nearby transportation options (bus stops, metro stations, etc.) using SerpAPI.
+        Async version of get_local_transportation.
         """
-        logger.info(f"Searching nearby {transport_type} options")
-        
-        params = {
+        logger.info(f"Searching local transportation via {mode}")
+
+        params = self._local_transportation_params(origin_lat, origin_lon, dest_lat, dest_lon, mode)
+
+        try:
+            return await aget_json(self.base_url, params=params, timeout=15, source="local_transport")
+        except Exception as e:
+            logger.error(f"Error fetching local transportation: {e}")
+            return {}
+
+    def _nearby_transport_params(self, lat: float, lon: float, transport_type: str) -> Dict[str, Any]:
+        return {
             "api_key": self.serpapi_key,
             "engine": "google_maps",
             "type": "search",
             "q": transport_type,
             "ll": f"@{lat},{lon},14z"
         }
+
+    def get_nearby_transport_options(self, lat: float, lon: float, transport_type: str = "public_transport") -> List[Dict]:
+        """
+        Get nearby transportation options (bus stops, metro stations, etc.) using SerpAPI.
+        """
+        logger.info(f"Searching nearby {transport_type} options")
+        
+        params = self._nearby_transport_params(lat, lon, transport_type)
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=15)
-            response.raise_for_status()
-            results = response.json().get("local_results", [])
+            results = get_json(self.base_url, params=params, timeout=15, source="nearby_transport").get("local_results", [])
             return results
         except Exception as e:
             logger.error(f"Error fetching nearby transport options: {e}")
             return []
 
+    async def aget_nearby_transport_options(self, lat: float, lon: float, transport_type: str = "public_transport") -> List[Dict]:
+        """
+        Async version of get_nearby_transport_options.
+        """
+        logger.info(f"Searching nearby {transport_type} options")
+
+        params = self._nearby_transport_params(lat, lon, transport_type)
+
+        try:
+            results = await aget_json(self.base_url, params=params, timeout=15, source="nearby_transport")
+            return results.get("local_results", [])
+        except Exception as e:
+            logger.error(f"Error fetching nearby transport options: {e}")
+            return []
+
 # Utility functions for easy access
 
 def get_flight_results(origin_city: str, destination_city: str, outbound_date: str, return_date: Optional[str] = None) -> List[Dict]:
@@ -140,6 +201,28 @@ def get_nearby_transport(lat: float, lon: float, transport_type: str = "public_t
     service = TransportationService()
     return service.get_nearby_transport_options(lat, lon, transport_type)
 
+async def aget_flight_results(origin_city: str, destination_city: str, outbound_date: str, return_date: Optional[str] = None) -> List[Dict]:
+    """
+    Async version of get_flight_results.
+    """
+    service = TransportationService()
+    return await service.asearch_flights(origin_city, destination_city, outbound_date, return_date)
+
+async def aget_transportation_results(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float,
+                                      mode: str = "transit") -> Dict[str, Any]:
+    """
+    Async version of get_transportation_results.
+    """
+    service = TransportationService()
+    return await service.aget_local_transportation(origin_lat, origin_lon, dest_lat, dest_lon, mode)
+
+async def aget_nearby_transport(lat: float, lon: float, transport_type: str = "public_transport") -> List[Dict]:
+    """
+    Async version of get_nearby_transport.
+    """
+    service = TransportationService()
+    return await service.aget_nearby_transport_options(lat, lon, transport_type)
+
 # Example usage functions
 def example_flight_search():
     """
@@ -1,41 +1,172 @@
-import requests
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from langchain_core.tools import tool
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from utils.env_config import get_env_variable
+from utils.http_client import get_json, aget_json
+from utils.geocoding_cache import get_geocoding_cache
+from utils import response_cache, tracing
+
+DAILY_VARIABLES = "weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum,rain_sum,showers_sum,snowfall_sum"
+# Open-Meteo forecasts reach 16 days ahead, today included.
+FORECAST_HORIZON_DAYS = 16
+# Locations per bulk request; Open-Meteo takes comma-separated lists but the URL has to stay short.
+WEATHER_BULK_MAX_LOCATIONS = int(get_env_variable("WEATHER_BULK_MAX_LOCATIONS", "100"))
+# A day counts as rainy from 1 mm of precipitation (the WMO wet-day threshold).
+RAINY_DAY_MM = 1.0
+SUNNY_WEATHER_CODES = (0, 1)
+
+
+def forecast_window(outbound_date: Optional[str], return_date: Optional[str] = None,
+                    num_days: Optional[int] = None, today: Optional[date] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (start_date, end_date) of the trip clipped to the forecast horizon, as ISO dates.
+    (None, None) when the trip dates are missing or lie entirely outside the horizon,
+    in which case callers fall back to a plain forecast_days request.
+    """
+    if not outbound_date:
+        return None, None
+    today = today or date.today()
+    try:
+        start = date.fromisoformat(outbound_date)
+        if return_date:
+            end = date.fromisoformat(return_date)
+        else:
+            end = start + timedelta(days=max(int(num_days or 1), 1) - 1)
+    except ValueError:
+        return None, None
+    start = max(start, today)
+    end = min(end, today + timedelta(days=FORECAST_HORIZON_DAYS - 1))
+    if start > end:
+        return None, None
+    return start.isoformat(), end.isoformat()
+
+
+def _chunks(items: List[int], size: int) -> List[List[int]]:
+    return [items[i:i + size] for i in range(0, len(items), max(size, 1))]
+
+
+def _daily_matrix(np, forecasts: Sequence[Optional[Dict]], field: str, length: int):
+    """
+    locations x days array of one daily variable, NaN where a value is missing.
+    """
+    matrix = np.full((len(forecasts), length), np.nan)
+    for row, forecast in enumerate(forecasts):
+        values = ((forecast or {}).get("daily") or {}).get(field) or []
+        values = values[:length]
+        if values:
+            matrix[row, :len(values)] = np.array(values, dtype=float)
+    return matrix
+
+
+def forecast_statistics(forecasts: Sequence[Optional[Dict]], days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Daily and summary statistics for many forecasts at once.
+
+    Returns locations x days arrays (max_temp, min_temp, avg_temp, precipitation,
+    weather_code; NaN where missing) and per-location summary arrays
+    (average_temp, total_precipitation, rainy_days, sunny_days, days).
+    days caps the number of days used from each forecast.
+    """
+    # numpy is only needed once forecasts come in; keep it off the import path.
+    import numpy as np
+
+    lengths = [len(((f or {}).get("daily") or {}).get("time") or []) for f in forecasts]
+    if days is not None:
+        lengths = [min(n, days) for n in lengths]
+    length = max(lengths, default=0)
+
+    max_temp = _daily_matrix(np, forecasts, "temperature_2m_max", length)
+    min_temp = _daily_matrix(np, forecasts, "temperature_2m_min", length)
+    precipitation = _daily_matrix(np, forecasts, "precipitation_sum", length)
+    weather_code = _daily_matrix(np, forecasts, "weathercode", length)
+    # Rows are padded to the longest forecast; padding never counts.
+    in_range = np.arange(length)[None, :] < np.array(lengths)[:, None]
+    avg_temp = (max_temp + min_temp) / 2
+
+    valid_temp = in_range & ~np.isnan(avg_temp)
+    temp_days = valid_temp.sum(axis=1)
+    temp_sum = np.where(valid_temp, avg_temp, 0.0).sum(axis=1)
+    average = np.divide(temp_sum, temp_days, out=np.full(len(forecasts), np.nan), where=temp_days > 0)
+
+    return {
+        "max_temp": max_temp,
+        "min_temp": min_temp,
+        "avg_temp": avg_temp,
+        "precipitation": precipitation,
+        "weather_code": weather_code,
+        "days": np.array(lengths, dtype=int),
+        "average_temp": average,
+        "total_precipitation": np.where(in_range & ~np.isnan(precipitation), precipitation, 0.0).sum(axis=1),
+        "rainy_days": (in_range & (precipitation >= RAINY_DAY_MM)).sum(axis=1),
+        "sunny_days": (in_range & np.isin(weather_code, SUNNY_WEATHER_CODES)).sum(axis=1),
+    }
+
+
+def _report_days(days: int, start_date: Optional[str], end_date: Optional[str]) -> Optional[int]:
+    """
+    Days a report covers: a date window's forecast already spans just the trip
+    (up to the horizon), so days only caps plain forecast_days requests.
+    """
+    return None if start_date and end_date else days
+
+
+def _number(value: float) -> Optional[float]:
+    return None if value != value else float(value)
+
 # https://api.open-meteo.com/v1/forecast?latitude=17.4065&longitude=78.4772&daily=temperature_2m_max,temperature_2m_min,rain_sum,showers_sum,snowfall_sum&timezone=IST&forecast_days=5
 class WeatherService:
     def __init__(self):
-        self.geocoding_api_url = "https://geocoding-api.open-meteo.com/v1/search"
-        self.weather_api_url = "https://api.open-meteo.com/v1/forecast"
+        self.geocoding_api_url = get_env_variable("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+        self.weather_api_url = get_env_variable("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+        self.geocoding_cache = get_geocoding_cache()
         
+    def _geocoding_params(self, city_name: str) -> Dict:
+        return {
+            "name": city_name,
+            "count": 1,
+            "language": "en",
+            "format": "json"
+        }
+
+    def _parse_coordinates(self, city_name: str, data: Dict) -> Optional[Tuple[float, float]]:
+        if data.get("results") and len(data["results"]) > 0:
+            city_data = data["results"][0]
+            latitude = city_data["latitude"]
+            longitude = city_data["longitude"]
+            self.geocoding_cache.set(city_name, latitude, longitude)
+            return latitude, longitude
+        else:
+            print(f"City '{city_name}' not found")
+            return None
+
     def get_city_coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
         """
         Convert city name to latitude and longitude coordinates using geocoding API
         """
+        coordinates = self.geocoding_cache.get(city_name)
+        tracing.annotate(cache="hit" if coordinates else "miss")
+        if coordinates:
+            return coordinates
         try:
-            params = {
-                "name": city_name,
-                "count": 1,
-                "language": "en",
-                "format": "json"
-            }
-            
-            response = requests.get(self.geocoding_api_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if data.get("results") and len(data["results"]) > 0:
-                city_data = data["results"][0]
-                latitude = city_data["latitude"]
-                longitude = city_data["longitude"]
-                return latitude, longitude
-            else:
-                print(f"City '{city_name}' not found")
-                return None
-                
+            data = get_json(self.geocoding_api_url, params=self._geocoding_params(city_name), timeout=10,
+                            source="geocoding")
+            return self._parse_coordinates(city_name, data)
+        except Exception as e:
+            print(f"Error fetching coordinates for {city_name}: {e}")
+            return None
+
+    async def aget_city_coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
+        """
+        Async version of get_city_coordinates
+        """
+        coordinates = self.geocoding_cache.get(city_name)
+        tracing.annotate(cache="hit" if coordinates else "miss")
+        if coordinates:
+            return coordinates
+        try:
+            data = await aget_json(self.geocoding_api_url, params=self._geocoding_params(city_name), timeout=10,
+                                   source="geocoding")
+            return self._parse_coordinates(city_name, data)
         except Exception as e:
             print(f"Error fetching coordinates for {city_name}: {e}")
             return None
@@ -59,27 +190,115 @@ class WeatherService:
         return lon1, lat1, lon2, lat2
 
     
-    def get_weather_forecast(self, latitude: float, longitude: float, days: int = 7) -> Optional[Dict]:
+    def _forecast_params(self, latitude: Any, longitude: Any, days: int,
+                         start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "daily": DAILY_VARIABLES,
+            "timezone": "Asia/Kolkata",  # You can use "Asia/Kolkata" for IST explicitly
+        }
+        if start_date and end_date:
+            # Only the days the trip covers.
+            params["start_date"] = start_date
+            params["end_date"] = end_date
+        else:
+            params["forecast_days"] = days
+        return params
+
+    def get_weather_forecast(self, latitude: float, longitude: float, days: int = 7,
+                             start_date: Optional[str] = None, end_date: Optional[str] = None) -> Optional[Dict]:
         """
-        Get weather forecast for given coordinates
+        Get weather forecast for given coordinates, for start_date..end_date when given
         """
         try:
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "daily": "weathercode,temperature_2m_max,temperature_2m_min,rain_sum,showers_sum,snowfall_sum",
-                "timezone": "Asia/Kolkata",  # You can use "Asia/Kolkata" for IST explicitly
-                "forecast_days": days
-            }
-
-            response = requests.get(self.weather_api_url, params=params, timeout=10)
-            response.raise_for_status()
-            print(response.json())
-            return response.json()
+            params = self._forecast_params(latitude, longitude, days, start_date, end_date)
+            data = get_json(self.weather_api_url, params=params, timeout=10, source="weather")
+            print(data)
+            return data
 
         except Exception as e:
             print(f"Error fetching weather data: {e}")
             return None
+
+    async def aget_weather_forecast(self, latitude: float, longitude: float, days: int = 7,
+                                    start_date: Optional[str] = None, end_date: Optional[str] = None) -> Optional[Dict]:
+        """
+        Async version of get_weather_forecast
+        """
+        try:
+            params = self._forecast_params(latitude, longitude, days, start_date, end_date)
+            return await aget_json(self.weather_api_url, params=params, timeout=10, source="weather")
+        except Exception as e:
+            print(f"Error fetching weather data: {e}")
+            return None
+
+    def _bulk_lookup(self, coordinates: Sequence[Tuple[float, float]], days: int,
+                     start_date: Optional[str], end_date: Optional[str]) -> Tuple[List[Any], List[Optional[Dict]], List[int]]:
+        """
+        Per-location cache keys (the ones a single-location request uses), cached
+        forecasts, and the indices that still have to be fetched.
+        """
+        keys, forecasts, missing = [], [], []
+        for i, (latitude, longitude) in enumerate(coordinates):
+            params = self._forecast_params(latitude, longitude, days, start_date, end_date)
+            key, cached = response_cache.lookup("weather", self.weather_api_url, params)
+            keys.append(key)
+            if cached is response_cache.MISSING or cached is None:
+                forecasts.append(None)
+                missing.append(i)
+            else:
+                forecasts.append(cached)
+        return keys, forecasts, missing
+
+    def _bulk_params(self, coordinates: Sequence[Tuple[float, float]], days: int,
+                     start_date: Optional[str], end_date: Optional[str]) -> Dict:
+        return self._forecast_params(
+            ",".join(str(latitude) for latitude, _ in coordinates),
+            ",".join(str(longitude) for _, longitude in coordinates),
+            days, start_date, end_date,
+        )
+
+    def _store_bulk(self, chunk: List[int], data: Any, keys: List[Any], forecasts: List[Optional[Dict]]) -> None:
+        # One location comes back as an object, several as a list in request order.
+        items = data if isinstance(data, list) else [data]
+        for i, item in zip(chunk, items):
+            forecasts[i] = item
+            response_cache.store("weather", keys[i], item)
+
+    def get_weather_forecasts(self, coordinates: Sequence[Tuple[float, float]], days: int = 7,
+                              start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Optional[Dict]]:
+        """
+        Forecasts for many coordinates, one request per WEATHER_BULK_MAX_LOCATIONS locations.
+        Each forecast is cached under the same key a single-location request would use,
+        so a bulk call also warms the cache for get_weather_forecast.
+        """
+        keys, forecasts, missing = self._bulk_lookup(coordinates, days, start_date, end_date)
+        for chunk in _chunks(missing, WEATHER_BULK_MAX_LOCATIONS):
+            params = self._bulk_params([coordinates[i] for i in chunk], days, start_date, end_date)
+            try:
+                data = get_json(self.weather_api_url, params=params, timeout=30, source="weather_bulk")
+            except Exception as e:
+                print(f"Error fetching weather data for {len(chunk)} locations: {e}")
+                continue
+            self._store_bulk(chunk, data, keys, forecasts)
+        return forecasts
+
+    async def aget_weather_forecasts(self, coordinates: Sequence[Tuple[float, float]], days: int = 7,
+                                     start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Optional[Dict]]:
+        """
+        Async version of get_weather_forecasts
+        """
+        keys, forecasts, missing = self._bulk_lookup(coordinates, days, start_date, end_date)
+        for chunk in _chunks(missing, WEATHER_BULK_MAX_LOCATIONS):
+            params = self._bulk_params([coordinates[i] for i in chunk], days, start_date, end_date)
+            try:
+                data = await aget_json(self.weather_api_url, params=params, timeout=30, source="weather_bulk")
+            except Exception as e:
+                print(f"Error fetching weather data for {len(chunk)} locations: {e}")
+                continue
+            self._store_bulk(chunk, data, keys, forecasts)
+        return forecasts
     
     def get_weather_description(self, weather_code: int) -> str:
         """
@@ -113,73 +332,121 @@ class WeatherService:
         }
         return weather_codes.get(weather_code, "Unknown")
     
-    def generate_weather_report(self, city_name: str, days: int = 7) -> Dict:
+    def generate_weather_report(self, city_name: str, days: int = 7,
+                                coordinates: Optional[Tuple[float, float]] = None,
+                                start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
         """
-        Generate comprehensive weather report for a city
+        Generate comprehensive weather report for a city.
+        Pass coordinates when they are already known to skip geocoding, and
+        start_date/end_date (see forecast_window) to cover only the trip.
         """
-        coordinates = self.get_city_coordinates(city_name)
+        coordinates = coordinates or self.get_city_coordinates(city_name)
         if not coordinates:
             return {"error": f"Could not find coordinates for {city_name}"}
         
         latitude, longitude = coordinates
 
-        weather_data = self.get_weather_forecast(latitude, longitude, days)
-        if not weather_data:
-            return {"error": f"Could not fetch weather data for {city_name}"}
-        
-        daily_data = weather_data.get("daily", {})
-        
-        report = {
-            "city": city_name,
-            "coordinates": {
-                "latitude": latitude,
-                "longitude": longitude
-            },
-            "forecast_days": days,
-            "daily_forecast": [],
-            "summary": {
-                "average_temp": 0,
-                "total_precipitation": 0,
-                "rainy_days": 0,
-                "sunny_days": 0
-            }
-        }
-        
-        if daily_data:
-            times = daily_data.get("time", [])
-            max_temps = daily_data.get("temperature_2m_max", [])
-            min_temps = daily_data.get("temperature_2m_min", [])
-            precipitations = daily_data.get("precipitation_sum", [])
-            weather_codes = daily_data.get("weathercode", [])
-            
-            total_temp = 0
-            
-            for i in range(min(len(times), days)):
-                date = times[i]
-                max_temp = max_temps[i] if i < len(max_temps) else None
-                min_temp = min_temps[i] if i < len(min_temps) else None
-                precip = precipitations[i] if i < len(precipitations) else None
-                weather_code = weather_codes[i] if i < len(weather_codes) else 0
-                
-                avg_temp = (max_temp + min_temp) / 2 if max_temp is not None and min_temp is not None else None
-                total_temp += avg_temp
-                
-                daily_forecast = {
-                    "date": date,
-                    "max_temperature": max_temp,
-                    "min_temperature": min_temp,
-                    "average_temperature": avg_temp,
-                    "precipitation": precip,
+        weather_data = self.get_weather_forecast(latitude, longitude, days, start_date, end_date)
+        return self.build_weather_reports([city_name], [coordinates], [weather_data],
+                                          _report_days(days, start_date, end_date))[0]
+
+    async def agenerate_weather_report(self, city_name: str, days: int = 7,
+                                       coordinates: Optional[Tuple[float, float]] = None,
+                                       start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        """
+        Async version of generate_weather_report
+        """
+        coordinates = coordinates or await self.aget_city_coordinates(city_name)
+        if not coordinates:
+            return {"error": f"Could not find coordinates for {city_name}"}
+
+        latitude, longitude = coordinates
+
+        weather_data = await self.aget_weather_forecast(latitude, longitude, days, start_date, end_date)
+        return self.build_weather_reports([city_name], [coordinates], [weather_data],
+                                          _report_days(days, start_date, end_date))[0]
+
+    def generate_weather_reports(self, city_names: Sequence[str], days: int = 7,
+                                 coordinates: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+                                 start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+        """
+        Weather reports for many cities sharing one date window, fetched in bulk.
+        coordinates, when given, lines up with city_names; None entries are geocoded.
+        """
+        coordinates = list(coordinates or [None] * len(city_names))
+        coordinates = [c or self.get_city_coordinates(city) for city, c in zip(city_names, coordinates)]
+        located = [i for i, c in enumerate(coordinates) if c]
+        fetched = self.get_weather_forecasts([coordinates[i] for i in located], days, start_date, end_date)
+        return self._assemble_reports(city_names, coordinates, located, fetched,
+                                      _report_days(days, start_date, end_date))
+
+    async def agenerate_weather_reports(self, city_names: Sequence[str], days: int = 7,
+                                        coordinates: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+                                        start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+        """
+        Async version of generate_weather_reports
+        """
+        coordinates = list(coordinates or [None] * len(city_names))
+        coordinates = [c or await self.aget_city_coordinates(city) for city, c in zip(city_names, coordinates)]
+        located = [i for i, c in enumerate(coordinates) if c]
+        fetched = await self.aget_weather_forecasts([coordinates[i] for i in located], days, start_date, end_date)
+        return self._assemble_reports(city_names, coordinates, located, fetched,
+                                      _report_days(days, start_date, end_date))
+
+    def _assemble_reports(self, city_names: Sequence[str], coordinates: List[Optional[Tuple[float, float]]],
+                          located: List[int], fetched: List[Optional[Dict]], days: Optional[int]) -> List[Dict]:
+        reports: List[Dict] = [{"error": f"Could not find coordinates for {city}"} for city in city_names]
+        built = self.build_weather_reports([city_names[i] for i in located], [coordinates[i] for i in located],
+                                           fetched, days)
+        for i, report in zip(located, built):
+            reports[i] = report
+        return reports
+
+    def build_weather_reports(self, city_names: Sequence[str], coordinates: Sequence[Tuple[float, float]],
+                              forecasts: Sequence[Optional[Dict]], days: Optional[int]) -> List[Dict]:
+        """
+        Turn raw forecasts into reports, with the statistics of all locations computed together.
+        days caps the days reported; None reports every day fetched.
+        """
+        stats = forecast_statistics(forecasts, days)
+        reports = []
+        for row, (city_name, (latitude, longitude), weather_data) in enumerate(zip(city_names, coordinates, forecasts)):
+            if not weather_data:
+                reports.append({"error": f"Could not fetch weather data for {city_name}"})
+                continue
+            times = (weather_data.get("daily") or {}).get("time") or []
+            count = int(stats["days"][row])
+            daily_forecast = []
+            for i in range(count):
+                code = stats["weather_code"][row, i]
+                weather_code = 0 if code != code else int(code)
+                daily_forecast.append({
+                    "date": times[i],
+                    "max_temperature": _number(stats["max_temp"][row, i]),
+                    "min_temperature": _number(stats["min_temp"][row, i]),
+                    "average_temperature": _number(stats["avg_temp"][row, i]),
+                    "precipitation": _number(stats["precipitation"][row, i]),
                     "weather_description": self.get_weather_description(weather_code),
                     "weather_code": weather_code
+                })
+            reports.append({
+                "city": city_name,
+                "coordinates": {
+                    "latitude": latitude,
+                    "longitude": longitude
+                },
+                "forecast_days": count,
+                "start_date": times[0] if count else None,
+                "end_date": times[count - 1] if count else None,
+                "daily_forecast": daily_forecast,
+                "summary": {
+                    "average_temp": _number(stats["average_temp"][row]),
+                    "total_precipitation": float(stats["total_precipitation"][row]),
+                    "rainy_days": int(stats["rainy_days"][row]),
+                    "sunny_days": int(stats["sunny_days"][row])
                 }
-                
-                report["daily_forecast"].append(daily_forecast)
-
-            if len(report["daily_forecast"]) > 0:
-                report["summary"]["average_temp"] = total_temp / len(report["daily_forecast"])
-        
-        return report
+            })
+        return reports
     
     def print_weather_report(self, report: Dict) -> None:
         """
@@ -196,7 +463,10 @@ class WeatherService:
         print(f"Forecast Period: {report['forecast_days']} days")
         
         print(f"\nSUMMARY:")
-        print(f"  Average Temperature: {report['summary']['average_temp']:.1f}°C")
+        average_temp = report['summary']['average_temp']
+        print(f"  Average Temperature: {average_temp:.1f}°C" if average_temp is not None else "  Average Temperature: N/A")
+        print(f"  Total Precipitation: {report['summary']['total_precipitation']:.1f} mm "
+              f"({report['summary']['rainy_days']} rainy, {report['summary']['sunny_days']} sunny days)")
         
         print(f"\nDAILY FORECAST:")
         print(f"{'Date':<12} {'Max':<6} {'Min':<6} {'Avg':<6}{'Weather':<20}")
@@ -232,28 +502,72 @@ class WeatherService:
         lon2 = longitude + delta
         return lon1, lat1, lon2, lat2
 
-def get_weather_for_city(city_name: str, days: int = 7) -> Dict:
+# Shared by the convenience functions below; the service holds no per-call state.
+_weather_service = WeatherService()
+
+def get_weather_for_city(city_name: str, days: int = 7,
+                         start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
     """
     Convenience function to get weather report for a city
     """
-    weather_service = WeatherService()
-    return weather_service.generate_weather_report(city_name, days)
+    return _weather_service.generate_weather_report(city_name, days, start_date=start_date, end_date=end_date)
+
+async def aget_weather_for_city(city_name: str, days: int = 7,
+                                start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+    """
+    Async version of get_weather_for_city
+    """
+    return await _weather_service.agenerate_weather_report(city_name, days, start_date=start_date, end_date=end_date)
+
+def get_weather_for_cities(city_names: Sequence[str], days: int = 7,
+                           coordinates: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+                           start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+    """
+    Convenience function to get weather reports for many cities in bulk requests
+    """
+    return _weather_service.generate_weather_reports(city_names, days, coordinates, start_date, end_date)
+
+async def aget_weather_for_cities(city_names: Sequence[str], days: int = 7,
+                                  coordinates: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+                                  start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+    """
+    Async version of get_weather_for_cities
+    """
+    return await _weather_service.agenerate_weather_reports(city_names, days, coordinates, start_date, end_date)
 
 def get_city_coordinates(city_name: str):
-    weather_service = WeatherService()
-    return weather_service.get_city_coordinates(city_name=city_name)
+    return _weather_service.get_city_coordinates(city_name=city_name)
+
+async def aget_city_coordinates(city_name: str):
+    return await _weather_service.aget_city_coordinates(city_name=city_name)
 
 def get_city_bopunding_box(latitude : str, longitude:str):
-     weather_service = WeatherService()
-     return weather_service.get_bounding_box(latitude, longitude)
+     return _weather_service.get_bounding_box(latitude, longitude)
 
-def print_weather_for_city(city_name: str, days: int = 7) -> None:
+def get_geocoding_stats() -> Dict[str, int]:
+    """
+    Hit/miss counters of the persistent geocoding cache
+    """
+    return _weather_service.geocoding_cache.stats()
+
+def print_weather_for_city(city_name: str, days: int = 7,
+                           coordinates: Optional[Tuple[float, float]] = None,
+                           start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
     """
     Convenience function to print weather report for a city
     """
-    weather_service = WeatherService()
-    report = weather_service.generate_weather_report(city_name, days)
-    weather_service.print_weather_report(report)
+    report = _weather_service.generate_weather_report(city_name, days, coordinates=coordinates,
+                                                      start_date=start_date, end_date=end_date)
+    _weather_service.print_weather_report(report)
     return report
 
-
+async def aprint_weather_for_city(city_name: str, days: int = 7,
+                                  coordinates: Optional[Tuple[float, float]] = None,
+                                  start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+    """
+    Async version of print_weather_for_city
+    """
+    report = await _weather_service.agenerate_weather_report(city_name, days, coordinates=coordinates,
+                                                             start_date=start_date, end_date=end_date)
+    _weather_service.print_weather_report(report)
+    return report
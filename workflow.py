@@ -1,15 +1,35 @@
-from langgraph.graph import StateGraph
-from typing import TypedDict, List, Dict, Optional, Any
+import asyncio
+import logging
+import operator
+import uuid
+from typing import Annotated, TypedDict, List, Dict, Optional, Any, Iterator, AsyncIterator, Tuple
 
 # === TOOL IMPORTS ===
-from utils.weather import print_weather_for_city, get_city_coordinates, get_city_bopunding_box
-from utils.attraction_spots import get_attraction_spots
-from utils.culinaries import get_topk_restaurants
-from utils.transportation import get_flight_results, get_transportation_results, get_nearby_transport
-from utils.hotels import get_topk_hotels
-from utils.expense_calculation import calculate_expenses
-from utils.report_generation import generate_final_report
+from utils.weather import (
+    print_weather_for_city, get_city_coordinates, get_city_bopunding_box,
+    aprint_weather_for_city, aget_city_coordinates, forecast_window,
+)
+from utils.attraction_spots import get_attraction_spots, aget_attraction_spots
+from utils.culinaries import get_topk_restaurants, aget_topk_restaurants
+from utils.transportation import (
+    get_flight_results, get_transportation_results, get_nearby_transport,
+    aget_flight_results, aget_transportation_results, aget_nearby_transport,
+)
+from utils.hotels import get_topk_hotels, aget_topk_hotels
+from utils.expense_calculation import calculate_expenses, acalculate_expenses
+from utils.itinerary import plan_itinerary
+from utils.report_generation import ReportGenerator
+from utils.tracing import traced
+from utils import deadline
+from utils.checkpoints import thread_config
+
+logger = logging.getLogger(__name__)
+
 # === STATE ===
+def _last_value(current: Any, new: Any) -> Any:
+    # Nodes resumed together in one step may all restart the deadline.
+    return new
+
 class TravelState(TypedDict):
     user_input: str
     user_input_data: Dict[str, Any]
@@ -21,166 +41,464 @@ class TravelState(TypedDict):
     nearby_transport: Optional[List[Dict]]
     restaurant_info: Optional[List[Dict]]
     attraction_info: Optional[List[Dict]]
+    itinerary: Optional[Dict]  # day-by-day visiting plan over attraction_info
     expenses: Optional[Dict]
     final_report: Optional[str]
+    report_pdf_path: Optional[str]  # written in the background; see wait_for_pdf
+    deadlines: Annotated[Optional[Dict[str, float]], _last_value]  # {"plan", "fetch"} in epoch seconds; see utils/deadline.py
+    unavailable: Annotated[Dict[str, str], operator.or_]  # fetch node -> deadline_exceeded / error
+    error: Optional[str]  # set by plan_batch on a trip that could not be planned
 
 # === AGENT FUNCTIONS ===
-def orchestrator(state: TravelState) -> TravelState:
-    city = state["user_input_data"]["city"]
-    lat, lon = get_city_coordinates(city)
+def _destination_details(lat: float, lon: float) -> Dict[str, Any]:
     lon1, lat1, lon2, lat2 = get_city_bopunding_box(lat, lon)
-    state["destination_details"] = {
+    return {
         "latitude": lat,
         "longitude": lon,
         "bounding_box": {"lon1": lon1, "lat1": lat1, "lon2": lon2, "lat2": lat2},
     }
-    return state
-
-def weather_agent(state: TravelState) -> TravelState:
-    city = state["user_input_data"]["city"]
-    result = print_weather_for_city(city)
-    state["weather_info"] = result
-    return state
 
-def hotel_agent(state: TravelState) -> TravelState:
-    city = state["user_input_data"]["city"]
-    result = get_topk_hotels(city, topk=5)
-    state["hotel_info"] = result
-    return state
+def _weather_args(state: TravelState) -> Dict[str, Any]:
+    user_input = state["user_input_data"]
+    start_date, end_date = forecast_window(
+        user_input.get("outbound_date"), user_input.get("return_date"), user_input.get("num_days")
+    )
+    return dict(
+        coordinates=_coordinates(state),
+        start_date=start_date,
+        end_date=end_date
+    )
 
-def flight_agent(state: TravelState) -> TravelState:
+def _flight_args(state: TravelState) -> Dict[str, Any]:
     user_input = state["user_input_data"]
-    result = get_flight_results(
+    return dict(
         origin_city=user_input["origin_city"],
         destination_city=user_input["destination_city"],
         outbound_date=user_input["outbound_date"],
         return_date=user_input["return_date"]
     )
-    state["flight_info"] = result
-    return state
 
-def transport_agent(state: TravelState) -> TravelState:
+def _transport_args(state: TravelState) -> Dict[str, Any]:
     bbx = state["destination_details"]["bounding_box"]
-    result = get_transportation_results(
+    return dict(
         origin_lat=bbx["lat1"],
         origin_lon=bbx["lon1"],
         dest_lat=bbx["lat2"],
         dest_lon=bbx["lon2"],
         mode="transit"
     )
-    state["transport_info"] = result
-    return state
 
-def nearby_transport_agent(state: TravelState) -> TravelState:
+def _expense_args(state: TravelState) -> Dict[str, Any]:
+    return dict(
+        city_name=state["user_input_data"]["city"],
+        currency="INR",  # Assuming INR for simplicity, can be parameterized
+        num_days=state["user_input_data"]["num_days"],
+        flight_info=state["flight_info"],
+        hotel_info=state["hotel_info"],
+        transport_info=state["transport_info"],
+        restaurant_info=state["restaurant_info"],
+        attraction_info=state["attraction_info"]
+    )
+
+def _report_args(state: TravelState) -> Dict[str, Any]:
+    user_input = state["user_input_data"]
+    return dict(
+        origin_city=user_input["origin_city"],
+        destination_city=user_input["destination_city"],
+        num_days=user_input["num_days"],
+        flight_info=state["flight_info"],
+        weather_info=state["weather_info"],
+        attraction_info=state["attraction_info"],
+        restaurant_info=state["restaurant_info"],
+        hotel_info=state["hotel_info"],
+        transport_info=state["transport_info"],
+        expense_report_text=state["expenses"],
+        outbound_date=user_input["outbound_date"],
+        return_date=user_input.get("return_date", ""),
+        itinerary=state.get("itinerary"),
+        unavailable=state.get("unavailable")
+    )
+
+def _itinerary_args(state: TravelState) -> Dict[str, Any]:
+    user_input = state["user_input_data"]
+    # Days start and end at the first hotel that has coordinates.
+    hotel = next((h for h in state.get("hotel_info") or [] if h.get("lat") is not None), None)
+    return dict(
+        attractions=state.get("attraction_info") or [],
+        num_days=user_input["num_days"],
+        start_date=user_input.get("outbound_date"),
+        base=hotel
+    )
+
+def orchestrator(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    lat, lon = get_city_coordinates(city)
+    return {"destination_details": _destination_details(lat, lon)}
+
+def _coordinates(state: TravelState):
+    details = state["destination_details"]
+    return details["latitude"], details["longitude"]
+
+def weather_agent(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    result = print_weather_for_city(city, **_weather_args(state))
+    return {"weather_info": result}
+
+def hotel_agent(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    result = get_topk_hotels(city, topk=5, coordinates=_coordinates(state))
+    return {"hotel_info": result}
+
+def flight_agent(state: TravelState) -> Dict[str, Any]:
+    result = get_flight_results(**_flight_args(state))
+    return {"flight_info": result}
+
+def transport_agent(state: TravelState) -> Dict[str, Any]:
+    result = get_transportation_results(**_transport_args(state))
+    return {"transport_info": result}
+
+def nearby_transport_agent(state: TravelState) -> Dict[str, Any]:
     lat = state["destination_details"]["latitude"]
     lon = state["destination_details"]["longitude"]
     result = get_nearby_transport(lat=lat, lon=lon, transport_type="metro station")
-    state["nearby_transport"] = result
-    return state
+    return {"nearby_transport": result}
 
-def restaurant_agent(state: TravelState) -> TravelState:
+def restaurant_agent(state: TravelState) -> Dict[str, Any]:
     city = state["user_input_data"]["city"]
-    result = get_topk_restaurants(city, topk=5)
-    state["restaurant_info"] = result
-    return state
+    result = get_topk_restaurants(city, topk=5, coordinates=_coordinates(state))
+    return {"restaurant_info": result}
 
-def attraction_agent(state: TravelState) -> TravelState:
+def attraction_agent(state: TravelState) -> Dict[str, Any]:
     lat = state["destination_details"]["latitude"]
     lon = state["destination_details"]["longitude"]
     result = get_attraction_spots(lat, lon)
-    state["attraction_info"] = result
-    return state
+    return {"attraction_info": result}
+
+def itinerary_agent(state: TravelState) -> Dict[str, Any]:
+    return {"itinerary": plan_itinerary(**_itinerary_args(state))}
+
+def expense_agent(state: TravelState) -> Dict[str, Any]:
+    expense_report = calculate_expenses(**_expense_args(state))
+    return {"expenses": expense_report}
+
+def _join_report(tokens: List[str]) -> str:
+    return "".join(tokens).strip() or "Failed to generate report."
+
+TRUNCATED_REPORT_NOTE = "\n\n_[Report cut short: the plan reached its deadline.]_"
 
-def expense_agent(state: TravelState) -> TravelState:
-    num_days = state["user_input_data"]["num_days"]
+def fusion_agent(state: TravelState) -> Dict[str, Any]:
+    # Streaming the completion lets graph.stream(stream_mode="messages")
+    # surface report tokens while this node is still running. The PDF is only
+    # queued, so the node finishes as soon as the last token arrives.
+    generator = ReportGenerator(**_report_args(state))
+    tokens = []
+    stream = generator.stream_report()
+    try:
+        for token in stream:
+            tokens.append(token)
+            if deadline.expired():
+                stream.close()
+                break
+    except TimeoutError:
+        # The router gives up on a stalled provider at the deadline; other timeouts are errors.
+        if not deadline.expired():
+            raise
+    if generator.pdf_path is None:
+        # Cut off at the deadline: keep what was written and say so.
+        report = _join_report(tokens) + TRUNCATED_REPORT_NOTE
+        generator.submit_pdf(report)
+        return {"final_report": report, "report_pdf_path": generator.pdf_path}
+    return {"final_report": _join_report(tokens), "report_pdf_path": generator.pdf_path}
+
+# === ASYNC AGENT FUNCTIONS ===
+# Used when the compiled graph is driven with ainvoke/astream, so many plans
+# can share one event loop instead of a worker thread per node.
+async def aorchestrator(state: TravelState) -> Dict[str, Any]:
     city = state["user_input_data"]["city"]
-    currency = "INR"  # Assuming INR for simplicity, can be parameterized
-    flight_info = state["flight_info"]
-    hotel_info = state["hotel_info"]
-    transport_info = state["transport_info"]
-    restaurant_info = state["restaurant_info"]
-    attraction_info = state["attraction_info"] 
-
-    # Calculate expenses
-    expense_report = calculate_expenses(
-        city_name=city,
-        currency=currency,
-        num_days=num_days,
-        flight_info=flight_info,
-        hotel_info=hotel_info,
-        transport_info=transport_info,
-        restaurant_info=restaurant_info,
-        attraction_info=attraction_info
-    )
+    lat, lon = await aget_city_coordinates(city)
+    return {"destination_details": _destination_details(lat, lon)}
 
-    state["expenses"] = expense_report
-    return state
+async def aweather_agent(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    result = await aprint_weather_for_city(city, **_weather_args(state))
+    return {"weather_info": result}
 
-def fusion_agent(state: TravelState) -> TravelState:
-    user_input = state["user_input_data"]
-    city = user_input["city"]
-    origin_city = user_input["origin_city"]
-    destination_city = user_input["destination_city"]
-    num_days = user_input["num_days"]
-    flight_info = state["flight_info"]
-    weather_info = state["weather_info"]
-    attraction_info = state["attraction_info"]
-    restaurant_info = state["restaurant_info"]
-    hotel_info = state["hotel_info"]
-    transport_info = state["transport_info"]
-    expense_report_text = state["expenses"]
-    outbound_date = user_input["outbound_date"]
-    return_date = user_input.get("return_date", "")
-
-    # Generate final report
-    final_report = generate_final_report(
-        origin_city=origin_city,
-        destination_city=destination_city,
-        num_days=num_days,
-        flight_info=flight_info,
-        weather_info=weather_info,
-        attraction_info=attraction_info,
-        restaurant_info=restaurant_info,
-        hotel_info=hotel_info,
-        transport_info=transport_info,
-        expense_report_text=expense_report_text,
-        outbound_date=outbound_date,
-        return_date=return_date
-    )
-    state["final_report"] = final_report
-    return state
+async def ahotel_agent(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    result = await aget_topk_hotels(city, topk=5, coordinates=_coordinates(state))
+    return {"hotel_info": result}
+
+async def aflight_agent(state: TravelState) -> Dict[str, Any]:
+    result = await aget_flight_results(**_flight_args(state))
+    return {"flight_info": result}
+
+async def atransport_agent(state: TravelState) -> Dict[str, Any]:
+    result = await aget_transportation_results(**_transport_args(state))
+    return {"transport_info": result}
+
+async def anearby_transport_agent(state: TravelState) -> Dict[str, Any]:
+    lat = state["destination_details"]["latitude"]
+    lon = state["destination_details"]["longitude"]
+    result = await aget_nearby_transport(lat=lat, lon=lon, transport_type="metro station")
+    return {"nearby_transport": result}
+
+async def arestaurant_agent(state: TravelState) -> Dict[str, Any]:
+    city = state["user_input_data"]["city"]
+    result = await aget_topk_restaurants(city, topk=5, coordinates=_coordinates(state))
+    return {"restaurant_info": result}
+
+async def aattraction_agent(state: TravelState) -> Dict[str, Any]:
+    lat = state["destination_details"]["latitude"]
+    lon = state["destination_details"]["longitude"]
+    result = await aget_attraction_spots(lat, lon)
+    return {"attraction_info": result}
+
+async def aitinerary_agent(state: TravelState) -> Dict[str, Any]:
+    # A few milliseconds of numpy; not worth a thread hop.
+    return itinerary_agent(state)
+
+async def aexpense_agent(state: TravelState) -> Dict[str, Any]:
+    expense_report = await acalculate_expenses(**_expense_args(state))
+    return {"expenses": expense_report}
+
+async def afusion_agent(state: TravelState) -> Dict[str, Any]:
+    generator = ReportGenerator(**_report_args(state))
+    tokens = [token async for token in deadline.abounded(generator.astream_report())]
+    if generator.pdf_path is None:
+        report = _join_report(tokens) + TRUNCATED_REPORT_NOTE
+        await generator.asubmit_pdf(report)
+        return {"final_report": report, "report_pdf_path": generator.pdf_path}
+    return {"final_report": _join_report(tokens), "report_pdf_path": generator.pdf_path}
+
+# Graph node name -> (sync implementation, async implementation).
+NODES = {
+    "orchestrator": (orchestrator, aorchestrator),
+    "weather": (weather_agent, aweather_agent),
+    "hotel": (hotel_agent, ahotel_agent),
+    "flight": (flight_agent, aflight_agent),
+    "transport": (transport_agent, atransport_agent),
+    # "nearby_transport": (nearby_transport_agent, anearby_transport_agent),
+    "restaurant": (restaurant_agent, arestaurant_agent),
+    "attraction": (attraction_agent, aattraction_agent),
+    "itinerary": (itinerary_agent, aitinerary_agent),
+    "expense": (expense_agent, aexpense_agent),
+    "fusion": (fusion_agent, afusion_agent),
+}
+
+# Data-gathering nodes that run in parallel between orchestrator and expense.
+# Each one writes a distinct TravelState key, so their updates merge cleanly.
+FETCH_NODES = ("weather", "hotel", "flight", "transport", "restaurant", "attraction")
+
+# What a fetch node writes when its source failed or missed the deadline, so the
+# agents downstream still get the types they expect.
+UNAVAILABLE_RESULTS = {
+    "weather": ("weather_info", None),
+    "hotel": ("hotel_info", []),
+    "flight": ("flight_info", []),
+    "transport": ("transport_info", {}),
+    "restaurant": ("restaurant_info", []),
+    "attraction": ("attraction_info", []),
+}
+
+def _plan_deadlines(state: TravelState, config: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    # The caller may fix the deadline in config["configurable"]["deadline_at"];
+    # otherwise the clock starts at the first node. A resumed plan passes a new one.
+    deadline_at = ((config or {}).get("configurable") or {}).get("deadline_at")
+    deadlines = state.get("deadlines")
+    if deadlines and (deadline_at is None or deadlines["plan"] == deadline_at):
+        return deadlines
+    return deadline.plan_deadlines(deadline_at)
+
+def _node_deadline(name: str, deadlines: Dict[str, float]) -> float:
+    return deadlines["fetch"] if name == "orchestrator" or name in FETCH_NODES else deadlines["plan"]
 
-def build_graph():
+def _fetch_result(name: str, update: Optional[Dict[str, Any]], failures: List[str]) -> Dict[str, Any]:
+    field, empty = UNAVAILABLE_RESULTS[name]
+    update = dict(update or {})
+    reason = deadline.unavailable_reason(failures)
+    value = update.get(field)
+    # A fetcher that got some data despite a failed call (e.g. one attraction strip) keeps it.
+    if reason is not None and (not value or (isinstance(value, dict) and "error" in value)):
+        logger.warning(f"{name} data unavailable: {reason}")
+        update[field] = empty
+        update["unavailable"] = {name: reason}
+    return update
+
+def guarded(name: str, func, afunc):
+    """
+    Run a node pair within the plan's deadline. Fetch nodes never raise: when their
+    source fails or runs out of time they write an empty result and an unavailable
+    marker, so expense and fusion still produce a report from whatever arrived.
+    """
+    def run(state: TravelState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        deadlines = _plan_deadlines(state, config)
+        with deadline.scope(_node_deadline(name, deadlines)), deadline.track_failures() as failures:
+            if name not in UNAVAILABLE_RESULTS:
+                update = func(state)
+            else:
+                try:
+                    if deadline.expired():
+                        raise deadline.DeadlineExceeded(f"{name} skipped: deadline already passed")
+                    update = func(state)
+                except Exception as e:
+                    logger.error(f"{name} failed: {e!r}")
+                    failures.append(deadline.reason(e))
+                    update = None
+                update = _fetch_result(name, update, failures)
+        return update if state.get("deadlines") == deadlines else dict(update, deadlines=deadlines)
+
+    async def arun(state: TravelState, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        deadlines = _plan_deadlines(state, config)
+        with deadline.scope(_node_deadline(name, deadlines)), deadline.track_failures() as failures:
+            if name not in UNAVAILABLE_RESULTS:
+                update = await afunc(state)
+            else:
+                try:
+                    left = deadline.remaining()
+                    if left is not None and left <= 0:
+                        raise deadline.DeadlineExceeded(f"{name} skipped: deadline already passed")
+                    # Unlike a thread, a coroutine can be stopped at the deadline.
+                    update = await asyncio.wait_for(afunc(state), left)
+                except Exception as e:
+                    logger.error(f"{name} failed: {e!r}")
+                    failures.append(deadline.reason(e))
+                    update = None
+                update = _fetch_result(name, update, failures)
+        return update if state.get("deadlines") == deadlines else dict(update, deadlines=deadlines)
+
+    return run, arun
+
+# Graph node name -> (sync runner, async runner): each node traced and guarded
+# as the compiled graph runs it, for callers that drive nodes directly.
+NODE_RUNNERS = {name: tuple(traced(name)(f) for f in guarded(name, func, afunc))
+                for name, (func, afunc) in NODES.items()}
+
+def build_graph(checkpointer=None):
     """
     Build the state graph for the travel planning workflow.
     This function is used to compile the state graph and can be called directly.
+    The compiled graph runs the sync agents under invoke/stream and the async
+    agents under ainvoke/astream.
+    With a checkpointer (see utils.checkpoints.get_checkpointer), the state is
+    saved after every node and runs need a plan id; see run_plan and resume_plan.
     """
+    # langgraph is imported here rather than at module level so that importing
+    # the agents (e.g. from batch_planner) does not pay for it.
+    from langgraph.graph import StateGraph
+    from langchain_core.runnables import RunnableLambda
+
     # === WORKFLOW GRAPH ===
     travel_graph_builder = StateGraph(TravelState)
 
     travel_graph_builder.set_entry_point("orchestrator")
 
-    travel_graph_builder.add_node("orchestrator", orchestrator)
-    travel_graph_builder.add_node("weather", weather_agent)
-    travel_graph_builder.add_node("hotel", hotel_agent)
-    travel_graph_builder.add_node("flight", flight_agent)
-    travel_graph_builder.add_node("transport", transport_agent)
-    # travel_graph_builder.add_node("nearby_transport", nearby_transport_agent)
-    travel_graph_builder.add_node("restaurant", restaurant_agent)
-    travel_graph_builder.add_node("attraction", attraction_agent)
-    travel_graph_builder.add_node("expense", expense_agent)
-    travel_graph_builder.add_node("fusion", fusion_agent)
+    # Every node runs inside a tracing span, so HTTP and LLM spans opened by
+    # the agents are attributed to the node that made them, and within the plan's deadline.
+    for name, (run, arun) in NODE_RUNNERS.items():
+        travel_graph_builder.add_node(name, RunnableLambda(run, afunc=arun, name=name))
 
     # Add edges
-    travel_graph_builder.add_edge("orchestrator", "weather")
-    travel_graph_builder.add_edge("weather", "hotel")
-    travel_graph_builder.add_edge("hotel", "flight")
-    travel_graph_builder.add_edge("flight", "transport")
-    travel_graph_builder.add_edge("transport", "restaurant")
-    # travel_graph_builder.add_edge("nearby_transport", "restaurant")
-    travel_graph_builder.add_edge("restaurant", "attraction")
-    travel_graph_builder.add_edge("attraction", "expense")
-    travel_graph_builder.add_edge("expense", "fusion")
-
-    travel_graph = travel_graph_builder.compile()
+    # The fetch agents only read user_input_data / destination_details, so they
+    # fan out from the orchestrator in a single superstep and join at expense.
+    for node in FETCH_NODES:
+        travel_graph_builder.add_edge("orchestrator", node)
+    travel_graph_builder.add_edge(list(FETCH_NODES), "expense")
+    # The itinerary only needs attractions and hotels; it runs beside expense.
+    travel_graph_builder.add_edge(list(FETCH_NODES), "itinerary")
+    travel_graph_builder.add_edge(["expense", "itinerary"], "fusion")
+
+    travel_graph = travel_graph_builder.compile(checkpointer=checkpointer)
     return travel_graph
+
+# === STREAMING ===
+def _report_token(payload) -> str:
+    message, metadata = payload
+    if metadata.get("langgraph_node") != "fusion":
+        return ""
+    return message.content if isinstance(message.content, str) else ""
+
+def stream_report_tokens(travel_graph, input_state: TravelState, config: Optional[Dict[str, Any]] = None,
+                         final_state: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Run the compiled graph and yield final-report tokens as the fusion node generates them.
+    If final_state is given, it is filled with the graph's final state values.
+    """
+    for mode, payload in travel_graph.stream(input_state, config=config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            token = _report_token(payload)
+            if token:
+                yield token
+        elif final_state is not None:
+            final_state.update(payload)
+
+async def astream_report_tokens(travel_graph, input_state: TravelState, config: Optional[Dict[str, Any]] = None,
+                                final_state: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """
+    Async version of stream_report_tokens.
+    """
+    async for mode, payload in travel_graph.astream(input_state, config=config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            token = _report_token(payload)
+            if token:
+                yield token
+        elif final_state is not None:
+            final_state.update(payload)
+
+# === CHECKPOINTED RUNS ===
+def new_plan_id() -> str:
+    return uuid.uuid4().hex
+
+def resume_config(plan_id: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run config that continues plan_id, with the deadline restarted from now unless config sets one.
+    """
+    config = thread_config(plan_id, config)
+    config["configurable"].setdefault("deadline_at", deadline.plan_deadlines()["plan"])
+    return config
+
+def plan_status(travel_graph, plan_id: str) -> Dict[str, Any]:
+    """
+    What a checkpointed plan has done: its saved state and the nodes still to run.
+    """
+    snapshot = travel_graph.get_state(thread_config(plan_id))
+    return {
+        "plan_id": plan_id,
+        "found": bool(snapshot.values),
+        "pending": list(snapshot.next),
+        "completed": bool(snapshot.values) and not snapshot.next,
+        "values": snapshot.values,
+    }
+
+def run_plan(travel_graph, input_state: TravelState, plan_id: Optional[str] = None,
+             config: Optional[Dict[str, Any]] = None) -> Tuple[str, TravelState]:
+    """
+    Run a plan on a checkpointed graph and return (plan_id, final state). If it
+    fails, resume_plan(travel_graph, plan_id) continues from the last completed node.
+    """
+    plan_id = plan_id or new_plan_id()
+    return plan_id, travel_graph.invoke(input_state, config=thread_config(plan_id, config))
+
+async def arun_plan(travel_graph, input_state: TravelState, plan_id: Optional[str] = None,
+                    config: Optional[Dict[str, Any]] = None) -> Tuple[str, TravelState]:
+    """
+    Async version of run_plan.
+    """
+    plan_id = plan_id or new_plan_id()
+    return plan_id, await travel_graph.ainvoke(input_state, config=thread_config(plan_id, config))
+
+def resume_plan(travel_graph, plan_id: str, config: Optional[Dict[str, Any]] = None) -> TravelState:
+    """
+    Continue a failed or cancelled plan; only the nodes that did not finish run again.
+    """
+    if not plan_status(travel_graph, plan_id)["found"]:
+        raise KeyError(f"No checkpoint for plan {plan_id}")
+    return travel_graph.invoke(None, config=resume_config(plan_id, config))
+
+async def aresume_plan(travel_graph, plan_id: str, config: Optional[Dict[str, Any]] = None) -> TravelState:
+    """
+    Async version of resume_plan.
+    """
+    snapshot = await travel_graph.aget_state(thread_config(plan_id))
+    if not snapshot.values:
+        raise KeyError(f"No checkpoint for plan {plan_id}")
+    return await travel_graph.ainvoke(None, config=resume_config(plan_id, config))